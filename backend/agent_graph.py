@@ -1,10 +1,18 @@
 # agent_graph.py
 
+import threading
+import time
+import traceback
+
 from langgraph.graph import END, StateGraph
 from langchain_core.runnables import RunnableLambda
-from langchain_ollama import OllamaLLM
 
-llm = OllamaLLM(model="llama3", temperature=0.1, base_url="http://localhost:11434")
+from config import ANSWER_MODE, QUERY_PLANNER_ENABLED, QUERY_PLANNER_LLM_PHRASING, QUERY_PLANNER_TOP_N
+from llm_gateway import get_llm
+from prompts import build_prompt
+from router import get_router
+
+llm = get_llm()
 
 # 상태 정의
 class AgentState(dict):
@@ -12,51 +20,228 @@ class AgentState(dict):
     tool_input: str
     observation: str
     final_answer: str
+    answer_mode: str  # "single": 검색 결과로 한 번만 생성 / "two_pass": 도구 답변을 다시 정리
+    prompt: str
+    artifacts: dict  # 도구가 만든 표 등 구조화된 결과 (LLM 프롬프트에 넣지 않고 응답으로만 전달)
+    plan: dict  # 집계 빠른 경로의 실행 계획 (비어 있으면 일반 도구 경로)
+
+
+# 집계 질문 빠른 경로 노드: 분석기 롤업에서 바로 계산
+def plan_query(state):
+    if not QUERY_PLANNER_ENABLED:
+        return {"plan": {}}
+
+    from artifacts import dataframe_artifact
+    from query_planner import execute_plan, parse_query, resolve_filters
+    from tools import shared_analyzer
+
+    try:
+        started = time.perf_counter()
+        analyzer = shared_analyzer()
+        # 집계형 질문이 아니면 데이터를 읽지 않고 바로 일반 경로로
+        plan = parse_query(state["question"], available_dimensions=list(analyzer.dimensions),
+                           default_top_n=QUERY_PLANNER_TOP_N)
+        if plan is None:
+            return {"plan": {}}
+
+        analyzer.load_all_data()
+        available = analyzer.available_dimensions
+        if any(col not in available for col in plan["filters"]):
+            return {"plan": {}}  # 필터할 컬럼이 데이터에 없으면 전체 합계로 잘못 답하지 않도록
+        # SKU처럼 보이지만 데이터에 없는 토큰(분기 "Q3", 모델명 등)은 필터에서 제외
+        filters = resolve_filters(analyzer, plan["filters"])
+        if filters is None:
+            return {"plan": {}}
+        plan["filters"] = filters
+        plan["group_by"] = [col for col in plan["group_by"] if col in available]
+
+        result = execute_plan(analyzer, plan)
+        if result is None:
+            return {"plan": {}}  # 분석할 데이터가 없으면 일반 도구 경로로
+        print(f"[plan_query] 빠른 경로 {plan} ({(time.perf_counter() - started) * 1000:.1f} ms)")
+    except Exception as e:
+        print(f"[plan_query] 빠른 경로 실패, 일반 경로 사용: {e}")
+        print(traceback.format_exc())
+        return {"plan": {}}
+
+    update = {
+        "plan": plan,
+        "observation": result["answer"],
+        "artifacts": {"query_result": dataframe_artifact(result["table"])},
+    }
+    if QUERY_PLANNER_LLM_PHRASING:
+        update["prompt"] = build_prompt("query_result", state["question"], ("계산 결과", result["answer"]))
+    else:
+        update["final_answer"] = result["answer"]
+    return update
+
+
+async def aplan_query(state):
+    from executor import run_blocking
+    return await run_blocking(plan_query, state)
+
+
+def route_after_plan(state) -> str:
+    """빠른 경로로 답이 나왔으면 도구 단계를 건너뜀"""
+    if not state.get("plan"):
+        return "tools"
+    return "done" if state.get("final_answer") else "phrase"
 
 # Tool 선택 노드
 def select_tool(state):
     return {"tool_input": state["question"]}
 
-KEYWORD_TOOL_MAP = {
-    ("요약", "정리", "요약해"): "summarize",
-    ("시각화"): "visualization",
-    ("검색", "찾아", "찾기"): "search_documents"
-}
+def choose_tool(question: str) -> str:
+    # 키워드는 컴파일된 정규식 한 번으로 검사, 없으면 임베딩 최근접 중심 분류 (router.py)
+    return get_router().route(question)
+
 
 def run_tool(state):
-    from tools import TOOLS
-    question = state["question"].lower()
+    from tools import PREPARERS, answer_prepared
+    tool_name = choose_tool(state["question"])
+
+    prepared = PREPARERS[tool_name](state["question"])
+    artifacts = prepared.get("artifacts") or {}
+
+    if state.get("answer_mode", ANSWER_MODE) == "single":
+        # 도구는 검색/프롬프트 구성까지만 하고 LLM 생성은 최종 노드에서 한 번만 수행
+        return {"prompt": prepared.get("prompt") or "", "observation": prepared.get("observation", ""),
+                "artifacts": artifacts}
+
+    # two_pass: 도구 답변(TOOLS[tool_name]과 같은 결과)을 관찰 결과로 사용
+    return {"prompt": "", "observation": answer_prepared(prepared), "artifacts": artifacts}
+
 
-    for keywords, tool_name in KEYWORD_TOOL_MAP.items():
-        if any(kw in question for kw in keywords):
-            return {"observation": TOOLS[tool_name].func(state["question"])}
+async def arun_tool(state):
+    # 검색 / pandas 등 동기 CPU 작업만 전용 스레드풀에서 실행하고,
+    # LLM 생성(요약 map-reduce, two_pass 답변)은 스레드를 점유하지 않도록 이벤트 루프에서 await
+    from executor import run_blocking
+    from tools import APREPARERS, PREPARERS, aanswer_prepared
+    tool_name = await run_blocking(choose_tool, state["question"])
 
-    return {"observation": TOOLS["default"].func(state["question"])}
+    if tool_name in APREPARERS:
+        prepared = await APREPARERS[tool_name](state["question"])
+    else:
+        prepared = await run_blocking(PREPARERS[tool_name], state["question"])
+    artifacts = prepared.get("artifacts") or {}
+
+    if state.get("answer_mode", ANSWER_MODE) == "single":
+        return {"prompt": prepared.get("prompt") or "", "observation": prepared.get("observation", ""),
+                "artifacts": artifacts}
+    return {"prompt": "", "observation": await aanswer_prepared(prepared), "artifacts": artifacts}
 
 
 # Final Answer 요약 노드
+def build_final_prompt(state) -> str:
+    # single 모드 / 빠른 경로 문장 다듬기: 도구가 만든 프롬프트를 그대로 사용
+    # (한국어 응답 지시는 게이트웨이가 모든 요청에 붙이는 시스템 프롬프트에 있음)
+    if state.get("prompt"):
+        return state["prompt"]
+
+    return build_prompt("observation", state["question"], ("관찰 결과", state["observation"]))
+
+
 def generate_final_answer(state):
-    obs = state["observation"]
-    prompt = f"""당신은 한국어 응답을 생성하는 응답기입니다.
-아래 관찰 결과를 자연스럽고 구체적인 최종 답변을 한국말로 정리해주세요.
+    answer = llm.invoke(build_final_prompt(state))
+    return {"final_answer": answer}
 
-관찰 결과:
-{obs}
 
-답변:"""
-    answer = llm.invoke(prompt)
+async def agenerate_final_answer(state):
+    answer = await llm.ainvoke(build_final_prompt(state))
     return {"final_answer": answer}
 
+
+def stream_final_answer(state):
+    """최종 답변을 토큰 단위로 생성 (SSE 스트리밍용). 빠른 경로로 이미 답이 있으면 그대로 반환"""
+    if state.get("final_answer"):
+        yield state["final_answer"]
+        return
+    yield from llm.stream(build_final_prompt(state))
+
+
+async def astream_final_answer(state):
+    if state.get("final_answer"):
+        yield state["final_answer"]
+        return
+    async for token in llm.astream(build_final_prompt(state)):
+        yield token
+
+
 # Graph 구성
 def build_agent_graph():
     workflow = StateGraph(AgentState)
+    workflow.add_node("plan_query", RunnableLambda(plan_query, afunc=aplan_query))
     workflow.add_node("select_tool", RunnableLambda(select_tool))
-    workflow.add_node("run_tool", RunnableLambda(run_tool))
-    workflow.add_node("generate_final_answer", RunnableLambda(generate_final_answer))
+    workflow.add_node("run_tool", RunnableLambda(run_tool, afunc=arun_tool))
+    workflow.add_node("generate_final_answer", RunnableLambda(generate_final_answer, afunc=agenerate_final_answer))
 
-    workflow.set_entry_point("select_tool")
+    workflow.set_entry_point("plan_query")
+    workflow.add_conditional_edges("plan_query", route_after_plan, {
+        "tools": "select_tool",
+        "phrase": "generate_final_answer",
+        "done": END,
+    })
     workflow.add_edge("select_tool", "run_tool")
     workflow.add_edge("run_tool", "generate_final_answer")
     workflow.add_edge("generate_final_answer", END)
 
     return workflow.compile()
+
+
+def build_tool_graph():
+    """도구 실행까지만 수행하는 그래프 (최종 답변은 호출 측에서 스트리밍)"""
+    workflow = StateGraph(AgentState)
+    workflow.add_node("plan_query", RunnableLambda(plan_query, afunc=aplan_query))
+    workflow.add_node("select_tool", RunnableLambda(select_tool))
+    workflow.add_node("run_tool", RunnableLambda(run_tool, afunc=arun_tool))
+
+    workflow.set_entry_point("plan_query")
+    # 빠른 경로면 (문장 다듬기 여부와 상관없이) 최종 답변 스트리밍은 호출 측에서 처리
+    workflow.add_conditional_edges("plan_query", route_after_plan, {
+        "tools": "select_tool",
+        "phrase": END,
+        "done": END,
+    })
+    workflow.add_edge("select_tool", "run_tool")
+    workflow.add_edge("run_tool", END)
+
+    return workflow.compile()
+
+
+GRAPH_BUILDERS = {
+    "agent": build_agent_graph,
+    "tool": build_tool_graph,
+}
+
+# 컴파일된 그래프 캐시 (요청마다 StateGraph를 다시 만들지 않도록)
+_compiled_graphs = {}
+_graph_lock = threading.Lock()
+
+
+def get_graph(name: str):
+    """컴파일된 그래프를 반환 (최초 호출 시 한 번만 빌드)"""
+    graph = _compiled_graphs.get(name)
+    if graph is None:
+        with _graph_lock:
+            graph = _compiled_graphs.get(name)
+            if graph is None:
+                graph = GRAPH_BUILDERS[name]()
+                _compiled_graphs[name] = graph
+    return graph
+
+
+def get_agent_graph():
+    return get_graph("agent")
+
+
+def get_tool_graph():
+    return get_graph("tool")
+
+
+def rebuild_agent_graph():
+    """도구/노드 구성이 바뀐 경우 모든 그래프를 다시 빌드해 캐시를 교체"""
+    graphs = {name: builder() for name, builder in GRAPH_BUILDERS.items()}
+    with _graph_lock:
+        _compiled_graphs.clear()
+        _compiled_graphs.update(graphs)
+    return graphs["agent"]
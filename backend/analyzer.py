@@ -1,76 +1,324 @@
 import pandas as pd
 import os
-from typing import Optional
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from parsing import map_files, read_table
+
+try:
+    import pyarrow  # noqa: F401  (파싱 결과를 Parquet으로 캐시할 때만 필요)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DATE_COLUMN = 'Date'
+VALUE_COLUMN = 'PalleteQty'
+
+# 일별 롤업에 남길 분류 컬럼 후보 (파일에 있는 컬럼만 사용)
+DEFAULT_DIMENSIONS = ('SKU', 'Product', 'Location')
+
+# 롤업 형식이 바뀌면 올려서 Parquet 캐시를 무효화
+ROLLUP_VERSION = '1'
+
+# 집계 단위 → pandas period 코드 (day는 롤업 자체가 일 단위)
+FREQ_PERIODS = {'day': None, 'week': 'W', 'month': 'M'}
+
+
+def read_rollup(full_path: str, dimensions: Sequence[str]) -> Optional[pd.DataFrame]:
+    """파일에서 필요한 컬럼만 읽어 (Date, 분류 컬럼...) 단위 일별 합계로 줄임"""
+    wanted = {DATE_COLUMN, VALUE_COLUMN, *dimensions}
+    dtype = {VALUE_COLUMN: 'float64', **{col: 'string' for col in dimensions}}
+
+    def read(with_dtype: bool) -> pd.DataFrame:
+        return read_table(full_path, usecols=lambda col: col in wanted, dtype=dtype if with_dtype else None)
+
+    try:
+        df = read(with_dtype=True)
+    except (ValueError, TypeError):
+        # 수량 컬럼에 숫자가 아닌 값이 섞인 경우: 타입 힌트 없이 읽고 숫자로 변환
+        df = read(with_dtype=False)
+        if VALUE_COLUMN in df.columns:
+            df[VALUE_COLUMN] = pd.to_numeric(df[VALUE_COLUMN], errors='coerce')
+
+    if DATE_COLUMN not in df.columns or VALUE_COLUMN not in df.columns:
+        print(f"[롤업 건너뜀] {os.path.basename(full_path)}: {DATE_COLUMN}/{VALUE_COLUMN} 컬럼 없음")
+        return None
+
+    df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN]).dt.normalize()
+    dims = [col for col in dimensions if col in df.columns]
+    return (
+        df.groupby([DATE_COLUMN] + dims, dropna=False, sort=False)[VALUE_COLUMN]
+        .sum()
+        .reset_index()
+    )
+
+
+def _slice_dates(frame: pd.DataFrame, start, end) -> pd.DataFrame:
+    """Date로 정렬된 롤업에서 [start, end] 구간만 이진 탐색으로 잘라냄 (end 당일 포함)"""
+    dates = frame[DATE_COLUMN].values
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start).to_datetime64(), 'left')
+    hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end).to_datetime64(), 'right')
+    return frame.iloc[lo:hi]
+
+
+def period_start(dates: pd.Series, freq: str) -> pd.Series:
+    """날짜를 집계 단위(day/week/month) 구간의 시작일로 변환"""
+    period = FREQ_PERIODS[freq]
+    if period is None:
+        return dates
+    return dates.dt.to_period(period).dt.start_time
+
 
 class InOutAnalyzer:
-    def __init__(self, folder_path: str):
+    """입/출고 파일 분석기
+
+    - 파일마다 필요한 컬럼(Date, PalleteQty, 분류 컬럼)만 읽어 일별 롤업으로 줄여서 보관
+    - 파일별 (mtime, size)를 기억해 바뀐 파일만 다시 읽음
+    - cache_dir이 주어지면 롤업을 Parquet으로 저장해 재시작 후에도 재사용
+    - query()로 기간 / 집계 단위(day/week/month) / 분류 컬럼별 집계. 전체 일별 요약은 캐시
+    """
+
+    def __init__(self, folder_path: str, cache_dir: Optional[str] = None,
+                 dimensions: Iterable[str] = DEFAULT_DIMENSIONS, parse_workers: int = 1):
         self.folder_path = folder_path
-        self.inbound_df = None
-        self.outbound_df = None
+        self.cache_dir = cache_dir if HAS_PYARROW else None
+        self.dimensions = tuple(dimensions)
+        # 바뀐 파일이 여러 개일 때 병렬 파싱에 사용할 프로세스 수
+        self.parse_workers = parse_workers
+        # Date 순으로 정렬된 일별 롤업 (Date, 분류 컬럼..., PalleteQty)
+        self.inbound_daily: Optional[pd.DataFrame] = None
+        self.outbound_daily: Optional[pd.DataFrame] = None
+        self._lock = threading.RLock()
+        # file -> (signature, kind, rollup)
+        self._frames: Dict[str, Tuple[Tuple[int, int], str, pd.DataFrame]] = {}
+        self._data_key = None
+        self._summary = None
+        self._summary_key = None
 
-    def load_all_data(self):
-        inbound_list = []
-        outbound_list = []
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
 
-        for file in os.listdir(self.folder_path):
-            full_path = os.path.join(self.folder_path, file)
-            if not os.path.isfile(full_path):
-                continue
+    @staticmethod
+    def _classify(file: str) -> Optional[str]:
+        # 파일명 기준 분류
+        lower_file = file.lower()
+        if lower_file.startswith('inbound') or lower_file.startswith('입고데이터'):
+            return 'inbound'
+        if lower_file.startswith('outbound') or lower_file.startswith('출고데이터'):
+            return 'outbound'
+        return None
+
+    def _cache_path(self, full_path: str, signature: Tuple[int, int]) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        raw_key = f"{os.path.abspath(full_path)}:{signature[0]}:{signature[1]}:{ROLLUP_VERSION}:{','.join(self.dimensions)}"
+        key = hashlib.sha1(raw_key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.parquet")
 
-            # 확장자에 따라 판다스로 읽기
+    def _load_cached(self, file: str, cache_path: Optional[str]) -> Optional[pd.DataFrame]:
+        if cache_path and os.path.exists(cache_path):
             try:
-                if file.endswith('.csv'):
-                    df = pd.read_csv(full_path)
-                elif file.endswith('.xlsx') or file.endswith('.xls'):
-                    df = pd.read_excel(full_path)
-                else:
-                    continue  # 지원하지 않는 파일은 패스
+                return pd.read_parquet(cache_path)
             except Exception as e:
-                print(f"[읽기 실패] {file}: {e}")
+                print(f"[캐시 읽기 실패] {file}: {e}")
+        return None
+
+    def _store_cached(self, file: str, cache_path: Optional[str], df: pd.DataFrame) -> None:
+        if cache_path:
+            try:
+                df.to_parquet(cache_path, index=False)
+            except Exception as e:
+                print(f"[캐시 저장 실패] {file}: {e}")
+
+    def _prune_cache(self, current: Dict[str, tuple]) -> None:
+        """현재 업로드 파일 어느 것에도 대응하지 않는 캐시 파일 삭제 (바뀌거나 지워진 파일의 이전 롤업)"""
+        if not self.cache_dir:
+            return
+        keep = {os.path.basename(self._cache_path(full_path, signature))
+                for full_path, signature, _ in current.values()}
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet') and name not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    removed += 1
+                except OSError as e:
+                    print(f"[캐시 삭제 실패] {name}: {e}")
+        if removed:
+            print(f"[캐시 정리] 사용되지 않는 롤업 캐시 {removed}개 삭제")
+
+    def _read_files(self, targets: Dict[str, Tuple[str, Tuple[int, int]]]) -> Dict[str, Optional[pd.DataFrame]]:
+        """{file: (full_path, signature)} → {file: 롤업}. 캐시에 없는 파일은 프로세스 풀에서 병렬 파싱"""
+        frames: Dict[str, Optional[pd.DataFrame]] = {}
+        to_parse = {}
+        for file, (full_path, signature) in targets.items():
+            if not file.endswith(('.csv', '.xlsx', '.xls')):
+                frames[file] = None  # 지원하지 않는 파일은 패스
                 continue
+            cached = self._load_cached(file, self._cache_path(full_path, signature))
+            if cached is not None:
+                frames[file] = cached
+            else:
+                to_parse[full_path] = file
+
+        parsed = map_files(read_rollup, list(to_parse), self.dimensions, workers=self.parse_workers)
+        for full_path, result in parsed.items():
+            file = to_parse[full_path]
+            if isinstance(result, Exception):
+                print(f"[읽기 실패] {file}: {result}")
+                frames[file] = None
+                continue
+            frames[file] = result
+            if result is not None:
+                self._store_cached(file, self._cache_path(full_path, targets[file][1]), result)
+        return frames
+
+    @staticmethod
+    def _combine(frames: List[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        if not frames:
+            return None
+        combined = pd.concat(frames, ignore_index=True)
+        return combined.sort_values(DATE_COLUMN, kind='stable', ignore_index=True)
+
+    def load_all_data(self):
+        with self._lock:
+            current = {}
+            for file in os.listdir(self.folder_path):
+                full_path = os.path.join(self.folder_path, file)
+                if not os.path.isfile(full_path):
+                    continue
+                kind = self._classify(file)
+                if kind is None:
+                    continue
+                stat = os.stat(full_path)
+                current[file] = (full_path, (stat.st_mtime_ns, stat.st_size), kind)
 
-            # 파일명 기준 분류
-            lower_file = file.lower()
-            if lower_file.startswith('inbound') or lower_file.startswith('입고데이터'):
-                inbound_list.append(df)
-            elif lower_file.startswith('outbound') or lower_file.startswith('출고데이터'):
-                outbound_list.append(df)
+            # 삭제된 파일 제거, 새로 생기거나 바뀐 파일만 다시 읽기
+            for file in list(self._frames):
+                if file not in current:
+                    del self._frames[file]
+            changed = {
+                file: (full_path, signature)
+                for file, (full_path, signature, _) in current.items()
+                if file not in self._frames or self._frames[file][0] != signature
+            }
+            for file, df in self._read_files(changed).items():
+                if df is None:
+                    self._frames.pop(file, None)
+                    continue
+                self._frames[file] = (current[file][1], current[file][2], df)
 
-        # 데이터프레임 통합
-        if inbound_list:
-            self.inbound_df = pd.concat(inbound_list, ignore_index=True)
-            self.inbound_df['Date'] = pd.to_datetime(self.inbound_df['Date'])
-        else:
-            print("입고 데이터가 없습니다.")
+            data_key = tuple(sorted((file, entry[0]) for file, entry in self._frames.items()))
+            if data_key == self._data_key:
+                return
+            self._data_key = data_key
+            self._prune_cache(current)
 
-        if outbound_list:
-            self.outbound_df = pd.concat(outbound_list, ignore_index=True)
-            self.outbound_df['Date'] = pd.to_datetime(self.outbound_df['Date'])
-        else:
-            print("출고 데이터가 없습니다.")
+            # 파일별 롤업 통합
+            self.inbound_daily = self._combine([df for _, kind, df in self._frames.values() if kind == 'inbound'])
+            self.outbound_daily = self._combine([df for _, kind, df in self._frames.values() if kind == 'outbound'])
+            if self.inbound_daily is None:
+                print("입고 데이터가 없습니다.")
+            if self.outbound_daily is None:
+                print("출고 데이터가 없습니다.")
 
+    @property
+    def available_dimensions(self) -> List[str]:
+        """롤업에 실제로 있는 분류 컬럼"""
+        columns = set()
+        for frame in (self.inbound_daily, self.outbound_daily):
+            if frame is not None:
+                columns.update(frame.columns)
+        return [col for col in self.dimensions if col in columns]
+
+    def dimension_values(self, column: str) -> set:
+        """분류 컬럼에 실제로 있는 값 (입고/출고 롤업 합집합)"""
+        values = set()
+        with self._lock:
+            for frame in (self.inbound_daily, self.outbound_daily):
+                if frame is not None and column in frame.columns:
+                    values.update(frame[column].dropna().unique())
+        return values
+
+    def query(self, start=None, end=None, freq: str = 'day', group_by: Optional[Sequence[str]] = None,
+              filters: Optional[Dict[str, object]] = None) -> Optional[pd.DataFrame]:
+        """기간 / 집계 단위 / 분류 컬럼별 입출고 집계
+
+        start, end: 포함 구간 (None이면 제한 없음)
+        freq: 'day' | 'week' (월요일 시작) | 'month'
+        group_by: 함께 묶을 분류 컬럼 (예: ['SKU'])
+        filters: {컬럼: 값 또는 값 목록} (예: {'SKU': 'A-100'})
+        반환 컬럼: Date(구간 시작일), group_by..., 입고량, 출고량, 입출고차이
+        """
+        if freq not in FREQ_PERIODS:
+            raise ValueError(f"지원하지 않는 집계 단위: {freq} (day/week/month)")
+        group_by = list(group_by or [])
+
+        with self._lock:
+            if self.inbound_daily is None and self.outbound_daily is None:
+                print("먼저 load_all_data()를 실행하세요.")
+                return None
+
+            parts = []
+            for frame, label in ((self.inbound_daily, '입고량'), (self.outbound_daily, '출고량')):
+                if frame is None:
+                    continue
+                frame = _slice_dates(frame, start, end)
+                for col, value in (filters or {}).items():
+                    if col not in frame.columns:
+                        frame = frame.iloc[0:0]
+                        break
+                    values = value if isinstance(value, (list, tuple, set)) else [value]
+                    frame = frame[frame[col].isin(values)]
+
+                keys = [period_start(frame[DATE_COLUMN], freq).rename(DATE_COLUMN)]
+                for col in group_by:
+                    keys.append(frame[col] if col in frame.columns else pd.Series(pd.NA, index=frame.index, name=col))
+                parts.append(frame[VALUE_COLUMN].groupby(keys, dropna=False).sum().rename(label))
+
+        summary = pd.concat(parts, axis=1).fillna(0).reset_index()
+        for label in ('입고량', '출고량'):
+            if label not in summary.columns:
+                summary[label] = 0.0
+        summary['입출고차이'] = summary['입고량'] - summary['출고량']
+        summary = summary[[DATE_COLUMN] + group_by + ['입고량', '출고량', '입출고차이']]
+        return summary.sort_values(by=[DATE_COLUMN] + group_by, ignore_index=True)
 
     def get_daily_summary(self) -> Optional[pd.DataFrame]:
-        if self.inbound_df is None or self.outbound_df is None:
+        if self.inbound_daily is None or self.outbound_daily is None:
             print("먼저 load_all_data()를 실행하세요.")
             return None
 
-        # 일별 집계
-        inbound_summary = self.inbound_df.groupby('Date')['PalleteQty'].sum().reset_index()
-        inbound_summary = inbound_summary.rename(columns={'PalleteQty': '입고량'})
+        with self._lock:
+            # 파일 상태가 그대로면 이전 집계를 재사용 (호출 측 수정에 대비해 복사본 반환)
+            if self._summary is not None and self._summary_key == self._data_key:
+                return self._summary.copy()
 
-        outbound_summary = self.outbound_df.groupby('Date')['PalleteQty'].sum().reset_index()
-        outbound_summary = outbound_summary.rename(columns={'PalleteQty': '출고량'})
+            summary = self.query(freq='day')
+            self._summary = summary
+            self._summary_key = self._data_key
+            return summary.copy()
+
+
+_analyzers: Dict[str, InOutAnalyzer] = {}
+_analyzers_lock = threading.Lock()
 
-        # 병합
-        summary = pd.merge(inbound_summary, outbound_summary, on='Date', how='outer').fillna(0)
-        summary['입출고차이'] = summary['입고량'] - summary['출고량']
-        return summary.sort_values(by='Date')
 
+def get_analyzer(folder_path: str, cache_dir: Optional[str] = None,
+                 dimensions: Iterable[str] = DEFAULT_DIMENSIONS, parse_workers: int = 1) -> InOutAnalyzer:
+    """폴더별로 공유되는 분석기 (요청 간에 파싱 결과와 집계를 재사용)"""
+    with _analyzers_lock:
+        analyzer = _analyzers.get(folder_path)
+        if analyzer is None:
+            analyzer = InOutAnalyzer(folder_path, cache_dir=cache_dir, dimensions=dimensions,
+                                     parse_workers=parse_workers)
+            _analyzers[folder_path] = analyzer
+        return analyzer
 
 
 if __name__ == '__main__':
-    analyzer = InOutAnalyzer('C:/Users/3sp39/Desktop/InOutBound/') 
+    analyzer = InOutAnalyzer('C:/Users/3sp39/Desktop/InOutBound/')
     analyzer.load_all_data()
     summary = analyzer.get_daily_summary()
     print(summary)
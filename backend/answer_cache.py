@@ -0,0 +1,152 @@
+# answer_cache.py
+
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    """공백/대소문자/끝 문장부호 차이를 없앤 캐시 키용 질문"""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" ?!.？！。")
+
+
+# 숫자/날짜/코드(SKU 등) 토큰과 상대 기간 표현
+# 임베딩으로는 거의 같지만 답이 달라지는 부분이라 유사 질문 적중 시 정확히 일치해야 함
+SPECIFIC_TOKEN_RE = re.compile(r"[a-z]+(?:[-_][a-z0-9]+)+|[a-z]*\d[a-z0-9\-_./:]*")
+RELATIVE_TIME_WORDS = ("그저께", "어제", "오늘", "내일", "지난주", "저번주", "이번주", "다음주", "전주", "금주",
+                       "지난달", "저번달", "이번달", "다음달", "전월", "금월", "작년", "지난해", "올해", "금년", "내년", "최근")
+
+
+def specific_tokens(normalized: str) -> tuple:
+    compact = normalized.replace(" ", "")
+    words = tuple(word for word in RELATIVE_TIME_WORDS if word in compact)
+    return tuple(SPECIFIC_TOKEN_RE.findall(normalized)) + words
+
+
+class AnswerCache:
+    """/ask/ 답변 캐시
+
+    - 키: (인덱스 버전, 답변 모드, 정규화된 질문) → 인덱스가 바뀌면 자동으로 무효
+    - LRU + TTL 기반 제거
+    - similarity_threshold가 있으면 질문 임베딩의 코사인 유사도로 유사 질문도 적중 처리
+      (숫자 / 날짜 / 코드 / 상대 기간 표현이 정확히 같은 질문끼리만 비교: "1월 입고량" ≠ "2월 입고량")
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600,
+                 similarity_threshold: Optional[float] = None,
+                 embed_fn: Optional[Callable[[str], List[float]]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embed_fn = embed_fn
+        self._lock = threading.Lock()
+        # key -> (저장 시각, 값, 질문 임베딩 또는 None)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # 조회 시 계산한 임베딩을 저장 시 재사용
+        self._embedding_memo: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.similarity_threshold is not None and self.embed_fn is not None
+
+    def _embed(self, normalized: str) -> np.ndarray:
+        with self._lock:
+            vector = self._embedding_memo.get(normalized)
+        if vector is not None:
+            return vector
+
+        vector = np.asarray(self.embed_fn(normalized), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        with self._lock:
+            self._embedding_memo[normalized] = vector
+            while len(self._embedding_memo) > 64:
+                self._embedding_memo.popitem(last=False)
+        return vector
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def _purge_expired(self, now: float) -> None:
+        for key in [k for k, (stored_at, _, _) in self._entries.items() if self._expired(stored_at, now)]:
+            del self._entries[key]
+            self._stats["expirations"] += 1
+
+    def get(self, question: str, version: Optional[str], mode: str = "") -> Optional[dict]:
+        normalized = normalize_question(question)
+        key = (version, mode, normalized)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+            if not self.semantic_enabled:
+                self._stats["misses"] += 1
+                return None
+
+        # 유사 질문 검색 (임베딩 계산은 락 밖에서)
+        query_vector = self._embed(normalized)
+        tokens = specific_tokens(normalized)
+        with self._lock:
+            self._purge_expired(now)
+            best_key, best_score = None, -1.0
+            for candidate_key, (_, _, vector) in self._entries.items():
+                if vector is None or candidate_key[:2] != (version, mode):
+                    continue
+                if specific_tokens(candidate_key[2]) != tokens:
+                    continue
+                score = float(np.dot(query_vector, vector))
+                if score > best_score:
+                    best_key, best_score = candidate_key, score
+
+            if best_key is not None and best_score >= self.similarity_threshold:
+                self._entries.move_to_end(best_key)
+                self._stats["semantic_hits"] += 1
+                return self._entries[best_key][1]
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, question: str, version: Optional[str], value: dict, mode: str = "") -> None:
+        normalized = normalize_question(question)
+        vector = self._embed(normalized) if self.semantic_enabled else None
+        with self._lock:
+            key = (version, mode, normalized)
+            self._entries[key] = (time.monotonic(), value, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["semantic_hits"] + self._stats["misses"]
+            hit_count = self._stats["hits"] + self._stats["semantic_hits"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "hit_rate": hit_count / lookups if lookups else 0.0,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+            }
@@ -0,0 +1,42 @@
+# artifacts.py
+
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# 도구가 만든 구조화된 결과(표 등)는 AgentState["artifacts"]로 전달
+# LLM 프롬프트에는 들어가지 않고 응답에만 한 번 직렬화됨
+#   {"이름": {"type": "dataframe", "columns": [...], "data": {컬럼: [값, ...]}, "rows": n}}
+
+# 응답의 dataframe(표 + 차트)으로 내보내는 artifact 이름
+CHART_ARTIFACT = "daily_summary"
+
+
+def dataframe_artifact(df: pd.DataFrame) -> dict:
+    """데이터프레임을 컬럼 단위 배열로 변환 (날짜는 문자열, 값은 파이썬 기본 타입)"""
+    data = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.astype(str)
+        data[str(col)] = series.tolist()
+    return {"type": "dataframe", "columns": [str(col) for col in df.columns], "data": data, "rows": len(df)}
+
+
+def artifact_records(artifact: dict) -> List[dict]:
+    """컬럼 단위 배열 → 행 단위 레코드 (기존 프론트엔드의 dataframe 형식)"""
+    columns = artifact["columns"]
+    arrays = [artifact["data"][col] for col in columns]
+    return [dict(zip(columns, row)) for row in zip(*arrays)]
+
+
+def chart_records(artifacts: Optional[Dict[str, dict]]) -> List[dict]:
+    """프론트엔드 표/차트용 dataframe 레코드
+
+    프론트엔드는 Date / 입고량 / 출고량 / 입출고차이 고정 컬럼을 그리므로 일별 요약(daily_summary)만 사용.
+    집계 빠른 경로의 query_result 등 다른 표는 artifacts로만 전달
+    """
+    artifact = (artifacts or {}).get(CHART_ARTIFACT)
+    if artifact is None or artifact.get("type") != "dataframe":
+        return []
+    return artifact_records(artifact)
@@ -0,0 +1,208 @@
+# batch_retriever.py
+
+import asyncio
+import queue
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from bm25 import reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BatchingRetriever:
+    """동시에 들어온 검색 요청을 모아 한 번에 임베딩 / FAISS 검색하는 마이크로 배처
+
+    - 첫 요청이 도착한 뒤 max_wait_ms 동안(또는 max_batch_size개가 찰 때까지) 요청을 모음
+    - 모인 질문은 embed_documents 한 번, index.search 한 번으로 처리
+    - 호출 측은 search()에서 자기 결과가 나올 때까지 블로킹
+      (asearch()는 스레드를 점유하지 않고 이벤트 루프에서 대기 → 스레드풀 크기와 무관하게 배치가 참)
+    - hybrid=True면 벡터 검색과 BM25 키워드 검색 결과를 RRF로 합쳐 반환
+    - vectorstore_lease가 있으면 인덱스/docstore를 읽는 동안 빌려 씀 (읽는 중에 교체된 버전이 닫히지 않도록)
+    """
+
+    def __init__(self, embeddings, vectorstore_getter: Callable, max_batch_size: int = 32, max_wait_ms: float = 5,
+                 hybrid: bool = False, hybrid_candidates: int = 20, rrf_k: int = 60,
+                 vectorstore_lease: Optional[Callable] = None):
+        self.embeddings = embeddings
+        self.vectorstore_getter = vectorstore_getter
+        self.vectorstore_lease = vectorstore_lease
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.hybrid = hybrid
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "max_batch": 0, "hybrid": 0}
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="batch-retriever", daemon=True)
+                self._worker.start()
+
+    def _vectorstore(self):
+        if self.vectorstore_lease is not None:
+            return self.vectorstore_lease()
+        return nullcontext(self.vectorstore_getter())
+
+    def _submit(self, query: str, k: int) -> Future:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((query, k, future))
+        return future
+
+    def _dense_search(self, query: str, k: int) -> List[Tuple[str, Document, float]]:
+        return self._submit(query, k).result()
+
+    async def _adense_search(self, query: str, k: int) -> List[Tuple[str, Document, float]]:
+        return await asyncio.wrap_future(self._submit(query, k))
+
+    def search_with_scores(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+        """벡터 검색 결과 (Document, L2 거리)"""
+        return [(doc, score) for _, doc, score in self._dense_search(query, k)]
+
+    def hybrid_search(self, query: str, k: int = 3) -> List[Document]:
+        """벡터 + BM25 후보를 reciprocal rank fusion으로 합친 상위 k개
+
+        SKU/날짜처럼 임베딩이 놓치기 쉬운 정확한 키워드를 BM25가 보완.
+        docstore에 역색인이 없으면(예전 저장본) 벡터 검색 결과만 사용
+        """
+        dense = self._dense_search(query, max(k, self.hybrid_candidates))
+        return self._fuse(query, k, dense)
+
+    def _fuse(self, query: str, k: int, dense: List[Tuple[str, Document, float]]) -> List[Document]:
+        with self._vectorstore() as vectorstore:
+            return self._fuse_with(vectorstore, query, k, dense)
+
+    def _fuse_with(self, vectorstore, query: str, k: int, dense: List[Tuple[str, Document, float]]) -> List[Document]:
+        candidates = max(k, self.hybrid_candidates)
+        docstore = getattr(vectorstore, "docstore", None)
+        if not hasattr(docstore, "bm25_search"):
+            return [doc for _, doc, _ in dense[:k]]
+        sparse = docstore.bm25_search(query, candidates)
+
+        docs = {doc_id: doc for doc_id, doc, _ in dense}
+        fused = reciprocal_rank_fusion(
+            [[doc_id for doc_id, _, _ in dense], [doc_id for doc_id, _ in sparse]], k=self.rrf_k
+        )
+        with self._lock:
+            self._stats["hybrid"] += 1
+
+        results = []
+        for doc_id, _ in fused:
+            doc = docs.get(doc_id)
+            if doc is None:
+                doc = docstore.search(doc_id)
+            if isinstance(doc, Document):
+                results.append(doc)
+            if len(results) == k:
+                break
+        return results
+
+    def search(self, query: str, k: int = 3) -> List[Document]:
+        if self.hybrid:
+            return self.hybrid_search(query, k)
+        return [doc for doc, _ in self.search_with_scores(query, k)]
+
+    async def asearch(self, query: str, k: int = 3) -> List[Document]:
+        """search()의 비동기 버전 (임베딩/FAISS 배치를 기다리는 동안 스레드를 점유하지 않음)"""
+        if not self.hybrid:
+            return [doc for _, doc, _ in await self._adense_search(query, k)]
+        dense = await self._adense_search(query, max(k, self.hybrid_candidates))
+        # BM25 조회(SQLite)는 동기 작업이라 CPU 스레드풀에서
+        from executor import run_blocking
+        return await run_blocking(self._fuse, query, k, dense)
+
+    def close(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(_STOP)
+            self._worker.join(timeout=1)
+        self._worker = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_batch"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _collect_batch(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect_batch(first)
+            try:
+                results = self._search_batch([q for q, _, _ in batch], [k for _, k, _ in batch])
+                for (_, _, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"배치 검색 실패: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._lock:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+
+    def _search_batch(self, queries: List[str], ks: List[int]) -> List[List[Tuple[str, Document, float]]]:
+        with self._vectorstore() as vectorstore:
+            return self._search_batch_with(vectorstore, queries, ks)
+
+    def _search_batch_with(self, vectorstore, queries: List[str],
+                           ks: List[int]) -> List[List[Tuple[str, Document, float]]]:
+        if vectorstore is None or vectorstore.index.ntotal == 0:
+            return [[] for _ in queries]
+
+        vectors = np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32)
+        if getattr(vectorstore, "_normalize_L2", False):
+            import faiss
+            faiss.normalize_L2(vectors)
+
+        max_k = min(max(ks), vectorstore.index.ntotal)
+        scores, indices = vectorstore.index.search(vectors, max_k)
+
+        results = []
+        for row_scores, row_indices, k in zip(scores, indices, ks):
+            hits = []
+            for score, idx in zip(row_scores[:k], row_indices[:k]):
+                if idx == -1:
+                    continue
+                doc_id = vectorstore.index_to_docstore_id[idx]
+                doc = vectorstore.docstore.search(doc_id)
+                if isinstance(doc, Document):
+                    hits.append((doc_id, doc, float(score)))
+            results.append(hits)
+        return results
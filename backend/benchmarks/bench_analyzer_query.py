@@ -0,0 +1,74 @@
+# benchmarks/bench_analyzer_query.py
+#
+# 합성 입/출고 데이터(월별 CSV)로 기존 방식(전체 원본 concat 후 groupby)과
+# 일별 롤업 기반 InOutAnalyzer.query()의 로드 / 질의 시간을 비교
+#
+# 실행: backend 디렉토리에서 `python benchmarks/bench_analyzer_query.py [년수] [SKU수] [일별행수]`
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import InOutAnalyzer  # noqa: E402
+
+
+def write_synthetic(folder, years, num_skus, rows_per_day):
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2020-01-01", periods=365 * years, freq="D")
+    for kind in ("inbound", "outbound"):
+        for month, month_days in pd.Series(days).groupby(days.to_period("M")):
+            n = len(month_days) * rows_per_day
+            df = pd.DataFrame({
+                "Date": np.repeat(month_days.dt.strftime("%Y-%m-%d").values, rows_per_day),
+                "SKU": rng.choice([f"SKU-{i:04d}" for i in range(num_skus)], n),
+                "Location": rng.choice(["A", "B", "C"], n),
+                "PalleteQty": rng.integers(1, 20, n),
+                "Memo": "x" * 20,
+            })
+            df.to_csv(os.path.join(folder, f"{kind}_{month}.csv"), index=False)
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<40} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def legacy_daily_summary(folder):
+    frames = {"inbound": [], "outbound": []}
+    for file in os.listdir(folder):
+        frames[file.split("_")[0]].append(pd.read_csv(os.path.join(folder, file)))
+    inbound = pd.concat(frames["inbound"], ignore_index=True)
+    outbound = pd.concat(frames["outbound"], ignore_index=True)
+    inbound["Date"] = pd.to_datetime(inbound["Date"])
+    outbound["Date"] = pd.to_datetime(outbound["Date"])
+    return pd.merge(inbound.groupby("Date")["PalleteQty"].sum().reset_index(),
+                    outbound.groupby("Date")["PalleteQty"].sum().reset_index(), on="Date", how="outer")
+
+
+if __name__ == '__main__':
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    num_skus = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rows_per_day = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+
+    with tempfile.TemporaryDirectory() as folder:
+        write_synthetic(folder, years, num_skus, rows_per_day)
+        print(f"years={years} skus={num_skus} rows/day={rows_per_day} files={len(os.listdir(folder))}")
+
+        timed("before: 전체 로드 + 전체 일별 집계", lambda: legacy_daily_summary(folder))
+
+        analyzer = InOutAnalyzer(folder)
+        timed("after:  롤업 로드 (최초)", analyzer.load_all_data)
+        timed("after:  롤업 로드 (변경 없음)", analyzer.load_all_data)
+        timed("after:  전체 일별 요약", analyzer.get_daily_summary)
+        timed("after:  1주 일별", lambda: analyzer.query("2021-03-01", "2021-03-07"))
+        timed("after:  1년 주별", lambda: analyzer.query("2021-01-01", "2021-12-31", freq="week"))
+        timed("after:  전체 월별 x SKU", lambda: analyzer.query(freq="month", group_by=["SKU"]))
+        timed("after:  1개 SKU 월별", lambda: analyzer.query(freq="month", filters={"SKU": "SKU-0001"}))
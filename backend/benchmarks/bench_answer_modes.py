@@ -0,0 +1,44 @@
+# benchmarks/bench_answer_modes.py
+#
+# single 모드(검색 결과로 한 번만 생성)와 two_pass 모드(도구 답변 → 한국어 재정리)의
+# 질문당 지연 시간 비교. 벡터 DB가 구축되어 있고 Ollama가 실행 중이어야 함.
+#
+# 실행: backend 디렉토리에서 `python benchmarks/bench_answer_modes.py [반복횟수]`
+
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_graph import get_agent_graph  # noqa: E402
+
+QUESTIONS = [
+    "입고 데이터에 어떤 항목들이 있나요?",
+    "출고 기록에는 어떤 거래처가 나오나요?",
+    "문서 내용을 요약해줘",
+]
+
+
+def run(mode, repeat):
+    graph = get_agent_graph()
+    latencies = []
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            graph.invoke({"question": question, "answer_mode": mode})
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    results = {mode: run(mode, repeat) for mode in ("two_pass", "single")}
+
+    print(f"{'mode':<10} {'mean(s)':>9} {'p50(s)':>9} {'max(s)':>9}")
+    for mode, latencies in results.items():
+        print(f"{mode:<10} {statistics.mean(latencies):9.2f} "
+              f"{statistics.median(latencies):9.2f} {max(latencies):9.2f}")
+    speedup = statistics.mean(results["two_pass"]) / statistics.mean(results["single"])
+    print(f"single 모드 평균 속도 향상: x{speedup:.2f}")
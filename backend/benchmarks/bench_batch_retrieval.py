@@ -0,0 +1,93 @@
+# benchmarks/bench_batch_retrieval.py
+#
+# 동시 검색 요청 처리량 비교
+# - before: 요청마다 similarity_search (질문 1개씩 임베딩 + 검색)
+# - after:  BatchingRetriever (동시 요청을 모아 배치 임베딩 + 배치 검색)
+#   - search() on CPU_WORKERS threads: 서버에서 run_blocking으로 호출할 때와 같은 조건 (배치 크기 ≤ CPU_WORKERS)
+#   - asearch(): 그래프 async 노드처럼 이벤트 루프에서 대기 (배치 크기가 동시 요청 수까지 커짐)
+# 벡터 DB가 구축되어 있어야 함.
+#
+# 실행: backend 디렉토리에서
+#   python benchmarks/bench_batch_retrieval.py [동시요청수] [요청수] [max_batch] [max_wait_ms]
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_retriever import BatchingRetriever  # noqa: E402
+from config import CPU_WORKERS, VECTOR_DB_DIR  # noqa: E402
+from registry import ResourceRegistry  # noqa: E402
+
+QUESTIONS = [
+    "입고량이 가장 많은 날",
+    "출고 데이터 항목",
+    "PalleteQty 합계",
+    "재고 차이가 큰 날짜",
+    "최근 입고 내역",
+    "창고별 출고량",
+]
+
+
+def run(label, search, concurrency, total):
+    queries = [QUESTIONS[i % len(QUESTIONS)] + f" {i}" for i in range(total)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda q: search(q, 3), queries))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {total / elapsed:8.1f} queries/s  ({elapsed * 1000 / total:.2f} ms/query)")
+
+
+def run_async(label, asearch, concurrency, total):
+    queries = [QUESTIONS[i % len(QUESTIONS)] + f" {i}" for i in range(total)]
+
+    async def main():
+        limiter = asyncio.Semaphore(concurrency)
+
+        async def one(q):
+            async with limiter:
+                return await asearch(q, 3)
+
+        await asyncio.gather(*(one(q) for q in queries))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {total / elapsed:8.1f} queries/s  ({elapsed * 1000 / total:.2f} ms/query)")
+
+
+if __name__ == '__main__':
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    max_batch = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    max_wait_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 5
+
+    registry = ResourceRegistry(VECTOR_DB_DIR)
+    vectorstore = registry.get_vectorstore()
+    if vectorstore is None:
+        sys.exit("벡터 DB가 없습니다. 먼저 문서를 업로드하세요.")
+
+    def new_retriever():
+        retriever = BatchingRetriever(registry.processor.embeddings, registry.get_vectorstore,
+                                      max_batch_size=max_batch, max_wait_ms=max_wait_ms)
+        retriever.search("warmup", k=3)
+        return retriever
+
+    vectorstore.similarity_search("warmup", k=3)
+
+    print(f"concurrency={concurrency} total={total} max_batch={max_batch} max_wait_ms={max_wait_ms}")
+    run("before: similarity_search", lambda q, k: vectorstore.similarity_search(q, k=k), concurrency, total)
+
+    retriever = new_retriever()
+    run(f"after:  search() x{min(concurrency, CPU_WORKERS)} threads", retriever.search,
+        min(concurrency, CPU_WORKERS), total)
+    print(f"batch stats: {retriever.stats()}")
+    retriever.close()
+
+    retriever = new_retriever()
+    run_async("after:  asearch() on event loop", retriever.asearch, concurrency, total)
+    print(f"batch stats: {retriever.stats()}")
+    retriever.close()
@@ -0,0 +1,29 @@
+# benchmarks/bench_graph_build.py
+#
+# 요청마다 그래프를 빌드/컴파일하던 방식과 캐시된 그래프를 재사용하는 방식의
+# 요청당 오버헤드 비교 (LLM/도구 호출은 포함하지 않음)
+#
+# 실행: backend 디렉토리에서 `python benchmarks/bench_graph_build.py`
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_graph import build_agent_graph, get_agent_graph  # noqa: E402
+
+
+def bench(label, func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / n * 1000:10.3f} ms/request  (n={n})")
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    get_agent_graph()  # 캐시 준비
+    bench("before: build_agent_graph()", build_agent_graph, n)
+    bench("after:  get_agent_graph()", get_agent_graph, n)
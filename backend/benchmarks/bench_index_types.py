@@ -0,0 +1,74 @@
+# benchmarks/bench_index_types.py
+#
+# 현재 벡터 DB의 벡터로 인덱스 종류별 recall@k / 검색 지연 시간을 Flat 기준과 비교
+# 질의는 저장된 문서 일부를 다시 임베딩해 사용 (자기 자신 외의 이웃까지 포함한 recall 측정)
+#
+# 실행: backend 디렉토리에서 `python benchmarks/bench_index_types.py [질의수] [k]`
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import INDEX_OPTIONS, VECTOR_DB_DIR  # noqa: E402
+from index_factory import (  # noqa: E402
+    choose_index_type,
+    create_index,
+    factory_string,
+    is_lossy,
+    reconstruct_all,
+    set_search_params,
+)
+from registry import ResourceRegistry  # noqa: E402
+
+
+def measure(label, index, queries, truth, k):
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    elapsed = time.perf_counter() - start
+    recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+    print(f"{label:<24} recall@{k}={recall:6.3f}  {elapsed * 1000 / len(queries):8.3f} ms/query")
+
+
+if __name__ == '__main__':
+    num_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    registry = ResourceRegistry(VECTOR_DB_DIR)
+    vectorstore = registry.get_vectorstore()
+    if vectorstore is None:
+        sys.exit("벡터 DB가 없습니다. 먼저 문서를 업로드하세요.")
+
+    processor = registry.processor
+    if is_lossy(vectorstore.index):
+        docs = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+                for i in range(vectorstore.index.ntotal)]
+        vectors = processor._embed_documents(docs)
+    else:
+        vectors = reconstruct_all(vectorstore.index).astype(np.float32)
+    n, dim = vectors.shape
+    k = min(k, n)
+    print(f"벡터 {n}개, 차원 {dim}, 질의 {num_queries}개")
+
+    rng = np.random.default_rng(0)
+    picks = rng.choice(n, size=min(num_queries, n), replace=False)
+    queries = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content for i in picks]
+    query_vectors = np.asarray(processor.embeddings.embed_documents(queries), dtype=np.float32)
+
+    flat = create_index("Flat", vectors)
+    flat.add(vectors)
+    _, truth = flat.search(query_vectors, k)
+    measure("Flat (baseline)", flat, query_vectors, truth, k)
+
+    for index_type in ("ivf", "hnsw", "ivfpq"):
+        resolved = choose_index_type(index_type, n, INDEX_OPTIONS["flat_max"], INDEX_OPTIONS["ivf_max"])
+        spec = factory_string(resolved, dim, n, INDEX_OPTIONS["hnsw_m"])
+        start = time.perf_counter()
+        index = create_index(spec, vectors)
+        index.add(vectors)
+        build_ms = (time.perf_counter() - start) * 1000
+        set_search_params(index, INDEX_OPTIONS["nprobe"], INDEX_OPTIONS["ef_search"])
+        measure(f"{spec} ({build_ms:.0f}ms)", index, query_vectors, truth, k)
@@ -0,0 +1,137 @@
+# benchmarks/bench_llm_gateway.py
+#
+# 로컬 스텁 Ollama 서버(/api/generate)에 LLMGateway로 동시 요청을 보내
+# 동시성 제한 / 대기열 통계 / 재시도 / 연결 재사용을 확인
+# - 스텁은 앞의 N개 요청을 503으로 실패시키고, 요청마다 토큰 지연을 흉내냄
+# - 서버가 본 최대 동시 요청 수가 LLM_MAX_CONCURRENCY 이하인지, 연결(포트) 수가 풀 크기 이하인지 출력
+#
+# 실행: backend 디렉토리에서 `python benchmarks/bench_llm_gateway.py [요청수] [동시성제한] [실패수]`
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_gateway import LLMGateway  # noqa: E402
+
+TOKENS = ["스텁", " 응답", " 입니다", "."]
+TOKEN_DELAY = 0.02
+
+
+class StubState:
+    def __init__(self, fail_first):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.fail_first = fail_first
+        self.clients = set()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    state: StubState = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        state = self.state
+        with state.lock:
+            state.requests += 1
+            state.clients.add(self.client_address)
+            fail = state.requests <= state.fail_first
+            state.active += 1
+            state.peak = max(state.peak, state.active)
+        try:
+            if fail:
+                payload = b'{"error":"server busy"}'
+                self.send_response(503)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            prompt_tokens = len(body.get("prompt", "")) // 4
+            final = {"model": body.get("model"), "response": "", "done": True,
+                     "prompt_eval_count": prompt_tokens, "eval_count": len(TOKENS), "load_duration": 0}
+            if body.get("stream", True):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for token in TOKENS:
+                    time.sleep(TOKEN_DELAY)
+                    line = {"model": body.get("model"), "response": token, "done": False}
+                    self._send_chunk(json.dumps(line).encode() + b"\n")
+                self._send_chunk(json.dumps(final).encode() + b"\n")
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                time.sleep(TOKEN_DELAY * len(TOKENS))
+                payload = json.dumps({**final, "response": "".join(TOKENS)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+        finally:
+            with state.lock:
+                state.active -= 1
+
+
+def start_stub(fail_first):
+    state = StubState(fail_first)
+    handler = type("Handler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+async def run_async(gateway, n):
+    async def one(i):
+        return "".join([token async for token in gateway.astream(f"질문 {i}")])
+    return await asyncio.gather(*(one(i) for i in range(n)))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    cap = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    fail_first = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    server, state = start_stub(fail_first)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    gateway = LLMGateway(base_url=url, max_concurrency=cap, retry_backoff=0.05, max_connections=cap)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        sync_answers = list(pool.map(lambda i: gateway.invoke(f"질문 {i}"), range(n // 2)))
+        stream_answers = list(pool.map(lambda i: "".join(gateway.stream(f"질문 {i}")), range(n // 2)))
+    async_answers = asyncio.run(run_async(gateway, n // 2))
+    elapsed = time.perf_counter() - start
+
+    answers = sync_answers + stream_answers + async_answers
+    expected = "".join(TOKENS)
+    print(f"요청 {len(answers)}개 / {elapsed:.2f}s, 정상 응답 {sum(a == expected for a in answers)}개")
+    print(f"서버 관측 최대 동시 요청: {state.peak} (제한 {cap})")
+    print(f"서버가 받은 요청: {state.requests} (앞의 {fail_first}개는 503), 클라이언트 연결 수: {len(state.clients)}")
+    stats = gateway.stats()
+    for key in ("requests", "completed", "failed", "retries", "max_in_flight", "max_waiting",
+                "avg_wait_seconds", "wait_seconds_max", "avg_generation_seconds", "prompt_eval_tokens"):
+        print(f"  {key:<24} {stats[key]}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_parallel_parse.py
+#
+# 합성 입/출고 파일 수백 개로 순차 파싱과 프로세스 풀 병렬 파싱(map_files)을 비교
+# - 업로드 경로: parse_documents (문서 청크 생성)
+# - 분석기 경로: read_rollup (필요 컬럼만 읽어 일별 롤업)
+# 업로드 경로는 행 묶음 스트리밍(pandas chunksize / openpyxl read-only),
+# 분석기 경로는 CSV pyarrow / XLSX calamine (설치되어 있을 때)
+#
+# 실행: backend 디렉토리에서 `python benchmarks/bench_parallel_parse.py [파일수] [파일당행수] [워커수] [xlsx비율]`
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import DEFAULT_DIMENSIONS, read_rollup  # noqa: E402
+from config import TABLE_ROWS_PER_CHUNK  # noqa: E402
+from parsing import HAS_CALAMINE, HAS_PYARROW, map_files, parse_documents, shutdown_parse_pool  # noqa: E402
+
+
+def write_files(folder, num_files, rows, xlsx_ratio):
+    rng = np.random.default_rng(0)
+    paths = []
+    num_xlsx = int(num_files * xlsx_ratio)
+    for i in range(num_files):
+        kind = "inbound" if i % 2 == 0 else "outbound"
+        df = pd.DataFrame({
+            "Date": pd.date_range("2023-01-01", periods=rows, freq="h").strftime("%Y-%m-%d"),
+            "SKU": rng.choice([f"SKU-{n:04d}" for n in range(100)], rows),
+            "Location": rng.choice(["A", "B", "C"], rows),
+            "PalleteQty": rng.integers(1, 20, rows),
+            "Memo": "비고",
+        })
+        if i < num_xlsx:
+            path = os.path.join(folder, f"{kind}_{i:04d}.xlsx")
+            df.to_excel(path, index=False)
+        else:
+            path = os.path.join(folder, f"{kind}_{i:04d}.csv")
+            df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    results = func()
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results.values() if isinstance(r, Exception))
+    print(f"{label:<36} {elapsed:8.2f} s  ({len(results) / elapsed:7.1f} files/s, 실패 {failed})")
+
+
+if __name__ == '__main__':
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 4
+    xlsx_ratio = float(sys.argv[4]) if len(sys.argv) > 4 else 0.2
+
+    print(f"files={num_files} rows/file={rows} workers={workers} xlsx={xlsx_ratio:.0%} "
+          f"pyarrow={HAS_PYARROW} calamine={HAS_CALAMINE}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = write_files(folder, num_files, rows, xlsx_ratio)
+
+        timed("upload   순차", lambda: map_files(parse_documents, paths, TABLE_ROWS_PER_CHUNK, workers=1))
+        # 첫 병렬 호출은 워커 프로세스 기동 비용 포함
+        timed("upload   병렬 (풀 기동 포함)", lambda: map_files(parse_documents, paths, TABLE_ROWS_PER_CHUNK, workers=workers))
+        timed("upload   병렬", lambda: map_files(parse_documents, paths, TABLE_ROWS_PER_CHUNK, workers=workers))
+        timed("analyzer 순차", lambda: map_files(read_rollup, paths, DEFAULT_DIMENSIONS, workers=1))
+        timed("analyzer 병렬", lambda: map_files(read_rollup, paths, DEFAULT_DIMENSIONS, workers=workers))
+
+    shutdown_parse_pool()
@@ -0,0 +1,78 @@
+# benchmarks/bench_prompt_prefix.py
+#
+# 연속된 요청 사이에 프롬프트 앞부분(prefix)이 얼마나 같은지 비교 (Ollama KV 캐시 재사용 가능 구간)
+# - legacy: 이전 시각화 프롬프트 (검색 문맥 → 시각화 데이터 → 질문, 들여쓰기 포함)
+# - prompts: prompts.build_prompt (시스템 프롬프트 → 지시문 → 시각화 데이터 → 검색 문맥 → 질문)
+# --ollama를 주면 실제 Ollama 서버(config.LLM_BASE_URL)로 보내 요청별 prefill 토큰 수(prompt_eval_count)를 출력
+#
+# 실행: backend 디렉토리에서 `python benchmarks/bench_prompt_prefix.py [--ollama]`
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompts import SYSTEM_PROMPT, build_prompt  # noqa: E402
+
+LEGACY_TEMPLATE = """
+        다음 문서와 시각화 데이터를 참고하여 질문에 답해주세요:
+
+        기존 문서 및 시각화 데이터:
+        {context}
+
+        새로운 시각화 데이터:
+        {get_daily_summary}
+
+        질문: {question}
+
+        답변: (시각화 데이터를 활용하여 구체적으로 답변해주세요)
+        """
+
+# 업로드가 바뀌기 전까지 같은 일별 요약 표 / 질문마다 달라지는 검색 문맥
+TABLE = "| Date | 입고량 | 출고량 | 입출고차이 |\n|---|---|---|---|\n" + "\n".join(
+    f"| 2024-01-{day:02d} | {100 + day * 3} | {90 + day * 2} | {10 + day} |" for day in range(1, 31))
+QUESTIONS = [
+    ("1월 입고 추이를 설명해줘", "SKU-A12 1월 입고 기록 ... 창고 A"),
+    ("출고가 가장 많은 날은 언제야?", "출고 기록: 2024-01-17 대량 출고 ... 거래처 B"),
+    ("입출고 차이가 커진 이유가 뭐야?", "반품 처리 내역 ... 재고 조정 메모"),
+]
+
+
+def common_prefix(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def report(label, prompts):
+    print(label)
+    for i, prompt in enumerate(prompts):
+        shared = common_prefix(prompts[i - 1], prompt) if i else 0
+        print(f"  요청 {i + 1}: {len(prompt):5d}자, 직전 요청과 같은 prefix {shared:5d}자 ({shared / len(prompt):.0%})")
+
+
+def main():
+    legacy = [LEGACY_TEMPLATE.format(context=context, get_daily_summary=TABLE, question=q) for q, context in QUESTIONS]
+    current = [build_prompt("visualization", q, ("시각화 데이터", TABLE), ("문서 내용", context))
+               for q, context in QUESTIONS]
+    report("legacy", legacy)
+    # 새 방식은 게이트웨이가 시스템 프롬프트를 모든 요청의 맨 앞에 붙임
+    report("prompts", [SYSTEM_PROMPT + "\n" + prompt for prompt in current])
+
+    if "--ollama" in sys.argv:
+        from llm_gateway import get_llm, track_usage
+        llm = get_llm(num_predict=1)
+        print("ollama (prompt_eval_count는 KV 캐시에서 재사용하지 못해 새로 계산한 토큰 수)")
+        for label, prompts in (("legacy", legacy), ("prompts", current)):
+            for i, prompt in enumerate(prompts):
+                with track_usage() as usage:
+                    llm.invoke(prompt)
+                print(f"  {label:<8} 요청 {i + 1}: prefill {usage['prompt_eval_tokens']:5d} tok "
+                      f"/ {usage['prompt_eval_ms']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_router.py
+#
+# 라벨이 붙은 질문으로 도구 라우팅 정확도 / 지연 시간을 측정
+# - legacy: 기존 KEYWORD_TOOL_MAP 부분 문자열 검사
+# - keyword: IntentRouter 컴파일된 정규식만 사용
+# - embedding: 키워드 + 공유 임베딩 모델 최근접 중심 분류 (--embed, 임베딩 모델 로드 필요)
+#
+# 실행: backend 디렉토리에서 `python benchmarks/bench_router.py [--embed] [반복수]`
+
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from router import IntentRouter  # noqa: E402
+
+# (질문, 정답 도구) — router.TOOL_EXAMPLES와 겹치지 않게 작성
+LABELED = [
+    ("업로드한 문서 요약해줘", "summarize"),
+    ("전체 내용을 정리해줘", "summarize"),
+    ("파일들 요약 부탁해", "summarize"),
+    ("자료의 핵심만 간단히 말해줘", "summarize"),
+    ("문서 내용을 짧게 줄여서 알려줘", "summarize"),
+    ("입출고 시각화해줘", "visualization"),
+    ("입고량 그래프 보여줘", "visualization"),
+    ("출고 추이를 차트로 그려줘", "visualization"),
+    ("날짜별 입고와 출고 변화를 보여줘", "visualization"),
+    ("일자별 물량 흐름을 그림으로 보고 싶어", "visualization"),
+    ("SKU-A12 관련 문서 검색해줘", "search_documents"),
+    ("반품 기록을 찾아줘", "search_documents"),
+    ("B창고 데이터 찾기", "search_documents"),
+    ("거래처 정보가 들어 있는 행을 알려줘", "search_documents"),
+    ("문서에서 파손이라는 단어가 나오는 곳 보여줘", "search_documents"),
+    ("입고 데이터에는 어떤 컬럼이 있어?", "default"),
+    ("PalleteQty는 무슨 의미야?", "default"),
+    ("이 데이터는 어느 기간을 다뤄?", "default"),
+    ("출고 파일 형식이 어떻게 돼?", "default"),
+    ("안녕하세요", "default"),
+]
+
+LEGACY_MAP = {
+    ("요약", "정리", "요약해"): "summarize",
+    ("시각화"): "visualization",
+    ("검색", "찾아", "찾기"): "search_documents"
+}
+
+
+def legacy_route(question):
+    question = question.lower()
+    for keywords, tool_name in LEGACY_MAP.items():
+        if any(kw in question for kw in keywords):
+            return tool_name
+    return "default"
+
+
+def evaluate(label, route, repeat):
+    correct = sum(route(q) == expected for q, expected in LABELED)
+    mistakes = Counter((expected, route(q)) for q, expected in LABELED if route(q) != expected)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question, _ in LABELED:
+            route(question)
+    per_call = (time.perf_counter() - start) / (repeat * len(LABELED)) * 1e6
+
+    print(f"{label:<12} 정확도 {correct}/{len(LABELED)} ({correct / len(LABELED):.0%})  {per_call:10.2f} µs/질문")
+    for (expected, got), n in mistakes.items():
+        print(f"{'':<12}  {expected} → {got} ({n}건)")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != "--embed"]
+    repeat = int(args[0]) if args else 2000
+
+    evaluate("legacy", legacy_route, repeat)
+    evaluate("keyword", IntentRouter().route, repeat)
+
+    if "--embed" in sys.argv:
+        from config import ROUTER_MIN_SIMILARITY
+        from registry import get_registry
+        embeddings = get_registry().processor.embeddings
+        router = IntentRouter(embed_query=embeddings.embed_query, embed_documents=embeddings.embed_documents,
+                              min_similarity=ROUTER_MIN_SIMILARITY, cache_size=0)
+        # 임베딩 경로는 질문마다 모델을 호출하므로 반복 수를 줄여 측정
+        evaluate("embedding", router.route, max(repeat // 1000, 1))
+
+
+if __name__ == "__main__":
+    main()
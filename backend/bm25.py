@@ -0,0 +1,132 @@
+# bm25.py
+
+import math
+import re
+import sqlite3
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bm25_terms (
+    term TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    tf INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bm25_terms_term ON bm25_terms (term);
+CREATE INDEX IF NOT EXISTS bm25_terms_doc ON bm25_terms (doc_id);
+CREATE TABLE IF NOT EXISTS bm25_docs (
+    doc_id TEXT PRIMARY KEY,
+    length INTEGER NOT NULL
+);
+"""
+
+# 날짜 / 영문·숫자 코드(SKU 등, 하이픈·밑줄 포함) / 한글 어절
+TOKEN_RE = re.compile(
+    r"(\d{4})[-./](\d{1,2})[-./](\d{1,2})"
+    r"|[a-z0-9]+(?:[-_][a-z0-9]+)*"
+    r"|[가-힣]+"
+)
+
+# 어절 끝에서 떼어낼 대표적인 조사 (긴 것부터)
+JOSA = ("에서", "으로", "에게", "까지", "부터", "은", "는", "이", "가", "을", "를", "의", "에", "로", "와", "과", "도", "만")
+
+
+def _strip_josa(word: str) -> str:
+    for josa in JOSA:
+        if len(word) > len(josa) + 1 and word.endswith(josa):
+            return word[:-len(josa)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """형태소 분석기 없이 쓰는 한국어 대응 토크나이저
+
+    - 날짜는 YYYY-MM-DD로 정규화
+    - SKU 같은 코드는 전체 + 하이픈/밑줄로 나눈 조각
+    - 한글은 조사를 뗀 어절 + 글자 bigram (복합어/띄어쓰기 차이 대응)
+    """
+    tokens = []
+    for match in TOKEN_RE.finditer(text.lower()):
+        if match.group(1):
+            year, month, day = match.group(1), match.group(2), match.group(3)
+            tokens.append(f"{year}-{int(month):02d}-{int(day):02d}")
+            continue
+
+        token = match.group()
+        if "가" <= token[0] <= "힣":
+            word = _strip_josa(token)
+            tokens.append(word)
+            if len(word) > 2:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(token)
+            parts = re.split(r"[-_]", token)
+            if len(parts) > 1:
+                tokens.extend(p for p in parts if p)
+    return tokens
+
+
+def index_documents(conn: sqlite3.Connection, items: Iterable[Tuple[str, str]]) -> None:
+    """(doc_id, text) 목록을 역색인에 추가 (호출 측 트랜잭션 안에서 실행)"""
+    term_rows = []
+    doc_rows = []
+    for doc_id, text in items:
+        counts = Counter(tokenize(text))
+        doc_rows.append((doc_id, sum(counts.values())))
+        term_rows.extend((term, doc_id, tf) for term, tf in counts.items())
+    conn.executemany("INSERT OR REPLACE INTO bm25_docs (doc_id, length) VALUES (?, ?)", doc_rows)
+    conn.executemany("INSERT INTO bm25_terms (term, doc_id, tf) VALUES (?, ?, ?)", term_rows)
+
+
+def delete_documents(conn: sqlite3.Connection, doc_ids: Sequence[str]) -> None:
+    rows = [(doc_id,) for doc_id in doc_ids]
+    conn.executemany("DELETE FROM bm25_terms WHERE doc_id = ?", rows)
+    conn.executemany("DELETE FROM bm25_docs WHERE doc_id = ?", rows)
+
+
+def corpus_stats(conn: sqlite3.Connection) -> Tuple[int, float]:
+    """(문서 수, 평균 문서 길이)"""
+    count, avg_length = conn.execute("SELECT COUNT(*), AVG(length) FROM bm25_docs").fetchone()
+    return count, avg_length or 0.0
+
+
+def search(conn: sqlite3.Connection, query: str, k: int, stats: Tuple[int, float],
+           k1: float = 1.2, b: float = 0.75, max_df_ratio: float = 0.5) -> List[Tuple[str, float]]:
+    """BM25 상위 k개 (doc_id, score)
+
+    문서의 max_df_ratio 이상에 등장하는 흔한 토큰은 점수 기여가 작고 포스팅이 길어
+    다른 토큰이 있으면 건너뜀 (검색 비용을 쿼리의 희귀 토큰 수준으로 제한)
+    """
+    num_docs, avg_length = stats
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms or num_docs == 0:
+        return []
+
+    dfs = {}
+    for term in terms:
+        dfs[term] = conn.execute("SELECT COUNT(*) FROM bm25_terms WHERE term = ?", (term,)).fetchone()[0]
+    rare_terms = [t for t in terms if 0 < dfs[t] <= num_docs * max_df_ratio]
+    selected = rare_terms or [t for t in terms if dfs[t] > 0]
+
+    scores: Dict[str, float] = defaultdict(float)
+    for term in selected:
+        df = dfs[term]
+        idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+        rows = conn.execute(
+            "SELECT t.doc_id, t.tf, d.length FROM bm25_terms t JOIN bm25_docs d ON d.doc_id = t.doc_id "
+            "WHERE t.term = ?", (term,)
+        )
+        for doc_id, tf, length in rows:
+            norm = k1 * (1 - b + b * length / avg_length) if avg_length else k1
+            scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """여러 순위 목록(doc_id 순서)을 RRF 점수로 합침"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,4 +1,114 @@
 UPLOAD_DIR = "uploaded_docs"
 VECTOR_DB_DIR = "vector_db"
 
-TOTAL_DOCS_NUM = 0
\ No newline at end of file
+TOTAL_DOCS_NUM = 0
+
+# 임베딩 시 한 번에 처리할 문서(청크) 수
+EMBED_BATCH_SIZE = 64
+
+# CSV/XLSX를 문서로 나눌 때 한 문서에 담을 행 수 (헤더는 매 문서마다 반복)
+TABLE_ROWS_PER_CHUNK = 50
+
+# 최종 답변 생성 방식
+# - "single": 도구는 검색만 하고 최종 답변을 한 번의 LLM 호출로 생성
+# - "two_pass": 도구가 답변을 만든 뒤 한국어 최종 답변으로 한 번 더 정리 (기존 방식)
+ANSWER_MODE = "single"
+
+# 집계형 질문("지난주 입고량 합계" 등)은 분석기에서 직접 계산해 답변 (LLM 호출 없음)
+QUERY_PLANNER_ENABLED = True
+# True면 계산 결과를 LLM으로 한 번 더 자연스럽게 다듬음 (숫자는 그대로)
+QUERY_PLANNER_LLM_PHRASING = False
+QUERY_PLANNER_TOP_N = 5
+
+# 도구 라우팅: 키워드가 없는 질문은 공유 임베딩 모델로 도구별 예시 질문과 비교해 분류
+ROUTER_EMBEDDING_FALLBACK = True
+# 가장 가까운 도구의 코사인 유사도가 이 값보다 낮으면 default 도구 사용
+ROUTER_MIN_SIMILARITY = 0.80
+
+# Ollama LLM 설정 (모든 도구 / 그래프 노드가 llm_gateway의 공유 게이트웨이 하나를 사용)
+LLM_MODEL = "llama3"
+LLM_BASE_URL = "http://localhost:11434"
+LLM_TEMPERATURE = 0.1
+# 마지막 요청 후 모델을 메모리에 유지할 시간 (Ollama 기본값은 5분)
+LLM_KEEP_ALIVE = "30m"
+# Ollama 서버로 동시에 보낼 생성 요청 수 (서버의 OLLAMA_NUM_PARALLEL에 맞춤, 초과 요청은 대기)
+LLM_MAX_CONCURRENCY = 4
+# 대기열에서 기다릴 최대 시간(초). None이면 무제한
+LLM_QUEUE_TIMEOUT = 120
+# 연결 / 요청 전체 타임아웃(초)
+LLM_CONNECT_TIMEOUT = 5
+LLM_REQUEST_TIMEOUT = 300
+# 연결 실패 / 5xx 재시도 횟수와 첫 대기 시간(초, 재시도마다 2배)
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BACKOFF = 0.5
+# HTTP 연결 풀 크기
+LLM_MAX_CONNECTIONS = 16
+# 컨텍스트 길이 (요청마다 다르면 Ollama가 모델을 다시 올리고 KV 캐시도 재사용하지 못하므로 모든 호출에 고정)
+LLM_NUM_CTX = 8192
+# 서버 시작 시 모델을 미리 로드
+LLM_WARMUP_ON_STARTUP = True
+
+# 임베딩 / pandas 등 CPU 작업에 사용할 스레드 수
+CPU_WORKERS = 4
+
+# 업로드 / 분석기에서 여러 파일을 파싱할 때 사용할 프로세스 수 (1이면 순차 처리)
+PARSE_WORKERS = 4
+
+# 업로드 파일 하나의 최대 크기 (초과 시 413) / 디스크에 쓸 때 한 번에 읽는 크기
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 업로드 인덱싱 백그라운드 작업: 워커 스레드 수 / 조회용으로 남겨둘 끝난 작업 수
+INGEST_WORKERS = 1
+INGEST_JOBS_KEEP = 100
+
+# 워커 하나가 동시에 처리할 질문(/ask/) 수. 초과 요청은 대기열에서 기다림
+MAX_CONCURRENT_ASKS = 16
+
+# 분석기가 파싱한 입/출고 데이터를 Parquet으로 캐시하는 폴더 (pyarrow 필요)
+ANALYZER_CACHE_DIR = "analyzer_cache"
+# 분석기 일별 롤업에 남길 분류 컬럼 (품목/위치별 집계용, 파일에 있는 컬럼만 사용)
+ANALYZER_DIMENSIONS = ("SKU", "Product", "Location")
+
+# /ask/ 답변 캐시 (인덱스 버전이 바뀌면 자동 무효화)
+ANSWER_CACHE_MAX_ENTRIES = 256
+ANSWER_CACHE_TTL_SECONDS = 600
+# 유사 질문 적중 기준 (질문 임베딩 코사인 유사도). None이면 정확히 같은 질문만 적중
+# (켜더라도 숫자 / 날짜 / 코드 / 상대 기간 표현이 다르면 적중하지 않음)
+ANSWER_CACHE_SIMILARITY_THRESHOLD = None
+
+# 동시 검색 요청 마이크로 배칭: 한 배치 최대 크기 / 첫 요청 후 최대 대기 시간(ms)
+RETRIEVAL_MAX_BATCH_SIZE = 32
+RETRIEVAL_MAX_WAIT_MS = 5
+
+# 문서 요약 (map-reduce)
+SUMMARY_CACHE_DIR = "summary_cache"  # 소스별 요약 캐시 (내용 해시 기준)
+SUMMARY_MAP_CONCURRENCY = 4  # 요약 시 Ollama 동시 호출 수 (동시에 들어온 요약 요청 전체 합계)
+SUMMARY_CHUNK_TOKENS = 1500  # map 단계 한 번에 넣을 최대 토큰 수
+SUMMARY_REDUCE_TOKEN_BUDGET = 3000  # 최종 답변 프롬프트에 넣을 요약의 최대 토큰 수
+SUMMARY_MAX_TOKENS = 300  # map/reduce 한 번의 최대 생성 토큰 수
+
+# 검색 결과로 만드는 프롬프트 컨텍스트의 최대 토큰 수 / 거의 같은 청크로 볼 유사도 (MinHash Jaccard)
+CONTEXT_TOKEN_BUDGET = 2000
+CONTEXT_DEDUP_THRESHOLD = 0.8
+
+# 하이브리드 검색: 벡터 + BM25 결과를 reciprocal rank fusion으로 합침
+HYBRID_SEARCH = True
+HYBRID_CANDIDATES = 20  # 각 검색에서 가져올 후보 수
+RRF_K = 60
+
+# FAISS 인덱스 종류: "auto" | "flat" | "ivf" | "hnsw" | "ivfpq"
+# auto: flat_max 미만 Flat, ivf_max 미만 IVF, 그 이상 HNSW
+INDEX_TYPE = "auto"
+INDEX_OPTIONS = {
+    "flat_max": 20000,
+    "ivf_max": 500000,
+    "nprobe": 16,         # IVF 검색 시 탐색할 클러스터 수
+    "hnsw_m": 32,
+    "ef_search": 64,      # HNSW 검색 폭
+    "retrain_growth": 2.0,  # IVF 학습 당시보다 벡터 수가 이 배수 이상 늘면 재학습
+}
+
+# 벡터 DB는 versions/<버전>/ 단위로 저장되고 CURRENT 파일로 현재 버전을 가리킴
+# 새 버전 저장 후 남겨둘 버전 수 (현재 버전 포함, 이전 버전을 읽는 중인 워커 보호용)
+VECTOR_DB_KEEP_VERSIONS = 2
@@ -0,0 +1,81 @@
+# context_builder.py
+
+import random
+import zlib
+from typing import List, Sequence
+
+from langchain_core.documents import Document
+
+from token_utils import count_tokens, truncate_to_tokens
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class MinHasher:
+    """글자 shingle 기반 MinHash (청크 겹침/반복 요약 같은 거의 같은 문서 판별용)"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = random.Random(seed)  # 고정 시드: 같은 입력이면 항상 같은 결과
+        self.shingle_size = shingle_size
+        self._params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                        for _ in range(num_perm)]
+
+    def _shingles(self, text: str) -> set:
+        text = " ".join(text.split())
+        n = self.shingle_size
+        if len(text) <= n:
+            return {zlib.crc32(text.encode("utf-8"))}
+        return {zlib.crc32(text[i:i + n].encode("utf-8")) for i in range(len(text) - n + 1)}
+
+    def signature(self, text: str) -> List[int]:
+        shingles = self._shingles(text)
+        return [min((a * s + b) % _MERSENNE_PRIME for s in shingles) for a, b in self._params]
+
+    @staticmethod
+    def similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+        """추정 Jaccard 유사도"""
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+_default_hasher = MinHasher()
+
+
+def build_context(documents: List[Document], token_budget: int, dedup_threshold: float = 0.8,
+                  min_tail_tokens: int = 64, separator: str = "\n\n") -> str:
+    """검색 결과(관련도 순)로 토큰 예산 안의 컨텍스트를 만듦
+
+    - 앞선(더 관련 있는) 문서와 추정 Jaccard 유사도가 dedup_threshold 이상이면 제외
+    - 관련도 순으로 예산이 찰 때까지 채우고, 남은 예산이 min_tail_tokens 이상이면
+      다음 문서를 앞에서부터 잘라 넣음 (잘리는 위치는 입력이 같으면 항상 동일)
+    """
+    kept: List[str] = []
+    signatures: List[List[int]] = []
+    used = 0
+    separator_tokens = count_tokens(separator)
+    dropped = 0
+
+    for doc in documents:
+        text = doc.page_content.strip()
+        if not text:
+            continue
+
+        signature = _default_hasher.signature(text)
+        if any(MinHasher.similarity(signature, other) >= dedup_threshold for other in signatures):
+            dropped += 1
+            continue
+
+        cost = count_tokens(text) + (separator_tokens if kept else 0)
+        if used + cost <= token_budget:
+            kept.append(text)
+            signatures.append(signature)
+            used += cost
+            continue
+
+        remaining = token_budget - used - (separator_tokens if kept else 0)
+        if remaining >= min_tail_tokens:
+            kept.append(truncate_to_tokens(text, remaining))
+            used = token_budget
+        break
+
+    print(f"[build_context] 문서 {len(documents)}개 중 {len(kept)}개 사용 (중복 제외 {dropped}개), 토큰 {used}/{token_budget}")
+    return separator.join(kept)
@@ -1,9 +1,16 @@
 # document_processor.py
 
 import os
+import json
+import hashlib
+import functools
 import logging
-from typing import List, Optional
-import pandas as pd
+import shutil
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional
+import faiss
+import numpy as np
 from langchain_core.documents import Document
 #from langchain_community.document_loaders import CSVLoader, PyPDFLoader, TextLoader
 #from langchain_community.document_loaders.word_document import Docx2txtLoader
@@ -12,13 +19,98 @@ from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores.base import VectorStore
 
+from index_factory import (
+    choose_index_type,
+    create_index,
+    describe_index,
+    factory_string,
+    is_lossy,
+    read_index_mmap,
+    reconstruct_all,
+    set_search_params,
+    supports_remove,
+)
+from parsing import map_files, parse_documents
+from sqlite_docstore import SQLiteDocstore, SQLitePositionMap
+
 logger = logging.getLogger(__name__)
 
+INDEX_FILE_NAME = "index.faiss"
+DOCSTORE_FILE_NAME = "docstore.sqlite"
+MANIFEST_FILE_NAME = "manifest.json"
+INDEX_META_FILE_NAME = "index_meta.json"
+CURRENT_FILE_NAME = "CURRENT"
+VERSIONS_DIR_NAME = "versions"
+STAGING_PREFIX = "staging-"
+# 버전 레이아웃 이전 형식 (FAISS.save_local)의 파일들
+LEGACY_FILE_NAMES = (INDEX_FILE_NAME, "index.pkl", MANIFEST_FILE_NAME, INDEX_META_FILE_NAME)
+
+DEFAULT_INDEX_OPTIONS = {
+    "flat_max": 20000,
+    "ivf_max": 500000,
+    "nprobe": 16,
+    "hnsw_m": 32,
+    "ef_search": 64,
+    "retrain_growth": 2.0,
+}
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def _with_write_lock(method):
+    """인덱스를 수정하는 메서드를 프로세서의 쓰기 락 안에서 실행"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            self._write_depth += 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._write_depth -= 1
+                # 최상위 쓰기 호출이 끝나면 커밋되지 않은 staging 정리
+                if self._write_depth == 0:
+                    self._cleanup_staging()
+    return wrapper
+
+
+def get_embeddings() -> HuggingFaceEmbeddings:
+    """프로세스 전체에서 공유하는 임베딩 모델 (최초 호출 시 한 번만 로드)"""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = HuggingFaceEmbeddings(
+                    model_name="intfloat/e5-small-v2",
+                    model_kwargs={'device': 'cpu'},
+                    encode_kwargs={'normalize_embeddings': True}
+                )
+    return _embeddings
+
+
 class DocumentProcessor:
     """문서 처리 및 벡터스토어 구축 클래스"""
 
-    def __init__(self, db_dir: str = "vector_db"):
+    def __init__(self, db_dir: str = "vector_db", embeddings: Optional[HuggingFaceEmbeddings] = None,
+                 embed_batch_size: int = 64, rows_per_chunk: int = 50,
+                 index_type: str = "flat", index_options: Optional[dict] = None, keep_versions: int = 2,
+                 parse_workers: int = 1):
         self.db_dir = db_dir
+        self.embed_batch_size = embed_batch_size
+        self.rows_per_chunk = rows_per_chunk
+        # 여러 파일 파싱에 사용할 프로세스 수 (1 이하면 현재 프로세스에서 순차 처리)
+        self.parse_workers = parse_workers
+        # "auto" | "flat" | "ivf" | "hnsw" | "ivfpq"
+        self.index_type = index_type
+        self.index_options = {**DEFAULT_INDEX_OPTIONS, **(index_options or {})}
+        # 재학습/재구축 시 학습에 사용한 벡터 수 (다음 저장 시 index_meta에 기록)
+        self._trained_on: Optional[int] = None
+        # 새 버전을 저장한 뒤에도 남겨둘 이전 버전 수 (현재 버전 포함)
+        self.keep_versions = max(keep_versions, 1)
+        # 인덱스 쓰기(추가/삭제/저장)는 동시에 하나만 수행
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._staging_docstores: List[SQLiteDocstore] = []
         os.makedirs(self.db_dir, exist_ok=True)
 
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -27,11 +119,7 @@ class DocumentProcessor:
             length_function=len,
         )
 
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="intfloat/e5-small-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        self.embeddings = embeddings if embeddings is not None else get_embeddings()
 
     def get_total_docs_num(self, directory_path):
         try:
@@ -44,59 +132,495 @@ class DocumentProcessor:
 
     def load_documents(self, file_path: str) -> List[Document]:
         try:
-            file_extension = os.path.splitext(file_path)[1].lower()
-
-            if file_extension == '.csv':
-                return self._load_csv(file_path)
-            elif file_extension == '.xlsx':
-                return self._load_excel(file_path)
-
-            else:
-                raise ValueError(f"지원하지 않는 파일 형식: {file_extension}")
-
+            return parse_documents(file_path, self.rows_per_chunk)
         except Exception as e:
             logger.error(f"문서 로드 오류: {str(e)}")
             raise
 
-    def _load_csv(self, file_path: str) -> List[Document]:
+    def load_documents_many(self, file_paths: List[str], raise_errors: bool = True) -> Dict[str, object]:
+        """여러 파일을 프로세스 풀에서 병렬로 파싱
+
+        raise_errors=True면 하나라도 실패할 때 예외, False면 실패한 파일의 값으로 예외 객체를 돌려줌
+        """
+        parsed = map_files(parse_documents, file_paths, self.rows_per_chunk, workers=self.parse_workers)
+        for path in file_paths:
+            if isinstance(parsed[path], Exception):
+                logger.error(f"문서 로드 오류: {path}: {parsed[path]}")
+                if raise_errors:
+                    raise parsed[path]
+        return parsed
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        """파일 내용의 SHA-256 (청크 단위로 읽어 메모리 사용을 제한)"""
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    @staticmethod
+    def chunk_ids(source: str, content_hash: str, count: int) -> List[str]:
+        """청크 벡터 id (경로 + 내용 해시 기준이라 내용이 같은 두 파일도 id가 겹치지 않음)"""
+        prefix = hashlib.sha256(f"{source}\0{content_hash}".encode("utf-8")).hexdigest()[:16]
+        return [f"{prefix}-{i}" for i in range(count)]
+
+    @staticmethod
+    def documents_hash(documents: List[Document]) -> str:
+        """문서 내용 + 메타데이터 기준 SHA-256"""
+        sha = hashlib.sha256()
+        for doc in documents:
+            sha.update(doc.page_content.encode("utf-8"))
+            sha.update(json.dumps(doc.metadata, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        return sha.hexdigest()
+
+    # ----- 버전별 디렉토리 레이아웃 -----
+    # db_dir/CURRENT                  현재 버전 이름 (원자적으로 교체)
+    # db_dir/versions/<버전>/          index.faiss, docstore.sqlite, manifest.json, index_meta.json
+    # db_dir/staging-*/               쓰기 중인 다음 버전 (커밋 시 versions/로 이동)
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.db_dir, CURRENT_FILE_NAME), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.db_dir, VERSIONS_DIR_NAME, version)
+
+    def _state_dir(self) -> str:
+        """manifest / index_meta를 읽을 디렉토리 (버전 레이아웃 이전 인덱스는 db_dir)"""
+        version = self.current_version()
+        return self._version_dir(version) if version else self.db_dir
+
+    def _new_staging_dir(self) -> str:
+        os.makedirs(self.db_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self.db_dir)
+
+    def _new_staging_docstore(self, source_path: Optional[str] = None) -> SQLiteDocstore:
+        """새 staging 디렉토리에 docstore 생성 (source_path가 있으면 그 파일을 복사해서 시작)"""
+        docstore_path = os.path.join(self._new_staging_dir(), DOCSTORE_FILE_NAME)
+        if source_path:
+            shutil.copyfile(source_path, docstore_path)
+        docstore = SQLiteDocstore(docstore_path)
+        self._staging_docstores.append(docstore)
+        return docstore
+
+    def _cleanup_staging(self) -> None:
+        """이 프로세서가 만든 staging 디렉토리 중 커밋되지 않은 것만 정리 (쓰기 락 안에서만 호출)
+
+        같은 db_dir을 쓰는 다른 프로세서/프로세스의 진행 중인 staging은 건드리지 않음.
+        커밋된 staging은 versions/로 이동했으므로 원래 경로에 남아 있지 않음
+        """
+        for docstore in self._staging_docstores:
+            docstore.close()
+            staging_dir = os.path.dirname(docstore.path)
+            if os.path.isdir(staging_dir):
+                shutil.rmtree(staging_dir, ignore_errors=True)
+        self._staging_docstores = []
+
+    def _next_version(self) -> str:
+        current = self.current_version()
+        number = int(current[1:]) + 1 if current else 1
+        while os.path.exists(self._version_dir(f"v{number:06d}")):
+            number += 1
+        return f"v{number:06d}"
+
+    def _prune_versions(self) -> None:
+        """최근 keep_versions개만 남기고 이전 버전 삭제 (mmap으로 열어둔 리더는 영향 없음)"""
+        versions_root = os.path.join(self.db_dir, VERSIONS_DIR_NAME)
+        current = self.current_version()
+        versions = sorted(name for name in os.listdir(versions_root) if name != current)
+        for name in versions[:max(len(versions) - (self.keep_versions - 1), 0)]:
+            shutil.rmtree(os.path.join(versions_root, name), ignore_errors=True)
+
+    def _remove_legacy_files(self) -> None:
+        for name in LEGACY_FILE_NAMES:
+            path = os.path.join(self.db_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def load_manifest(self) -> Dict[str, dict]:
+        """source -> {"hash": 내용 해시, "ids": 벡터 id 목록}"""
         try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-        except UnicodeDecodeError:
-            df = pd.read_csv(file_path, encoding='cp949')
-
-        content = df.to_string(index=False)
-        return [Document(page_content=content, metadata={"source": file_path})]
-    
-    def _load_excel(self, file_path: str) -> List[Document]:
-        df = pd.read_excel(file_path)
-        content = df.to_string(index=False)
-        return [Document(page_content=content, metadata={"source": file_path})]
+            with open(os.path.join(self._state_dir(), MANIFEST_FILE_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def known_hashes(self) -> set:
+        """현재 버전 인덱스에 들어 있는 파일 내용 해시"""
+        return {entry["hash"] for entry in self.load_manifest().values()}
+
+    def load_index_meta(self) -> dict:
+        """{"index_type": 인덱스 종류, "trained_on": 학습 당시 벡터 수, "ntotal": 현재 벡터 수}"""
+        try:
+            with open(os.path.join(self._state_dir(), INDEX_META_FILE_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_vector_store(self, vectorstore: FAISS, manifest: Optional[Dict[str, dict]] = None) -> str:
+        """staging 디렉토리에 새 버전을 완성한 뒤 CURRENT를 교체해 원자적으로 공개. 새 버전 이름 반환"""
+        docstore = vectorstore.docstore
+        if isinstance(docstore, SQLiteDocstore) and not docstore.read_only \
+                and os.path.basename(os.path.dirname(docstore.path)).startswith(STAGING_PREFIX):
+            staging_dir = os.path.dirname(docstore.path)
+        else:
+            # 이전 형식(pickle docstore)에서 넘어온 경우 SQLite로 옮김
+            new_docstore = self._new_staging_docstore()
+            staging_dir = os.path.dirname(new_docstore.path)
+            new_docstore.add({
+                doc_id: docstore.search(doc_id) for doc_id in vectorstore.index_to_docstore_id.values()
+            })
+            vectorstore.docstore = docstore = new_docstore
+
+        docstore.write_positions(dict(vectorstore.index_to_docstore_id))
+        docstore.close()
+        faiss.write_index(vectorstore.index, os.path.join(staging_dir, INDEX_FILE_NAME))
+
+        if manifest is None:
+            manifest = self.load_manifest()
+        with open(os.path.join(staging_dir, MANIFEST_FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        meta = self.load_index_meta()
+        meta["index_type"] = describe_index(vectorstore.index)
+        meta["ntotal"] = vectorstore.index.ntotal
+        if self._trained_on is not None:
+            meta["trained_on"] = self._trained_on
+            self._trained_on = None
+        with open(os.path.join(staging_dir, INDEX_META_FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        version = self._next_version()
+        os.makedirs(os.path.join(self.db_dir, VERSIONS_DIR_NAME), exist_ok=True)
+        os.rename(staging_dir, self._version_dir(version))
+
+        current_path = os.path.join(self.db_dir, CURRENT_FILE_NAME)
+        with open(current_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(current_path + ".tmp", current_path)
+
+        self._remove_legacy_files()
+        self._prune_versions()
+        logger.info(f"벡터스토어 버전 {version} 저장 (벡터 {vectorstore.index.ntotal}개)")
+        return version
+
+    def _embed_documents(self, documents: List[Document], progress: Optional[Callable] = None) -> np.ndarray:
+        """embed_batch_size 단위로 임베딩 (progress가 있으면 배치마다 진행 상황 보고)"""
+        vectors = []
+        for start in range(0, len(documents), self.embed_batch_size):
+            batch = documents[start:start + self.embed_batch_size]
+            vectors.extend(self.embeddings.embed_documents([doc.page_content for doc in batch]))
+            if progress is not None:
+                progress("embedded", done=len(vectors), total=len(documents))
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _create_index(self, vectors: np.ndarray):
+        """벡터 수에 맞는 인덱스를 만들어 학습 (벡터 추가는 하지 않음)"""
+        options = self.index_options
+        index_type = choose_index_type(self.index_type, len(vectors), options["flat_max"], options["ivf_max"])
+        spec = factory_string(index_type, vectors.shape[1], len(vectors), options["hnsw_m"])
+        logger.info(f"FAISS 인덱스 생성: {spec} (벡터 {len(vectors)}개)")
+        index = create_index(spec, vectors)
+        set_search_params(index, options["nprobe"], options["ef_search"])
+        self._trained_on = len(vectors)
+        return index
 
+    def _add_in_batches(self, vectorstore: Optional[FAISS], documents: List[Document],
+                        ids: Optional[List[str]] = None, progress: Optional[Callable] = None) -> Optional[FAISS]:
+        """배치로 임베딩해 벡터스토어에 추가 (없으면 설정된 인덱스 종류로 새로 생성)"""
+        if not documents:
+            return vectorstore
+
+        vectors = self._embed_documents(documents, progress)
+        if vectorstore is None:
+            vectorstore = FAISS(
+                embedding_function=self.embeddings,
+                index=self._create_index(vectors),
+                docstore=self._new_staging_docstore(),
+                index_to_docstore_id={},
+            )
+        vectorstore.add_embeddings(
+            zip([doc.page_content for doc in documents], vectors),
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids,
+        )
+        self._maybe_retrain(vectorstore)
+        return vectorstore
+
+    def _maybe_retrain(self, vectorstore: FAISS) -> None:
+        """벡터 수 증가로 인덱스 종류가 바뀌어야 하거나 IVF 학습 시점보다 크게 늘었으면 재구축"""
+        options = self.index_options
+        ntotal = vectorstore.index.ntotal
+        current = describe_index(vectorstore.index)
+        desired = choose_index_type(self.index_type, ntotal, options["flat_max"], options["ivf_max"])
+        trained_on = self._trained_on or self.load_index_meta().get("trained_on") or ntotal
+        grown = current in ("ivf", "ivfpq") and ntotal > trained_on * options["retrain_growth"]
+        if desired != current or grown:
+            logger.info(f"인덱스 재학습: {current} -> {desired} (학습 {trained_on}개, 현재 {ntotal}개)")
+            self._rebuild_index(vectorstore)
+
+    def _rebuild_index(self, vectorstore: FAISS, drop_positions: Optional[set] = None) -> None:
+        """저장된 벡터로 인덱스를 새로 만들고 학습 (drop_positions 위치의 벡터는 제외)"""
+        drop_positions = drop_positions or set()
+        ntotal = vectorstore.index.ntotal
+        keep = [i for i in range(ntotal) if i not in drop_positions]
+        keep_ids = [vectorstore.index_to_docstore_id[i] for i in keep]
+
+        if is_lossy(vectorstore.index):
+            # PQ 압축 벡터는 원본과 달라 재학습에 쓰지 않고 문서 텍스트로 다시 임베딩
+            vectors = self._embed_documents([vectorstore.docstore.search(doc_id) for doc_id in keep_ids])
+        else:
+            vectors = reconstruct_all(vectorstore.index)[keep]
+        vectors = vectors.reshape(len(keep), vectorstore.index.d)
+
+        index = self._create_index(vectors)
+        if len(vectors):
+            index.add(vectors)
+
+        dropped_ids = [vectorstore.index_to_docstore_id[i] for i in drop_positions]
+        if dropped_ids:
+            vectorstore.docstore.delete(dropped_ids)
+        vectorstore.index = index
+        vectorstore.index_to_docstore_id = dict(enumerate(keep_ids))
+
+    def _delete_ids(self, vectorstore: FAISS, ids: List[str]) -> int:
+        """인덱스에 실제로 있는 id만 삭제하고 삭제 개수를 반환"""
+        known_ids = set(vectorstore.index_to_docstore_id.values())
+        ids = [i for i in ids if i in known_ids]
+        if not ids:
+            return 0
+
+        if supports_remove(vectorstore.index):
+            try:
+                vectorstore.delete(ids)
+                return len(ids)
+            except RuntimeError as e:
+                logger.warning(f"remove_ids 미지원, 인덱스 재구축으로 삭제: {e}")
+
+        # IVF/HNSW 등 라벨이 유지되지 않거나 개별 삭제가 안 되는 인덱스는 나머지 벡터로 재구축
+        id_set = set(ids)
+        positions = {pos for pos, doc_id in vectorstore.index_to_docstore_id.items() if doc_id in id_set}
+        self._rebuild_index(vectorstore, drop_positions=positions)
+        return len(ids)
+
+    @_with_write_lock
     def build_vector_store(self, documents: List[Document]) -> None:
-        vectorstore = FAISS.from_documents(documents, self.embeddings)
-        vectorstore.save_local(self.db_dir)
+        vectorstore = self._add_in_batches(None, documents)
+        # 전체 재구축 시 이전 증분 기록은 무효
+        self._save_vector_store(vectorstore, manifest={})
+
+    def get_index_version(self) -> Optional[str]:
+        """디스크에 저장된 인덱스의 버전 (저장될 때마다 바뀜). 인덱스가 없으면 None"""
+        version = self.current_version()
+        if version:
+            return version
+        try:
+            stat = os.stat(os.path.join(self.db_dir, INDEX_FILE_NAME))
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
 
-    def load_vector_store(self) -> Optional[VectorStore]:
+    def load_vector_store(self, writable: bool = False) -> Optional[VectorStore]:
+        """현재 버전의 벡터스토어 로드
+
+        - writable=False: 인덱스는 mmap, 문서는 SQLite에서 필요할 때만 조회 (빠른 시작, 워커 간 페이지 캐시 공유)
+        - writable=True: 인덱스를 메모리로 읽고 docstore를 새 staging 디렉토리에 복사 (수정 후 _save_vector_store로 커밋)
+        """
         if not os.path.exists(self.db_dir):
             return None
 
+        version = self.current_version()
         try:
-            vectorstore = FAISS.load_local(
-                self.db_dir,
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
+            if version is None:
+                # 버전 레이아웃 이전에 저장된 인덱스 (다음 저장 시 새 형식으로 변환)
+                if not os.path.exists(os.path.join(self.db_dir, INDEX_FILE_NAME)):
+                    return None
+                vectorstore = FAISS.load_local(
+                    self.db_dir,
+                    self.embeddings,
+                    allow_dangerous_deserialization=True
+                )
+            else:
+                version_dir = self._version_dir(version)
+                if writable:
+                    docstore = self._new_staging_docstore(os.path.join(version_dir, DOCSTORE_FILE_NAME))
+                    index = faiss.read_index(os.path.join(version_dir, INDEX_FILE_NAME))
+                    index_to_docstore_id = docstore.load_positions()
+                else:
+                    docstore = SQLiteDocstore(os.path.join(version_dir, DOCSTORE_FILE_NAME), read_only=True)
+                    index = read_index_mmap(os.path.join(version_dir, INDEX_FILE_NAME))
+                    index_to_docstore_id = SQLitePositionMap(docstore)
+                vectorstore = FAISS(
+                    embedding_function=self.embeddings,
+                    index=index,
+                    docstore=docstore,
+                    index_to_docstore_id=index_to_docstore_id,
+                )
+            set_search_params(vectorstore.index, self.index_options["nprobe"], self.index_options["ef_search"])
             return vectorstore
         except Exception as e:
             logger.error(f"벡터스토어 로드 실패: {e}")
             return None
 
+    @_with_write_lock
     def add_to_vector_store(self, documents: List[Document]) -> None:
         """벡터스토어에 문서를 추가하고 저장"""
-        existing_vs = self.load_vector_store()
+        existing_vs = self.load_vector_store(writable=True)
         if existing_vs:
-            for doc in documents:
-                existing_vs.add_documents([doc])
-            existing_vs.save_local(self.db_dir)
+            self._add_in_batches(existing_vs, documents)
+            self._save_vector_store(existing_vs)
         else:
-            self.build_vector_store(documents)
\ No newline at end of file
+            self.build_vector_store(documents)
+
+    @_with_write_lock
+    def reset(self) -> None:
+        """벡터 DB 전체 삭제 (진행 중인 다른 쓰기가 끝난 뒤 실행)"""
+        if os.path.exists(self.db_dir):
+            shutil.rmtree(self.db_dir)
+        os.makedirs(self.db_dir, exist_ok=True)
+        self._trained_on = None
+
+    @_with_write_lock
+    def ingest_files(self, file_paths: List[str], progress: Optional[Callable] = None,
+                     raise_errors: bool = True, hashes: Optional[Dict[str, str]] = None,
+                     removed: Optional[List[str]] = None, reset: bool = False) -> Dict[str, list]:
+        """파일 내용 해시 기준 증분 인덱싱
+
+        - 해시가 같은 파일은 건너뜀
+        - 바뀐 파일은 이전 벡터를 지우고 새로 임베딩
+        - 새 문서는 배치로 임베딩해 기존 인덱스에 추가한 뒤 한 번만 저장 (새 버전으로 원자적 교체)
+        - progress(event, **info)가 있으면 파일별 진행 상황을 보고
+          (skipped / parsed / failed / embedded / committed)
+        - raise_errors=False면 파싱에 실패한 파일은 result["failed"]에 남기고 나머지만 인덱싱
+        - hashes: 업로드 중 미리 계산한 {경로: SHA-256} (있으면 파일을 다시 읽지 않음)
+        - removed: 더 이상 없는 소스 (같은 이름에 새 내용이 올라와 교체된 파일). 같은 버전에서 벡터를 지움
+        - reset=True: 빈 인덱스 / 빈 매니페스트에서 새 버전을 만들어 CURRENT 교체로 한 번에 공개
+          (임베딩 중에도 이전 버전으로 질의 가능, 새로 인덱싱된 문서가 없으면 이전 버전 유지)
+        """
+        report = progress or (lambda event, **info: None)
+        manifest = {} if reset else self.load_manifest()
+        has_index = not reset and self.get_index_version() is not None
+        result = {"added": [], "updated": [], "skipped": [], "failed": [], "removed": []}
+
+        stale_ids = []
+        for path in dict.fromkeys(removed or []):
+            entry = manifest.pop(path, None)
+            if entry:
+                stale_ids.extend(entry["ids"])
+                result["removed"].append(path)
+                report("removed", path=path)
+
+        to_parse = {}
+        for path in dict.fromkeys(file_paths):
+            content_hash = (hashes or {}).get(path) or self.file_hash(path)
+            entry = manifest.get(path)
+            if entry and entry["hash"] == content_hash and has_index:
+                result["skipped"].append(path)
+                report("skipped", path=path)
+                continue
+            to_parse[path] = content_hash
+
+        # 바뀐 파일만 병렬 파싱
+        parsed = self.load_documents_many(list(to_parse), raise_errors=raise_errors)
+
+        new_docs = []
+        new_ids = []
+        for path, content_hash in to_parse.items():
+            entry = manifest.get(path)
+            docs = parsed[path]
+            if isinstance(docs, Exception):
+                result["failed"].append(path)
+                report("failed", path=path, error=str(docs))
+                continue
+            report("parsed", path=path, chunks=len(docs))
+            ids = self.chunk_ids(path, content_hash, len(docs))
+            if entry:
+                stale_ids.extend(entry["ids"])
+                result["updated"].append(path)
+            else:
+                result["added"].append(path)
+            new_docs.extend(docs)
+            new_ids.extend(ids)
+            manifest[path] = {"hash": content_hash, "ids": ids}
+
+        if not new_docs and not result["removed"]:
+            if reset:
+                logger.warning("초기화 후 인덱싱할 문서가 없어 이전 버전을 유지합니다")
+            return result
+
+        vectorstore = None if reset else self.load_vector_store(writable=True)
+        if vectorstore is not None:
+            self._delete_ids(vectorstore, stale_ids)
+
+        if new_docs:
+            vectorstore = self._add_in_batches(vectorstore, new_docs, new_ids, progress=progress)
+        elif vectorstore is None:
+            return result
+        version = self._save_vector_store(vectorstore, manifest)
+        report("committed", version=version)
+        logger.info(f"증분 인덱싱 완료: {len(new_docs)}개 청크, {result}")
+        return result
+
+    @_with_write_lock
+    def remove_source(self, source: str) -> int:
+        """특정 파일(source)의 벡터를 인덱스에서 제거. 제거된 벡터 수 반환"""
+        manifest = self.load_manifest()
+        entry = manifest.pop(source, None)
+        if entry is None:
+            return 0
+        vectorstore = self.load_vector_store(writable=True)
+        if vectorstore is None:
+            return 0
+
+        removed = self._delete_ids(vectorstore, entry["ids"])
+        self._save_vector_store(vectorstore, manifest)
+        return removed
+
+    @_with_write_lock
+    def upsert_source(self, source: str, documents: List[Document]) -> bool:
+        """source 단위 멱등 upsert (파생 문서용)
+
+        - 문서 내용이 이전과 같으면 임베딩/저장 없이 종료
+        - 바뀌었으면 같은 source의 이전 벡터를 교체 (중복 누적 없음)
+        반환값: 인덱스가 변경되었는지 여부
+        """
+        content_hash = self.documents_hash(documents)
+        manifest = self.load_manifest()
+        entry = manifest.get(source)
+        if entry and entry["hash"] == content_hash and self.get_index_version() is not None:
+            return False
+
+        vectorstore = self.load_vector_store(writable=True)
+        if vectorstore is not None:
+            if entry:
+                self._delete_ids(vectorstore, entry["ids"])
+            elif isinstance(vectorstore.docstore, SQLiteDocstore):
+                # 매니페스트 도입 이전에 같은 source로 쌓인 중복 문서 정리
+                self._delete_ids(vectorstore, vectorstore.docstore.ids_by_source(source))
+            else:
+                self._delete_ids(vectorstore, [
+                    doc_id for doc_id in vectorstore.index_to_docstore_id.values()
+                    if getattr(vectorstore.docstore.search(doc_id), "metadata", {}).get("source") == source
+                ])
+
+        ids = self.chunk_ids(source, content_hash, len(documents))
+        vectorstore = self._add_in_batches(vectorstore, documents, ids)
+        manifest[source] = {"hash": content_hash, "ids": ids}
+        self._save_vector_store(vectorstore, manifest)
+        return True
+
+    def try_upsert_source(self, source: str, documents: List[Document]) -> Optional[bool]:
+        """쓰기 락이 비어 있을 때만 upsert_source 실행 (요청 경로용)
+
+        - 인덱싱 작업 등이 락을 잡고 있으면 기다리지 않고 None 반환
+        """
+        if not self._write_lock.acquire(blocking=False):
+            return None
+        try:
+            return self.upsert_source(source, documents)
+        finally:
+            self._write_lock.release()
@@ -0,0 +1,28 @@
+# executor.py
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CPU_WORKERS, MAX_CONCURRENT_ASKS
+
+# 임베딩 / FAISS / pandas 같은 CPU 작업 전용 스레드풀 (이벤트 루프를 막지 않도록)
+_cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu-worker")
+
+# 동시에 처리할 질문 수 제한 (초과 요청은 대기)
+ask_limiter = asyncio.Semaphore(MAX_CONCURRENT_ASKS)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """동기 함수를 CPU 전용 스레드풀에서 실행하고 결과를 기다림
+
+    호출한 쪽의 contextvars(요청별 LLM 사용량 집계 등)를 그대로 이어받아 실행
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_cpu_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executor() -> None:
+    _cpu_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,124 @@
+# index_factory.py
+
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("auto", "flat", "ivf", "hnsw", "ivfpq")
+
+# PQ 코드북(8bit) 학습에 필요한 최소 벡터 수
+PQ_MIN_TRAINING = 256 * 39
+
+
+def ivf_nlist(num_vectors: int) -> int:
+    """IVF 센트로이드 수 (벡터 수의 제곱근, 센트로이드당 최소 39개 학습 벡터 보장)"""
+    nlist = int(math.sqrt(max(num_vectors, 1)))
+    nlist = min(nlist, max(num_vectors // 39, 1))
+    return max(1, min(nlist, 65536))
+
+
+def pq_subquantizers(dim: int) -> int:
+    """dim을 나누어떨어지게 하는 PQ 서브벡터 수 (서브벡터당 8차원 근처)"""
+    for m in (dim // 8, 64, 48, 32, 24, 16, 12, 8, 4, 2, 1):
+        if m > 0 and dim % m == 0:
+            return m
+    return 1
+
+
+def choose_index_type(index_type: str, num_vectors: int, flat_max: int, ivf_max: int) -> str:
+    """설정값과 벡터 수로 실제 사용할 인덱스 종류 결정"""
+    if num_vectors == 0:
+        return "flat"
+    if index_type == "auto":
+        if num_vectors < flat_max:
+            return "flat"
+        if num_vectors < ivf_max:
+            return "ivf"
+        return "hnsw"
+    if index_type == "ivfpq" and num_vectors < PQ_MIN_TRAINING:
+        return "ivf"  # PQ를 학습하기엔 벡터가 부족
+    return index_type
+
+
+def factory_string(index_type: str, dim: int, num_vectors: int, hnsw_m: int = 32) -> str:
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{ivf_nlist(num_vectors)},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    if index_type == "ivfpq":
+        return f"IVF{ivf_nlist(num_vectors)},PQ{pq_subquantizers(dim)}"
+    raise ValueError(f"지원하지 않는 인덱스 종류: {index_type}")
+
+
+def create_index(spec: str, vectors: np.ndarray) -> faiss.Index:
+    """index_factory로 인덱스를 만들고 (필요하면) 주어진 벡터로 학습. 벡터 추가는 호출 측에서 수행"""
+    index = faiss.index_factory(vectors.shape[1], spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: int, ef_search: int) -> None:
+    """검색 파라미터 적용 (IVF: nprobe, HNSW: efSearch)"""
+    ivf = _extract_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+
+def describe_index(index: faiss.Index) -> str:
+    """faiss 인덱스 객체의 종류 ("flat" | "ivf" | "ivfpq" | "hnsw")"""
+    name = type(faiss.downcast_index(index)).__name__
+    if "HNSW" in name:
+        return "hnsw"
+    if "IVFPQ" in name:
+        return "ivfpq"
+    if "IVF" in name:
+        return "ivf"
+    return "flat"
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """LangChain FAISS.delete(remove_ids)로 안전하게 지울 수 있는 인덱스인지
+
+    Flat만 지운 뒤 남은 벡터가 0..n-1로 당겨져 index_to_docstore_id 재번호와 맞음.
+    IVF/IVF-PQ는 남은 벡터의 라벨이 그대로라 다음 추가 시 라벨이 겹치므로 재구축으로 삭제
+    """
+    return describe_index(index) == "flat"
+
+
+def is_lossy(index: faiss.Index) -> bool:
+    """reconstruct 결과가 원본 벡터와 다른 (압축) 인덱스인지"""
+    return describe_index(index) == "ivfpq"
+
+
+def read_index_mmap(path: str) -> faiss.Index:
+    """인덱스를 메모리 맵으로 읽기 (여러 워커가 페이지 캐시를 공유). 지원하지 않는 형식이면 일반 로드"""
+    flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    try:
+        return faiss.read_index(path, flags)
+    except RuntimeError:
+        return faiss.read_index(path, faiss.IO_FLAG_READ_ONLY)
+
+
+def reconstruct_all(index: faiss.Index) -> np.ndarray:
+    """인덱스에 저장된 모든 벡터를 순서대로 복원 (재학습/재구축용)"""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    ivf = _extract_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def _extract_ivf(index: faiss.Index) -> Optional[faiss.IndexIVF]:
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
@@ -0,0 +1,169 @@
+# jobs.py
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class IngestJob:
+    """업로드 한 번에 대한 인덱싱 작업 상태 (워커 스레드가 갱신, API가 조회)"""
+
+    def __init__(self, job_id: str, file_paths: List[str], reset_vector: bool = False,
+                 hashes: Optional[Dict[str, str]] = None, removed: Optional[List[str]] = None):
+        self.id = job_id
+        self.file_paths = file_paths
+        self.reset_vector = reset_vector
+        self.hashes = hashes or {}
+        self.removed = removed or []  # 교체되어 벡터를 지울 이전 파일
+        self.status = "queued"  # queued | running | completed | failed
+        self.files: Dict[str, dict] = {path: {"status": "queued", "chunks": 0, "error": None} for path in file_paths}
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.version: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        # 임베딩 순서상 파일별 마지막 청크 위치 (embedded 진행률을 파일 단위로 환산)
+        self._chunk_ends: List[tuple] = []
+
+    def _set_file(self, path: str, **fields) -> None:
+        self.files.setdefault(path, {"status": "queued", "chunks": 0, "error": None}).update(fields)
+
+    def on_progress(self, event: str, **info) -> None:
+        """DocumentProcessor.ingest_files의 progress 콜백"""
+        with self._lock:
+            if event == "skipped":
+                self._set_file(info["path"], status="skipped")
+            elif event == "removed":
+                self._set_file(info["path"], status="removed")
+            elif event == "failed":
+                self._set_file(info["path"], status="failed", error=info["error"])
+            elif event == "parsed":
+                self._set_file(info["path"], status="parsed", chunks=info["chunks"])
+                self.chunks_total += info["chunks"]
+                self._chunk_ends.append((info["path"], self.chunks_total))
+            elif event == "embedded":
+                self.chunks_embedded = info["done"]
+                for path, end in self._chunk_ends:
+                    if end <= info["done"] and self.files[path]["status"] == "parsed":
+                        self.files[path]["status"] = "embedded"
+            elif event == "committed":
+                self.version = info["version"]
+                for path, _ in self._chunk_ends:
+                    self.files[path]["status"] = "indexed"
+
+    def mark(self, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.status = status
+            if status == "running":
+                self.started_at = time.time()
+                for entry in self.files.values():
+                    entry["status"] = "pending"
+            elif status in ("completed", "failed"):
+                self.finished_at = time.time()
+                self.error = error
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            done_files = sum(1 for f in self.files.values()
+                             if f["status"] in ("skipped", "failed", "indexed", "removed"))
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "files": {path: dict(entry) for path, entry in self.files.items()},
+                "progress": {
+                    "files_total": len(self.files),
+                    "files_done": done_files,
+                    "chunks_total": self.chunks_total,
+                    "chunks_embedded": self.chunks_embedded,
+                },
+                "throughput": {
+                    "elapsed_seconds": round(elapsed, 3),
+                    "chunks_per_second": round(self.chunks_embedded / elapsed, 2) if elapsed else 0.0,
+                    "files_per_second": round(done_files / elapsed, 2) if elapsed else 0.0,
+                },
+                "version": self.version,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """업로드된 파일의 인덱싱을 요청 밖에서 처리하는 작업 큐
+
+    - submit()은 즉시 작업 id를 돌려주고, 로컬 워커 스레드가 순서대로 인덱싱
+    - 인덱스는 ingest_files가 새 버전으로 저장한 뒤 CURRENT를 교체할 때만 바뀌므로
+      /ask/는 작업 중에도 이전 버전 전체를 계속 사용
+    - 끝난 작업은 최근 max_finished개까지만 보관
+    """
+
+    def __init__(self, registry, on_complete: Optional[Callable[[IngestJob], None]] = None,
+                 workers: int = 1, max_finished: int = 100):
+        self.registry = registry
+        self.on_complete = on_complete
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-worker")
+
+    def submit(self, file_paths: List[str], reset_vector: bool = False,
+               hashes: Optional[Dict[str, str]] = None, removed: Optional[List[str]] = None) -> IngestJob:
+        job = IngestJob(uuid.uuid4().hex, list(file_paths), reset_vector=reset_vector, hashes=hashes,
+                        removed=removed)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        print(f"[JobManager] 작업 등록: {job.id} ({len(file_paths)}개 파일)")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: IngestJob) -> None:
+        job.mark("running")
+        try:
+            processor = self.registry.processor
+            # reset_vector도 빈 인덱스에서 새 버전을 만든 뒤 교체 (작업 중에는 이전 버전으로 질의)
+            result = processor.ingest_files(job.file_paths, progress=job.on_progress, raise_errors=False,
+                                            hashes=job.hashes, removed=job.removed, reset=job.reset_vector)
+            error = f"{len(result['failed'])}개 파일 처리 실패" if result["failed"] else None
+            job.mark("completed", error=error)
+            print(f"[JobManager] 작업 완료: {job.id} {job.to_dict()['progress']}")
+        except Exception as e:
+            print(f"[JobManager] 작업 실패: {job.id}: {e}")
+            print(traceback.format_exc())
+            job.mark("failed", error=str(e))
+        finally:
+            if self.on_complete is not None:
+                try:
+                    self.on_complete(job)
+                except Exception as e:
+                    print(f"[JobManager] 완료 콜백 실패: {e}")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
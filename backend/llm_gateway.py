@@ -0,0 +1,471 @@
+# llm_gateway.py
+
+import asyncio
+import copy
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, Optional
+
+import httpx
+from ollama import AsyncClient, Client, ResponseError
+
+# 재시도할 HTTP 상태 (Ollama는 대기열이 가득 차면 503을 반환)
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+# 요청(질문) 하나 동안의 LLM 사용량 집계 대상 (track_usage()로 설정)
+_usage: ContextVar[Optional[dict]] = ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def track_usage():
+    """이 블록 안(같은 컨텍스트에서 실행되는 태스크 / run_blocking 포함)의 LLM 호출 사용량을 모음
+
+    prompt_eval_tokens는 Ollama가 실제로 새로 계산한 프롬프트 토큰 수라서
+    KV 캐시에서 재사용된 prefix만큼 줄어듦 (prefix 재사용 효과 확인용)
+    """
+    usage = {"calls": 0, "prompt_eval_tokens": 0, "prompt_eval_ms": 0.0, "eval_tokens": 0, "eval_ms": 0.0}
+    previous = _usage.get()
+    _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        # 스트리밍 응답(async generator)은 다른 컨텍스트에서 닫힐 수 있어 reset(token) 대신 이전 값으로 되돌림
+        _usage.set(previous)
+
+
+class LLMQueueTimeoutError(Exception):
+    def __init__(self, timeout: float):
+        super().__init__(f"LLM 요청 대기 시간({timeout}초)을 초과했습니다.")
+        self.timeout = timeout
+
+
+class _Slots:
+    """동기(스레드) / 비동기(이벤트 루프) 호출이 함께 쓰는 동시 실행 슬롯
+
+    - 동기 호출은 Condition으로, 비동기 호출은 이벤트 루프의 future로 기다림 (대기 중 스레드를 점유하지 않음)
+    - 반납 시 동기 대기자 하나와 비동기 대기자 하나를 깨우고, 먼저 잡은 쪽이 슬롯을 가져감
+    """
+
+    def __init__(self, size: int):
+        self._cond = threading.Condition(threading.Lock())
+        self._free = size
+        self._async_waiters = deque()  # (loop, future), 먼저 온 순서
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._free == 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self._free -= 1
+            return True
+
+    async def aacquire(self, timeout: Optional[float] = None) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        retry = False
+        while True:
+            with self._cond:
+                if self._free > 0:
+                    self._free -= 1
+                    return True
+                waiter = loop.create_future()
+                # 깨어났지만 슬롯을 놓친 경우 순서를 잃지 않도록 맨 앞에 다시 줄 섬
+                (self._async_waiters.appendleft if retry else self._async_waiters.append)((loop, waiter))
+            retry = True
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                self._discard(loop, waiter)
+                return False
+            except asyncio.CancelledError:
+                self._discard(loop, waiter)
+                raise
+
+    def release(self) -> None:
+        with self._cond:
+            self._free += 1
+            self._cond.notify()
+            self._wake_async()
+
+    def _discard(self, loop, waiter) -> None:
+        """대기를 그만둔 비동기 대기자 제거 (그 사이 받은 깨움은 다음 대기자에게 넘김)"""
+        with self._cond:
+            try:
+                self._async_waiters.remove((loop, waiter))
+            except ValueError:
+                pass
+            if self._free > 0:
+                self._wake_async()
+
+    def _wake_async(self) -> None:
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            if waiter.done():
+                continue
+            try:
+                loop.call_soon_threadsafe(_set_pending, waiter)
+                return
+            except RuntimeError:
+                continue  # 루프가 이미 닫힘
+
+
+def _set_pending(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, ResponseError):
+        return error.status_code in RETRYABLE_STATUS
+    # 연결 실패 / 타임아웃 (httpx.TimeoutException도 TransportError)
+    return isinstance(error, (httpx.TransportError, ConnectionError))
+
+
+class LLMGateway:
+    """모든 도구 / 그래프 노드가 공유하는 Ollama 호출 창구
+
+    - HTTP 연결 풀 하나를 재사용 (동기 Client + 이벤트 루프별 AsyncClient)
+    - keep_alive로 요청 사이에 모델이 메모리에서 내려가지 않도록 유지
+    - 세마포어로 Ollama 서버에 동시에 보내는 생성 요청 수를 제한 (초과분은 대기열에서 기다림)
+    - 연결 실패 / 5xx는 지수 백오프로 재시도 (스트리밍은 첫 토큰 전까지만)
+    - invoke / ainvoke / stream / astream은 OllamaLLM과 같은 형태로 사용
+    """
+
+    def __init__(self, model: str = "llama3", base_url: str = "http://localhost:11434", temperature: float = 0.1,
+                 keep_alive: Optional[str] = "30m", max_concurrency: int = 4, queue_timeout: Optional[float] = None,
+                 connect_timeout: float = 5.0, request_timeout: Optional[float] = 300.0, max_retries: int = 2,
+                 retry_backoff: float = 0.5, max_connections: int = 16, system: Optional[str] = None, **options):
+        self.model = model
+        # 모든 요청에 같은 시스템 프롬프트를 붙여 프롬프트 앞부분의 KV 캐시를 재사용
+        self.system = system
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.options = {"temperature": temperature, **options}
+
+        self._client_kwargs = {
+            "timeout": httpx.Timeout(request_timeout, connect=connect_timeout),
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        }
+        self._client = Client(host=base_url, **self._client_kwargs)
+        # httpx.AsyncClient는 만든 이벤트 루프에서만 쓸 수 있으므로 루프별로 하나씩
+        self._async_clients = {}
+
+        # bind()로 만든 사본과 공유되는 상태
+        self._slots = _Slots(max_concurrency)
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "queue_timeouts": 0,
+            "in_flight": 0,
+            "waiting": 0,
+            "max_in_flight": 0,
+            "max_waiting": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "generation_seconds_total": 0.0,
+            "prompt_eval_tokens": 0,
+            "prompt_eval_seconds_total": 0.0,
+            "eval_tokens": 0,
+            "model_loads": 0,
+        }
+
+    def bind(self, **options) -> "LLMGateway":
+        """같은 연결 풀 / 동시성 제한을 쓰면서 생성 옵션(num_predict 등)만 다른 사본"""
+        bound = copy.copy(self)
+        bound.options = {**self.options, **options}
+        return bound
+
+    # ---------- 동시성 제한 ----------
+
+    def _enter_queue(self) -> float:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["waiting"] += 1
+            self._stats["max_waiting"] = max(self._stats["max_waiting"], self._stats["waiting"])
+        return time.perf_counter()
+
+    def _leave_queue(self, queued_at: float, acquired: bool, timed_out: bool = True) -> None:
+        waited = time.perf_counter() - queued_at
+        with self._lock:
+            self._stats["waiting"] -= 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            if acquired:
+                self._stats["in_flight"] += 1
+                self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+            elif timed_out:
+                self._stats["queue_timeouts"] += 1
+
+    def _release(self, started: float, failed: bool) -> None:
+        self._slots.release()
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            self._stats["generation_seconds_total"] += time.perf_counter() - started
+            self._stats["failed" if failed else "completed"] += 1
+
+    @contextmanager
+    def _slot(self):
+        queued_at = self._enter_queue()
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        self._leave_queue(queued_at, acquired)
+        if not acquired:
+            raise LLMQueueTimeoutError(self.queue_timeout)
+        started, failed = time.perf_counter(), True
+        try:
+            yield
+            failed = False
+        finally:
+            self._release(started, failed)
+
+    @asynccontextmanager
+    async def _aslot(self):
+        queued_at = self._enter_queue()
+        try:
+            # 이벤트 루프에서 future로 기다림 (대기 요청마다 스레드를 붙잡지 않음)
+            acquired = await self._slots.aacquire(timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._leave_queue(queued_at, False, timed_out=False)
+            raise
+        self._leave_queue(queued_at, acquired)
+        if not acquired:
+            raise LLMQueueTimeoutError(self.queue_timeout)
+        started, failed = time.perf_counter(), True
+        try:
+            yield
+            failed = False
+        finally:
+            self._release(started, failed)
+
+    # ---------- 요청 ----------
+
+    def _async_client(self) -> AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncClient(host=self.base_url, **self._client_kwargs)
+            self._async_clients[loop] = client
+        return client
+
+    def _request(self, prompt: str, stream: bool, options: dict, context: Optional[list] = None) -> dict:
+        request = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {**self.options, **options},
+            "keep_alive": self.keep_alive,
+        }
+        if self.system is not None:
+            request["system"] = self.system
+        if context:
+            # 이전 응답의 context(토큰)를 이어서 생성 (대화 연속일 때만 의미 있음)
+            request["context"] = context
+        return request
+
+    def _retry_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """재시도하면 대기 시간(초), 아니면 None"""
+        if attempt >= self.max_retries or not _is_retryable(error):
+            return None
+        with self._lock:
+            self._stats["retries"] += 1
+        delay = self.retry_backoff * (2 ** attempt)
+        print(f"[LLMGateway] 요청 실패, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {error}")
+        return delay
+
+    def _record(self, response) -> None:
+        """마지막 응답(done)의 토큰 수 / 모델 로드 여부 집계"""
+        prompt_tokens = response.get("prompt_eval_count") or 0
+        prompt_ms = (response.get("prompt_eval_duration") or 0) / 1e6
+        eval_tokens = response.get("eval_count") or 0
+        eval_ms = (response.get("eval_duration") or 0) / 1e6
+        with self._lock:
+            self._stats["prompt_eval_tokens"] += prompt_tokens
+            self._stats["prompt_eval_seconds_total"] += prompt_ms / 1000
+            self._stats["eval_tokens"] += eval_tokens
+            # load_duration이 길면 keep_alive가 끝나 모델을 다시 올린 것
+            if (response.get("load_duration") or 0) > 1e9:
+                self._stats["model_loads"] += 1
+        usage = _usage.get()
+        if usage is not None:
+            usage["calls"] += 1
+            usage["prompt_eval_tokens"] += prompt_tokens
+            usage["prompt_eval_ms"] += prompt_ms
+            usage["eval_tokens"] += eval_tokens
+            usage["eval_ms"] += eval_ms
+        print(f"[LLMGateway] prefill {prompt_tokens} tok / {prompt_ms:.0f} ms, 생성 {eval_tokens} tok / {eval_ms:.0f} ms")
+
+    def invoke(self, prompt: str, context: Optional[list] = None, **options) -> str:
+        with self._slot():
+            attempt = 0
+            while True:
+                try:
+                    response = self._client.generate(**self._request(prompt, False, options, context))
+                    break
+                except Exception as e:
+                    delay = self._retry_delay(attempt, e)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+        self._record(response)
+        return response["response"]
+
+    async def ainvoke(self, prompt: str, context: Optional[list] = None, **options) -> str:
+        async with self._aslot():
+            attempt = 0
+            while True:
+                try:
+                    response = await self._async_client().generate(**self._request(prompt, False, options, context))
+                    break
+                except Exception as e:
+                    delay = self._retry_delay(attempt, e)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+        self._record(response)
+        return response["response"]
+
+    def stream(self, prompt: str, context: Optional[list] = None, **options) -> Iterator[str]:
+        with self._slot():
+            attempt = 0
+            while True:
+                started = False
+                try:
+                    for chunk in self._client.generate(**self._request(prompt, True, options, context)):
+                        started = True
+                        if chunk.get("done"):
+                            self._record(chunk)
+                        if chunk["response"]:
+                            yield chunk["response"]
+                    return
+                except Exception as e:
+                    # 이미 토큰을 내보냈으면 다시 시작할 수 없음
+                    delay = None if started else self._retry_delay(attempt, e)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+
+    async def astream(self, prompt: str, context: Optional[list] = None, **options) -> AsyncIterator[str]:
+        async with self._aslot():
+            attempt = 0
+            while True:
+                started = False
+                try:
+                    async for chunk in await self._async_client().generate(**self._request(prompt, True, options, context)):
+                        started = True
+                        if chunk.get("done"):
+                            self._record(chunk)
+                        if chunk["response"]:
+                            yield chunk["response"]
+                    return
+                except Exception as e:
+                    delay = None if started else self._retry_delay(attempt, e)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+    async def awarmup(self) -> None:
+        """빈 프롬프트로 모델만 미리 올려둠 (첫 질문의 모델 로드 지연 제거)"""
+        try:
+            started = time.perf_counter()
+            await self._async_client().generate(model=self.model, prompt="", keep_alive=self.keep_alive)
+            print(f"[LLMGateway] 모델 로드 완료: {self.model} ({time.perf_counter() - started:.1f}s)")
+        except Exception as e:
+            print(f"[LLMGateway] 모델 미리 로드 실패 (첫 요청 때 로드): {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            finished = self._stats["completed"] + self._stats["failed"]
+            return {
+                **self._stats,
+                "avg_wait_seconds": self._stats["wait_seconds_total"] / self._stats["requests"]
+                if self._stats["requests"] else 0.0,
+                "avg_generation_seconds": self._stats["generation_seconds_total"] / finished if finished else 0.0,
+                "model": self.model,
+                "max_concurrency": self.max_concurrency,
+                "keep_alive": self.keep_alive,
+            }
+
+
+_gateway: Optional[LLMGateway] = None
+_langchain_llm = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm(**options) -> LLMGateway:
+    """공유 LLM 게이트웨이. 옵션을 주면 같은 연결 풀을 쓰는 사본 (예: get_llm(num_predict=300))"""
+    global _gateway
+    if _gateway is None:
+        from config import (
+            LLM_BASE_URL,
+            LLM_CONNECT_TIMEOUT,
+            LLM_KEEP_ALIVE,
+            LLM_MAX_CONCURRENCY,
+            LLM_MAX_CONNECTIONS,
+            LLM_MAX_RETRIES,
+            LLM_MODEL,
+            LLM_NUM_CTX,
+            LLM_QUEUE_TIMEOUT,
+            LLM_REQUEST_TIMEOUT,
+            LLM_RETRY_BACKOFF,
+            LLM_TEMPERATURE,
+        )
+        from prompts import SYSTEM_PROMPT
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(
+                    model=LLM_MODEL,
+                    base_url=LLM_BASE_URL,
+                    temperature=LLM_TEMPERATURE,
+                    keep_alive=LLM_KEEP_ALIVE,
+                    max_concurrency=LLM_MAX_CONCURRENCY,
+                    queue_timeout=LLM_QUEUE_TIMEOUT,
+                    connect_timeout=LLM_CONNECT_TIMEOUT,
+                    request_timeout=LLM_REQUEST_TIMEOUT,
+                    max_retries=LLM_MAX_RETRIES,
+                    retry_backoff=LLM_RETRY_BACKOFF,
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    system=SYSTEM_PROMPT,
+                    num_ctx=LLM_NUM_CTX,
+                )
+    return _gateway.bind(**options) if options else _gateway
+
+
+def get_langchain_llm():
+    """LangChain 체인(RetrievalQA 등)에 넘길 공유 OllamaLLM (같은 설정 / 인스턴스 하나의 연결 풀)
+
+    체인 내부 호출은 게이트웨이의 동시성 제한 / 통계에 포함되지 않음
+    """
+    global _langchain_llm
+    if _langchain_llm is None:
+        from langchain_ollama import OllamaLLM
+        gateway = get_llm()
+        with _gateway_lock:
+            if _langchain_llm is None:
+                _langchain_llm = OllamaLLM(
+                    model=gateway.model,
+                    base_url=gateway.base_url,
+                    temperature=gateway.options["temperature"],
+                    num_ctx=gateway.options.get("num_ctx"),
+                    keep_alive=gateway.keep_alive,
+                    client_kwargs=dict(gateway._client_kwargs),
+                )
+    return _langchain_llm
@@ -1,16 +1,35 @@
 # main.py
 
+import asyncio
 import os
 import shutil
-import json
-import re
 import traceback  # 추가
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from document_processor import DocumentProcessor
-from agent_graph import build_agent_graph
+import orjson
+from answer_cache import AnswerCache
+from artifacts import chart_records
+from agent_graph import get_agent_graph, get_tool_graph, rebuild_agent_graph, astream_final_answer
+from executor import ask_limiter, run_blocking, shutdown_executor
+from jobs import JobManager
+from llm_gateway import LLMQueueTimeoutError, get_llm, track_usage
+from uploads import UploadStore, UploadTooLargeError
+from parsing import shutdown_parse_pool
+from registry import init_registry
+from config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_TTL_SECONDS,
+    ANSWER_MODE,
+    INGEST_JOBS_KEEP,
+    INGEST_WORKERS,
+    LLM_WARMUP_ON_STARTUP,
+    MAX_UPLOAD_BYTES,
+    UPLOAD_CHUNK_SIZE,
+)
 
 # config.py가 없다면 여기서 직접 정의
 try:
@@ -20,10 +39,45 @@ except ImportError:
     UPLOAD_DIR = "./uploads"
     VECTOR_DB_DIR = "./vector_db"
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 임베딩 모델 / 벡터스토어는 프로세스당 한 번만 로드하고 도구들이 공유
+    registry = init_registry(VECTOR_DB_DIR)
+    await run_blocking(registry.warmup)
+    app.state.registry = registry
+    # 에이전트 그래프는 시작 시 한 번만 컴파일
+    app.state.graph = get_agent_graph()
+    app.state.tool_graph = get_tool_graph()
+    # 반복 질문용 답변 캐시 (유사 질문 비교에는 공유 임베딩 모델 사용)
+    app.state.answer_cache = AnswerCache(
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        embed_fn=registry.processor.embeddings.embed_query,
+    )
+    # 업로드 인덱싱은 백그라운드 작업으로 처리하고, 새 버전이 공개되면 캐시를 비움
+    app.state.jobs = JobManager(
+        registry,
+        on_complete=lambda job: on_ingest_complete(app, job),
+        workers=INGEST_WORKERS,
+        max_finished=INGEST_JOBS_KEEP,
+    )
+    # 첫 질문에서 모델 로드를 기다리지 않도록 백그라운드로 미리 로드 (keep_alive 동안 유지)
+    if LLM_WARMUP_ON_STARTUP:
+        app.state.llm_warmup = asyncio.create_task(get_llm().awarmup())
+    yield
+    app.state.jobs.close()
+    registry.close()
+    shutdown_executor()
+    shutdown_parse_pool()
+
+
 app = FastAPI(
     title="RAG 기반 문서 질의응답 API",
     description="문서 업로드 → 임베딩 → 질문/응답까지 수행하는 API입니다.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS 설정 (프론트엔드와 연동 시 필수)
@@ -36,50 +90,162 @@ app.add_middleware(
 )
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# 업로드 폴더 (내용 해시당 한 벌만 저장, 원래 이름 → 현재 내용 매핑 유지)
+upload_store = UploadStore(UPLOAD_DIR)
+
+
+def ensure_vector_db():
+    """벡터 DB가 먼저 구축되어야 질문 가능"""
+    if not os.path.exists(VECTOR_DB_DIR):
+        print(f"벡터 DB 경로가 존재하지 않습니다: {VECTOR_DB_DIR}")
+        raise HTTPException(status_code=400, detail="벡터 DB가 존재하지 않습니다. 먼저 문서를 업로드해주세요.")
+
+    # 벡터 DB 폴더는 있지만 실제 파일들이 있는지 확인
+    vector_files = os.listdir(VECTOR_DB_DIR)
+    print(f"벡터 DB 폴더 내용: {vector_files}")
+
+    if not vector_files:
+        print(f"벡터 DB 폴더가 비어있습니다: {VECTOR_DB_DIR}")
+        raise HTTPException(status_code=400, detail="벡터 DB가 비어있습니다. 먼저 문서를 업로드해주세요.")
+
+
+def on_ingest_complete(app: FastAPI, job) -> None:
+    # 교체된 이전 파일은 작업이 그 벡터를 처리한 뒤에 삭제 (분석기 중복 집계 방지)
+    if job.removed:
+        deleted = upload_store.discard(job.removed)
+        print(f"[on_ingest_complete] 교체된 업로드 파일 {len(deleted)}개 삭제")
+    if job.version is not None or job.reset_vector:
+        app.state.registry.invalidate()
+        app.state.answer_cache.clear()
+
+
+def save_upload(upload: UploadFile):
+    """업로드 파일을 청크 단위로 스트리밍 저장 (SHA-256 계산, 내용 기반 파일명)"""
+    return upload_store.save(upload.file, upload.filename,
+                             max_bytes=MAX_UPLOAD_BYTES, chunk_size=UPLOAD_CHUNK_SIZE)
+
+
+def build_initial_state(question: str, answer_mode: Optional[str] = None) -> dict:
+    state = {"question": question}
+    if answer_mode in ("single", "two_pass"):
+        state["answer_mode"] = answer_mode
+    return state
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
 
 
 @app.post("/upload/")
 async def upload_file(file: List[UploadFile] = File(...), reset_vector: bool = Form(False), reset_folder: bool = Form(False)):
     """
-    - 문서 업로드 후 벡터스토어 구축
-    - reset=True: 기존 벡터스토어 초기화 후 다시 생성
+    - 문서를 저장한 뒤 인덱싱 작업을 등록하고 바로 작업 id를 반환 (진행 상황은 /jobs/{job_id})
+    - 파일은 `{원래 이름}__{해시 12자리}{확장자}`로 저장하고, 같은 내용은 이름이 달라도 한 벌만 보관
+    - 같은 이름으로 다른 내용이 올라오면 작업에서 이전 벡터를 제거한 뒤 이전 파일도 삭제 (분석기 중복 집계 방지)
+    - 중간 파일 저장이 실패해도 앞서 저장된 파일은 작업으로 넘김 (교체된 파일의 벡터가 남지 않도록)
+    - 이미 저장 / 인덱싱된 내용과 같은 파일은 작업에서 제외
+    - reset_vector=True: 이번 파일만으로 새 벡터스토어 버전을 만들어 완료 시 교체 (작업 중에는 이전 버전 사용)
     """
     try:
-        # 벡터 및 폴더 DB 초기화 여부 처리
-        if reset_vector and os.path.exists(VECTOR_DB_DIR):
-            shutil.rmtree(VECTOR_DB_DIR)
+        # 폴더 초기화 여부 처리 (벡터 DB 초기화는 작업 순서에 맞춰 워커에서 수행)
         if reset_folder and os.path.exists(UPLOAD_DIR):
-            shutil.rmtree(UPLOAD_DIR, ignore_errors=True)
+            await run_blocking(shutil.rmtree, UPLOAD_DIR, ignore_errors=True)
             os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-        # 파일들 저장
-        file_paths = []
+        # 크기를 미리 알 수 있으면 저장 전에 거절
         for f in file:
-            file_path = os.path.join(UPLOAD_DIR, f.filename)
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(f.file, buffer)
-            file_paths.append(file_path)
-
-        # 문서 임베딩 수행
-        processor = DocumentProcessor(db_dir=VECTOR_DB_DIR)
-        all_docs = []
-        for path in file_paths:
-            docs = processor.load_documents(path)
-            all_docs.extend(docs)
-        processor.build_vector_store(all_docs)
-
-        return JSONResponse(
-            content={"message": f"총 {len(file_paths)}개 파일 벡터스토어 저장 완료."},
-            status_code=200,
+            size = getattr(f, "size", None)
+            if MAX_UPLOAD_BYTES and size is not None and size > MAX_UPLOAD_BYTES:
+                raise UploadTooLargeError(f.filename, MAX_UPLOAD_BYTES)
+
+        # 파일들 저장 (이미 인덱싱된 내용 해시는 다시 임베딩하지 않음)
+        known_hashes = set() if reset_vector else await run_blocking(app.state.registry.processor.known_hashes)
+        files = []
+        hashes = {}
+        removed = {}  # 같은 이름의 새 내용으로 교체되어 벡터를 지울 이전 파일 (순서 유지)
+
+        def submit_job():
+            return app.state.jobs.submit(list(hashes), reset_vector=reset_vector, hashes=hashes,
+                                         removed=list(removed))
+
+        for f in file:
+            try:
+                stored = await run_blocking(save_upload, f)
+            except Exception:
+                if hashes or removed:
+                    job = submit_job()
+                    print(f"[upload_file] {f.filename} 저장 실패, 앞서 저장된 파일은 작업 {job.id}로 처리")
+                raise
+            for path in stored.retired:
+                removed[path] = None
+                hashes.pop(path, None)  # 같은 요청에서 먼저 올라왔다가 교체된 파일
+                for entry in files:
+                    if entry["stored_as"] == os.path.basename(path):
+                        entry["status"] = "replaced"
+            removed.pop(stored.path, None)
+            # 새로 저장된 파일은 항상 인덱싱 (중복으로 거절되는 파일은 바이트를 남기지 않음)
+            duplicate = stored.path in hashes or (not stored.created and stored.sha256 in known_hashes)
+            files.append({
+                "filename": f.filename,
+                "stored_as": os.path.basename(stored.path),
+                "sha256": stored.sha256,
+                "size": stored.size,
+                "status": "duplicate" if duplicate else "queued",
+            })
+            if not duplicate:
+                hashes[stored.path] = stored.sha256
+
+        if not hashes and not removed:
+            return ORJSONResponse(
+                content={
+                    "message": f"총 {len(files)}개 파일이 이미 업로드되어 있습니다.",
+                    "job_id": None,
+                    "files": files,
+                },
+                status_code=200,
+            )
+
+        # 임베딩/인덱싱은 백그라운드 작업으로 (새로 추가되거나 내용이 바뀐 파일만)
+        job = submit_job()
+
+        return ORJSONResponse(
+            content={
+                "message": f"총 {len(files)}개 파일 업로드 완료 (새 파일 {len(hashes)}개). "
+                           f"벡터스토어 저장을 진행합니다. (작업 ID: {job.id})",
+                "job_id": job.id,
+                "status_url": f"/jobs/{job.id}",
+                "files": files,
+            },
+            status_code=202,
         )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print(f"업로드 에러: {e}")
         print(f"업로드 에러 상세: {traceback.format_exc()}")
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+        return ORJSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@app.get("/jobs/")
+async def list_jobs():
+    """최근 인덱싱 작업 목록"""
+    return ORJSONResponse(content={"jobs": [
+        {"job_id": job.id, "status": job.status, "files": len(job.file_paths), "created_at": job.created_at}
+        for job in app.state.jobs.list_jobs()
+    ]})
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """인덱싱 작업의 파일별 진행 상황 / 처리량 / 오류"""
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"작업을 찾을 수 없습니다: {job_id}")
+    return ORJSONResponse(content=job.to_dict())
 
 
 @app.post("/ask/")
-async def ask_question(question: str = Form(...)):
+async def ask_question(question: str = Form(...), answer_mode: Optional[str] = Form(None)):
     """
     질문에 대한 답변을 생성
     """
@@ -89,26 +255,23 @@ async def ask_question(question: str = Form(...)):
         print(f"VECTOR_DB_DIR: {VECTOR_DB_DIR}")
         print(f"UPLOAD_DIR: {UPLOAD_DIR}")
         
-        # 벡터 DB가 먼저 구축되어야 질문 가능
-        if not os.path.exists(VECTOR_DB_DIR):
-            print(f"벡터 DB 경로가 존재하지 않습니다: {VECTOR_DB_DIR}")
-            raise HTTPException(status_code=400, detail="벡터 DB가 존재하지 않습니다. 먼저 문서를 업로드해주세요.")
-
-        # 벡터 DB 폴더는 있지만 실제 파일들이 있는지 확인
-        vector_files = os.listdir(VECTOR_DB_DIR)
-        print(f"벡터 DB 폴더 내용: {vector_files}")
-        
-        if not vector_files:
-            print(f"벡터 DB 폴더가 비어있습니다: {VECTOR_DB_DIR}")
-            raise HTTPException(status_code=400, detail="벡터 DB가 비어있습니다. 먼저 문서를 업로드해주세요.")
+        ensure_vector_db()
 
-        print("그래프 빌드 시작...")
-        graph = build_agent_graph()
-        print("그래프 빌드 완료")
+        cache = app.state.answer_cache
+        mode = answer_mode or ANSWER_MODE
+        cached = await run_blocking(cache.get, question, app.state.registry.index_version, mode)
+        if cached is not None:
+            print("답변 캐시 적중")
+            return ORJSONResponse(content=cached)
+
+        graph = app.state.graph
         
         print("그래프 invoke 시작...")
-        result = graph.invoke({"question": question})
-        print("그래프 invoke 완료")
+        # 이 질문에서 발생한 LLM 호출의 prefill / 생성 토큰 수를 함께 반환
+        with track_usage() as usage:
+            async with ask_limiter:
+                result = await graph.ainvoke(build_initial_state(question, answer_mode))
+        print(f"그래프 invoke 완료 (LLM 사용량: {usage})")
         print(f"결과 타입: {type(result)}")
         print(f"결과 키들: {result.keys() if isinstance(result, dict) else 'dict가 아님'}")
         
@@ -120,34 +283,127 @@ async def ask_question(question: str = Form(...)):
         print(f"observation 시작 부분: {obs[:200]}...")
         print(f"final_answer 시작 부분: {final_answer[:200]}...")
 
-        # Observation에서 JSON이 있으면 추출
-        match = re.search(r"\[DATAFRAME_JSON_START](.*?)\[DATAFRAME_JSON_END]", obs, re.DOTALL)
-        if match:
-            print("JSON 데이터 발견, 파싱 시작...")
-            try:
-                df_data = json.loads(match.group(1))
-                print(f"JSON 파싱 성공, 데이터 길이: {len(df_data)}")
-            except json.JSONDecodeError as je:
-                print(f"JSON 파싱 실패: {je}")
-                df_data = []
-        else:
-            print("JSON 데이터 없음")
-            df_data = []
+        # 표 데이터는 프롬프트를 거치지 않은 artifacts에서 바로 꺼냄 (dataframe은 차트용 일별 요약만, 기존 레코드 형식)
+        artifacts = result.get("artifacts") or {}
+        content = {
+            "answer": final_answer,
+            "dataframe": chart_records(artifacts),
+            "artifacts": artifacts,
+        }
+        # 도구가 인덱스를 갱신했을 수 있으므로 실행 후 버전으로 저장
+        await run_blocking(cache.put, question, app.state.registry.index_version, content, mode)
 
         print("응답 생성 완료")
-        return JSONResponse(content={
-            "answer": final_answer,
-            "dataframe": df_data
-        })
+        return ORJSONResponse(content={**content, "usage": usage})
     
     except HTTPException:
         raise  # HTTPException은 그대로 전달
+    except LLMQueueTimeoutError as e:
+        # LLM 대기열이 가득 차 제한 시간 안에 순서가 오지 않음
+        return ORJSONResponse(content={"error": str(e)}, status_code=503)
     except Exception as e:
         print(f"=== 질문 처리 에러 ===")
         print(f"에러 메시지: {str(e)}")
         print(f"에러 상세:")
         print(traceback.format_exc())
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+        return ORJSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(question: str = Form(...), answer_mode: Optional[str] = Form(None)):
+    """
+    질문에 대한 답변을 Server-Sent Events로 스트리밍
+    - event: dataframe  시각화 데이터가 있으면 가장 먼저 전송
+    - event: token      최종 답변 토큰
+    - event: done / error
+    """
+    print(f"=== 스트리밍 질문 처리 시작 ===")
+    print(f"질문: {question}")
+    ensure_vector_db()
+    tool_graph = app.state.tool_graph
+    cache = app.state.answer_cache
+    mode = answer_mode or ANSWER_MODE
+
+    async def event_stream():
+        try:
+            cached = await run_blocking(cache.get, question, app.state.registry.index_version, mode)
+            if cached is not None:
+                if cached["dataframe"]:
+                    yield sse_event("dataframe", cached["dataframe"])
+                yield sse_event("token", {"text": cached["answer"]})
+                yield sse_event("done", {"cached": True})
+                return
+
+            tokens = []
+            with track_usage() as usage:
+                async with ask_limiter:
+                    result = await tool_graph.ainvoke(build_initial_state(question, answer_mode))
+                    artifacts = result.get("artifacts") or {}
+                    df_data = chart_records(artifacts)
+                    if df_data:
+                        yield sse_event("dataframe", df_data)
+                    async for token in astream_final_answer(result):
+                        tokens.append(token)
+                        yield sse_event("token", {"text": token})
+            await run_blocking(
+                cache.put, question, app.state.registry.index_version,
+                {"answer": "".join(tokens), "dataframe": df_data, "artifacts": artifacts}, mode
+            )
+            yield sse_event("done", {"usage": usage})
+        except Exception as e:
+            print(f"=== 스트리밍 질문 처리 에러 ===")
+            print(traceback.format_exc())
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/documents/{filename}")
+async def delete_document(filename: str):
+    """
+    업로드된 파일과 해당 파일의 벡터를 삭제
+    """
+    file_path = await run_blocking(upload_store.resolve, filename)
+    registry = app.state.registry
+    removed = await run_blocking(registry.processor.remove_source, file_path)
+    registry.invalidate()
+    app.state.answer_cache.clear()
+    await run_blocking(upload_store.forget, file_path)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    elif removed == 0:
+        raise HTTPException(status_code=404, detail="해당 파일이 없습니다.")
+    return {"message": f"{filename} 삭제 완료", "removed_vectors": removed}
+
+
+@app.get("/cache/stats")
+async def answer_cache_stats():
+    """
+    답변 캐시 적중/미적중 통계 (임계값 튜닝용)
+    """
+    return app.state.answer_cache.stats()
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """
+    LLM 게이트웨이 대기열 / 동시 실행 / 재시도 / 토큰 통계 (LLM_MAX_CONCURRENCY 튜닝용)
+    """
+    return get_llm().stats()
+
+
+@app.post("/graph/rebuild/")
+async def rebuild_graph():
+    """
+    도구 구성이 바뀌었을 때 캐시된 에이전트 그래프를 다시 컴파일
+    """
+    app.state.graph = rebuild_agent_graph()
+    app.state.tool_graph = get_tool_graph()
+    return {"message": "에이전트 그래프를 다시 빌드했습니다."}
 
 
 @app.get("/")
@@ -0,0 +1,210 @@
+# parsing.py
+
+import codecs
+import importlib.util
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+from langchain_core.documents import Document
+
+# 더 빠른 파싱 엔진 (설치되어 있을 때만 사용, 파일 전체를 읽는 read_table에서만 사용)
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
+# CSV 인코딩 판별 시 한 번에 읽는 바이트 수
+ENCODING_SCAN_BYTES = 1024 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _resolve_usecols(file_path: str, usecols, encoding: str):
+    """callable usecols를 실제 컬럼 목록으로 바꿈 (pyarrow 엔진은 callable을 지원하지 않음)"""
+    if usecols is None or not callable(usecols):
+        return usecols
+    header = pd.read_csv(file_path, nrows=0, encoding=encoding).columns
+    return [col for col in header if usecols(col)]
+
+
+def _read_csv(file_path: str, encoding: str, usecols=None, dtype=None) -> pd.DataFrame:
+    if HAS_PYARROW:
+        try:
+            return pd.read_csv(file_path, encoding=encoding, engine="pyarrow",
+                               usecols=_resolve_usecols(file_path, usecols, encoding), dtype=dtype)
+        except UnicodeDecodeError:
+            raise
+        except Exception as e:
+            print(f"[read_table] pyarrow 엔진 실패, 기본 엔진 사용: {os.path.basename(file_path)}: {e}")
+    return pd.read_csv(file_path, encoding=encoding, usecols=usecols, dtype=dtype)
+
+
+def read_table(file_path: str, usecols=None, dtype=None) -> pd.DataFrame:
+    """CSV/XLSX 전체를 사용 가능한 가장 빠른 엔진으로 읽음 (CSV: pyarrow, XLSX: calamine)
+
+    파일 전체가 메모리에 올라가므로 분석기 롤업처럼 필요한 컬럼만 읽는 경우에 사용.
+    업로드 문서 생성은 iter_table_frames로 행 묶음 단위로 스트리밍
+    """
+    if file_path.lower().endswith(".csv"):
+        try:
+            return _read_csv(file_path, "utf-8", usecols, dtype)
+        except UnicodeDecodeError:
+            return _read_csv(file_path, "cp949", usecols, dtype)
+    engine = "calamine" if HAS_CALAMINE else None
+    return pd.read_excel(file_path, engine=engine, usecols=usecols, dtype=dtype)
+
+
+def detect_csv_encoding(file_path: str) -> str:
+    """파일 전체를 utf-8로 점진 디코딩해 보고 실패하면 cp949 (메모리는 ENCODING_SCAN_BYTES만 사용)
+
+    스트리밍 중간에 인코딩 오류가 나면 이미 내보낸 청크를 되돌릴 수 없으므로 시작 전에 판별
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(file_path, 'rb') as f:
+            while True:
+                block = f.read(ENCODING_SCAN_BYTES)
+                if not block:
+                    break
+                decoder.decode(block)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return 'cp949'
+    return 'utf-8'
+
+
+def iter_csv_frames(file_path: str, rows_per_chunk: int) -> Iterator[pd.DataFrame]:
+    """CSV를 rows_per_chunk 행 단위로 스트리밍 (utf-8이 아니면 cp949)"""
+    encoding = detect_csv_encoding(file_path)
+    with pd.read_csv(file_path, encoding=encoding, chunksize=rows_per_chunk) as reader:
+        yield from reader
+
+
+def iter_excel_frames(file_path: str, rows_per_chunk: int) -> Iterator[pd.DataFrame]:
+    """첫 번째 시트를 read-only 모드로 rows_per_chunk 행씩 읽음"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) >= rows_per_chunk:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_table_frames(file_path: str, rows_per_chunk: int) -> Iterator[pd.DataFrame]:
+    """파일 형식에 맞는 스트리밍 리더로 rows_per_chunk 행씩 읽음 (큰 파일도 메모리 사용량이 일정)"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.csv':
+        return iter_csv_frames(file_path, rows_per_chunk)
+    if extension == '.xlsx':
+        return iter_excel_frames(file_path, rows_per_chunk)
+    raise ValueError(f"지원하지 않는 파일 형식: {extension}")
+
+
+def table_to_documents(file_path: str, frames: Iterable[pd.DataFrame]) -> List[Document]:
+    """행 묶음마다 헤더를 반복한 문서를 만들고 행 범위를 메타데이터로 기록"""
+    documents = []
+    row_start = 0
+    for df in frames:
+        if df.empty:
+            continue
+        row_end = row_start + len(df)
+        documents.append(Document(
+            page_content=df.to_string(index=False),
+            metadata={
+                "source": file_path,
+                "row_start": row_start + 1,
+                "row_end": row_end,
+                "columns": ", ".join(map(str, df.columns)),
+            }
+        ))
+        row_start = row_end
+    return documents
+
+
+def parse_documents(file_path: str, rows_per_chunk: int) -> List[Document]:
+    """파일 하나를 문서 목록으로 파싱 (프로세스 풀 워커에서 실행 가능)"""
+    return table_to_documents(file_path, iter_table_frames(file_path, rows_per_chunk))
+
+
+# ---------- 프로세스 풀 ----------
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # 부모 프로세스에는 임베딩 모델 스레드가 떠 있으므로 fork 대신 spawn
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def map_files(func: Callable, file_paths: List[str], *args, workers: int = 1) -> Dict[str, object]:
+    """파일마다 func(path, *args)를 실행해 {path: 결과 또는 예외} 반환
+
+    workers > 1이고 파일이 여러 개면 공유 프로세스 풀에서 병렬로 파싱 (func는 모듈 최상위 함수여야 함).
+    워커가 비정상 종료되면 풀을 다시 만들고 남은 파일은 현재 프로세스에서 처리
+    """
+    results: Dict[str, object] = {}
+    if workers <= 1 or len(file_paths) <= 1:
+        for path in file_paths:
+            try:
+                results[path] = func(path, *args)
+            except Exception as e:
+                results[path] = e
+        return results
+
+    pool = _get_pool(workers)
+    try:
+        futures = {path: pool.submit(func, path, *args) for path in file_paths}
+    except BrokenProcessPool:
+        _reset_pool()
+        return map_files(func, file_paths, *args, workers=1)
+
+    remaining = []
+    for path, future in futures.items():
+        try:
+            results[path] = future.result()
+        except BrokenProcessPool:
+            remaining.append(path)
+        except Exception as e:
+            results[path] = e
+
+    if remaining:
+        print(f"[map_files] 워커 프로세스 비정상 종료, {len(remaining)}개 파일 재처리")
+        _reset_pool()
+        results.update(map_files(func, remaining, *args, workers=1))
+    return results
+
+
+def shutdown_parse_pool() -> None:
+    _reset_pool()
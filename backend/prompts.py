@@ -0,0 +1,39 @@
+# prompts.py
+
+from typing import Tuple
+
+# Ollama는 직전 요청과 토큰이 같은 앞부분(prefix)의 KV 캐시를 재사용하므로 프롬프트를
+#   시스템 프롬프트(모든 요청에 바이트 단위로 동일) → 도구별 고정 지시문 → 잘 바뀌지 않는 데이터
+#   → 검색 문맥 → 질문
+# 순서로 배치. 조각마다 앞뒤 공백을 없애고 같은 구분자로 이어 들여쓰기 차이로 prefix가 깨지지 않도록 함
+# (시스템 프롬프트는 LLM 게이트웨이가 system 필드로 모든 요청에 붙임)
+
+SYSTEM_PROMPT = """당신은 입출고 데이터와 업로드된 문서를 분석해 한국어로 답변하는 어시스턴트입니다.
+다음 규칙을 따르세요:
+1. 제공된 자료에 근거해서 답변하고, 자료에 없는 내용은 추측하지 말고 모른다고 답하세요.
+2. 수치는 자료에 있는 값을 그대로 사용하세요.
+3. 자연스럽고 구체적인 한국어로 답변하세요."""
+
+TASK_INSTRUCTIONS = {
+    "default": "아래 문서 내용을 참고하여 질문에 답해주세요.",
+    "search_documents": "아래 문서에서 질문(검색어)과 관련된 정보를 찾아 정리해주세요.",
+    "summarize": "아래 문서 요약들을 바탕으로 질문에 답해주세요.",
+    "visualization": "아래 시각화 데이터와 문서를 참고하여 질문에 답해주세요. 시각화 데이터의 수치를 활용해 구체적으로 답변하세요.",
+    "observation": "아래 관찰 결과를 자연스럽고 구체적인 최종 답변으로 정리해주세요.",
+    "query_result": "아래는 입출고 데이터에서 직접 계산한 정확한 결과입니다. 숫자는 바꾸지 말고 질문에 대한 자연스러운 답변으로 정리해주세요.",
+}
+
+SECTION_SEPARATOR = "\n\n"
+
+
+def build_prompt(task: str, question: str, *sections: Tuple[str, str]) -> str:
+    """도구별 프롬프트 생성
+
+    sections: (제목, 내용) 목록. 요청 사이에 덜 바뀌는 것부터 순서대로 전달
+    예) build_prompt("visualization", q, ("시각화 데이터", table), ("문서 내용", context))
+    """
+    parts = [TASK_INSTRUCTIONS[task]]
+    parts += [f"{label}:\n{text.strip()}" for label, text in sections if text and text.strip()]
+    parts.append(f"질문: {question.strip()}")
+    parts.append("답변:")
+    return SECTION_SEPARATOR.join(parts)
@@ -0,0 +1,289 @@
+# query_planner.py
+
+import re
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from analyzer import period_start
+
+# 그 자체로 집계를 뜻하는 키워드 (앞에서부터 먼저 일치하는 것을 사용)
+AGG_KEYWORDS = (
+    ("평균", "mean"),
+    ("상위", "top"),
+    ("top", "top"),
+    ("가장 많", "max"),
+    ("제일 많", "max"),
+    ("최대", "max"),
+    ("가장 적", "min"),
+    ("제일 적", "min"),
+    ("최소", "min"),
+    ("합계", "sum"),
+    ("총합", "sum"),
+    ("총량", "sum"),
+    ("합산", "sum"),
+)
+
+# 수량 명사와 함께 쓰일 때만 합계로 보는 약한 키워드
+# ("입고 파일은 몇 개야?", "입고와 출고 데이터를 합쳐서 설명해줘" 같은 질문은 빠른 경로로 보내지 않음)
+WEAK_AGG_KEYWORDS = (("총", "sum"), ("합", "sum"), ("얼마", "sum"), ("몇", "sum"))
+QUANTITY_NOUNS = ("입고량", "출고량", "입출고량", "수량", "물량", "qty")
+
+# 이 단어가 있으면 다른 도구(요약/시각화)의 요청으로 보고 빠른 경로를 쓰지 않음
+EXCLUDE_KEYWORDS = ("요약", "정리", "시각화", "그래프", "차트")
+
+FREQ_KEYWORDS = (("일별", "day"), ("날짜별", "day"), ("주별", "week"), ("주간별", "week"), ("월별", "month"))
+
+GROUP_KEYWORDS = (("sku별", "SKU"), ("품목별", "SKU"), ("제품별", "Product"), ("상품별", "Product"),
+                  ("위치별", "Location"), ("로케이션별", "Location"), ("창고별", "Location"))
+
+# 답변 문장에 나열할 최대 행 수 (나머지는 표로만 전달)
+MAX_LISTED_ROWS = 20
+
+AGG_LABELS = {"sum": "합계", "mean": "일평균", "max": "최대", "min": "최소", "top": "상위"}
+
+_DATE = r"(\d{4})[-./](\d{1,2})[-./](\d{1,2})"
+DATE_RANGE_RE = re.compile(_DATE + r"\s*(?:~|부터|에서|to)\s*" + _DATE)
+DATE_RE = re.compile(_DATE)
+YEAR_MONTH_RE = re.compile(r"(\d{4})\s*년\s*(\d{1,2})\s*월")
+MONTH_RE = re.compile(r"(?<!\d)(\d{1,2})\s*월")
+YEAR_RE = re.compile(r"(\d{4})\s*년")
+RECENT_RE = re.compile(r"최근\s*(\d+)\s*(일|주|개월|달)")
+TOP_N_RE = re.compile(r"(?:상위|top)\s*(\d+)", re.IGNORECASE)
+# \b는 한글도 단어 문자로 보므로 "A-100의"처럼 조사가 붙으면 일치하지 않음 → 영숫자 경계만 확인
+SKU_RE = re.compile(r"(?<![A-Za-z0-9])([A-Za-z]+(?:-[A-Za-z]+)*-?\d+[A-Za-z0-9-]*)(?![A-Za-z0-9])")
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    start = date(year, month, 1)
+    next_month = date(year + (month == 12), month % 12 + 1, 1)
+    return start, next_month - timedelta(days=1)
+
+
+def parse_date_range(question: str, today: date) -> Tuple[Optional[date], Optional[date]]:
+    """질문의 기간 표현을 (시작일, 종료일)로 변환 (둘 다 포함). 기간이 없으면 (None, None)"""
+    match = DATE_RANGE_RE.search(question)
+    if match:
+        g = list(map(int, match.groups()))
+        return date(g[0], g[1], g[2]), date(g[3], g[4], g[5])
+    match = DATE_RE.search(question)
+    if match:
+        day = date(*map(int, match.groups()))
+        return day, day
+
+    match = YEAR_MONTH_RE.search(question)
+    if match:
+        return _month_range(int(match.group(1)), int(match.group(2)))
+
+    compact = question.replace(" ", "")
+    week_start = today - timedelta(days=today.weekday())
+    relative = (
+        ("그저께", lambda: (today - timedelta(days=2),) * 2),
+        ("어제", lambda: (today - timedelta(days=1),) * 2),
+        ("오늘", lambda: (today, today)),
+        ("지난주", lambda: (week_start - timedelta(days=7), week_start - timedelta(days=1))),
+        ("저번주", lambda: (week_start - timedelta(days=7), week_start - timedelta(days=1))),
+        ("전주", lambda: (week_start - timedelta(days=7), week_start - timedelta(days=1))),
+        ("이번주", lambda: (week_start, today)),
+        ("금주", lambda: (week_start, today)),
+        ("지난달", lambda: _month_range(*((today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)))),
+        ("저번달", lambda: _month_range(*((today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)))),
+        ("전월", lambda: _month_range(*((today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)))),
+        ("이번달", lambda: (today.replace(day=1), today)),
+        ("금월", lambda: (today.replace(day=1), today)),
+        ("작년", lambda: (date(today.year - 1, 1, 1), date(today.year - 1, 12, 31))),
+        ("지난해", lambda: (date(today.year - 1, 1, 1), date(today.year - 1, 12, 31))),
+        ("올해", lambda: (date(today.year, 1, 1), today)),
+        ("금년", lambda: (date(today.year, 1, 1), today)),
+    )
+    for keyword, resolve in relative:
+        if keyword in compact:
+            return resolve()
+
+    match = RECENT_RE.search(question)
+    if match:
+        n, unit = int(match.group(1)), match.group(2)
+        days = {"일": n, "주": n * 7}.get(unit, n * 30)
+        return today - timedelta(days=days - 1), today
+
+    match = MONTH_RE.search(question)
+    if match and 1 <= int(match.group(1)) <= 12:
+        return _month_range(today.year, int(match.group(1)))
+    match = YEAR_RE.search(question)
+    if match:
+        year = int(match.group(1))
+        return date(year, 1, 1), date(year, 12, 31)
+    return None, None
+
+
+def _metric_columns(question: str) -> List[str]:
+    compact = question.replace(" ", "")
+    if "입출고" in compact or "차이" in compact or "순증" in compact:
+        return ["입출고차이"]
+    columns = []
+    if "입고" in compact:
+        columns.append("입고량")
+    if "출고" in compact:
+        columns.append("출고량")
+    return columns
+
+
+def parse_query(question: str, today: Optional[date] = None, available_dimensions: Optional[List[str]] = None,
+                default_top_n: int = 5) -> Optional[dict]:
+    """집계형 질문이면 실행 계획을, 아니면 None을 반환 (LLM 없이 규칙 기반)
+
+    예) "지난주 입고량 합계" → {"agg": "sum", "columns": ["입고량"], "start": ..., "end": ...}
+    """
+    lowered = question.lower()
+    if any(keyword in lowered for keyword in EXCLUDE_KEYWORDS):
+        return None
+
+    columns = _metric_columns(lowered)
+    agg = next((name for keyword, name in AGG_KEYWORDS if keyword in lowered), None)
+    if agg is None and any(noun in lowered.replace(" ", "") for noun in QUANTITY_NOUNS):
+        agg = next((name for keyword, name in WEAK_AGG_KEYWORDS if keyword in lowered), None)
+    if not columns or agg is None:
+        return None
+
+    today = today or date.today()
+    start, end = parse_date_range(question, today)
+    freq = next((name for keyword, name in FREQ_KEYWORDS if keyword in lowered), None)
+
+    dimensions = available_dimensions or []
+    group_by = []
+    for keyword, column in GROUP_KEYWORDS:
+        if keyword in lowered.replace(" ", "") and column in dimensions and column not in group_by:
+            group_by.append(column)
+
+    filters = {}
+    if "SKU" in dimensions and "SKU" not in group_by:
+        codes = [code for code in SKU_RE.findall(question) if not code.lower().startswith("top")]
+        if codes:
+            filters["SKU"] = codes
+
+    top_n = None
+    if agg in ("top", "max", "min"):
+        match = TOP_N_RE.search(question)
+        top_n = int(match.group(1)) if match else (default_top_n if agg == "top" else 1)
+
+    return {
+        "agg": agg,
+        "columns": columns,
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "freq": freq,
+        "group_by": group_by,
+        "filters": filters,
+        "top_n": top_n,
+    }
+
+
+def resolve_filters(analyzer, filters: dict) -> Optional[dict]:
+    """필터 값 중 롤업에 실제로 있는 값만 남김 (대소문자 무시, 데이터 표기로 맞춤)
+
+    "Q3", 모델명처럼 SKU 형식만 닮은 토큰은 버림. 어떤 값도 데이터에 없으면 None
+    (없는 코드를 물었을 수도 있으므로 필터 없는 전체 합계로 답하지 않고 일반 경로로)
+    """
+    resolved = {}
+    for col, values in filters.items():
+        known = {str(value).lower(): value for value in analyzer.dimension_values(col)}
+        kept = [known[value.lower()] for value in values if value.lower() in known]
+        if not kept:
+            return None
+        resolved[col] = list(dict.fromkeys(kept))
+    return resolved
+
+
+def _fmt(value) -> str:
+    value = float(value)
+    return f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+
+
+def _period_label(plan: dict) -> str:
+    if plan["start"] is None and plan["end"] is None:
+        return "전체 기간"
+    if plan["start"] == plan["end"]:
+        return plan["start"]
+    return f"{plan['start'] or '처음'} ~ {plan['end'] or '현재'}"
+
+
+def _key_label(row: pd.Series, keys: List[str]) -> str:
+    parts = []
+    for key in keys:
+        value = row[key]
+        parts.append(value.strftime("%Y-%m-%d") if isinstance(value, pd.Timestamp) else str(value))
+    return " / ".join(parts)
+
+
+def execute_plan(analyzer, plan: dict) -> Optional[dict]:
+    """계획을 분석기 롤업에 직접 실행. {"answer": 결과 문장, "table": 근거 데이터프레임}"""
+    group_by = plan["group_by"]
+    df = analyzer.query(plan["start"], plan["end"], freq=plan["freq"] or "day",
+                        group_by=group_by, filters=plan["filters"])
+    if df is None:
+        return None
+
+    period = _period_label(plan)
+    target = " ".join(f"{col}={','.join(map(str, vals))}" for col, vals in plan["filters"].items())
+    header = f"{period}{' ' + target if target else ''}"
+    columns = plan["columns"]
+    if df.empty:
+        return {"answer": f"{header}에 해당하는 입출고 데이터가 없습니다.", "table": df}
+
+    agg = plan["agg"]
+    lines = []
+    if agg == "sum" and not group_by:
+        for col in columns:
+            lines.append(f"{header} {col} 합계: {_fmt(df[col].sum())}")
+        if plan["freq"]:
+            lines += [f"- {_key_label(row, ['Date'])}: " + ", ".join(f"{c} {_fmt(row[c])}" for c in columns)
+                      for _, row in df.head(MAX_LISTED_ROWS).iterrows()]
+        table = df
+    elif agg == "sum":
+        totals = df.groupby(group_by, as_index=False)[columns].sum()
+        totals = totals.sort_values(columns[0], ascending=False, kind="stable", ignore_index=True)
+        lines.append(f"{header} {', '.join(group_by)}별 {', '.join(columns)} 합계:")
+        lines += [f"- {_key_label(row, group_by)}: " + ", ".join(f"{c} {_fmt(row[c])}" for c in columns)
+                  for _, row in totals.head(MAX_LISTED_ROWS).iterrows()]
+        if len(totals) > MAX_LISTED_ROWS:
+            lines.append(f"... 외 {len(totals) - MAX_LISTED_ROWS}개 (전체는 표 참고)")
+        table = totals
+    elif agg == "mean":
+        # 일 단위 롤업에서 분류별 / 기간(주/월)별로 나눠 데이터가 있는 날 기준 일평균을 계산
+        daily = df if not group_by and not plan["freq"] else analyzer.query(
+            plan["start"], plan["end"], freq="day", group_by=group_by, filters=plan["filters"])
+        if daily is None:
+            return None
+        keys = (["Date"] if plan["freq"] else []) + group_by
+        if not keys:
+            for col in columns:
+                lines.append(f"{header} {col} 일평균: {_fmt(daily[col].mean())} (데이터가 있는 {len(daily)}일 기준)")
+            table = daily
+        else:
+            frame = daily.assign(Date=period_start(daily["Date"], plan["freq"])) if plan["freq"] else daily
+            means = frame.groupby(keys, as_index=False, dropna=False).agg(
+                **{col: (col, "mean") for col in columns}, 일수=(columns[0], "size"))
+            if not plan["freq"]:
+                means = means.sort_values(columns[0], ascending=False, kind="stable", ignore_index=True)
+            lines.append(f"{header} {', '.join(keys)}별 {', '.join(columns)} 일평균 (데이터가 있는 날 기준):")
+            lines += [f"- {_key_label(row, keys)}: " + ", ".join(f"{c} {_fmt(row[c])}" for c in columns)
+                      + f" ({int(row['일수'])}일)" for _, row in means.head(MAX_LISTED_ROWS).iterrows()]
+            if len(means) > MAX_LISTED_ROWS:
+                lines.append(f"... 외 {len(means) - MAX_LISTED_ROWS}개 (전체는 표 참고)")
+            table = means
+    else:
+        # 분류 컬럼이 있으면 기간 전체를 분류별로 합산, 없으면 기간 단위(일/주/월) 행을 비교
+        keys = group_by or ["Date"]
+        ranked = df.groupby(keys, as_index=False)[columns].sum() if group_by else df
+        col = columns[0]
+        n = plan["top_n"] or 1
+        ranked = ranked.sort_values(col, ascending=(agg == "min"), kind="stable").head(n)
+        label = AGG_LABELS["top"] if agg == "top" else AGG_LABELS[agg]
+        lines.append(f"{header} {col} {label}{f' {n}' if n > 1 else ''} ({', '.join(keys)} 기준):")
+        for rank, (_, row) in enumerate(ranked.iterrows(), start=1):
+            lines.append(f"{rank}. {_key_label(row, keys)}: {_fmt(row[col])}")
+        table = ranked.reset_index(drop=True)
+
+    return {"answer": "\n".join(lines), "table": table}
+
@@ -0,0 +1,180 @@
+# registry.py
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from langchain.vectorstores.base import VectorStore
+
+from batch_retriever import BatchingRetriever
+from config import (
+    EMBED_BATCH_SIZE,
+    HYBRID_CANDIDATES,
+    HYBRID_SEARCH,
+    INDEX_OPTIONS,
+    INDEX_TYPE,
+    PARSE_WORKERS,
+    RETRIEVAL_MAX_BATCH_SIZE,
+    RETRIEVAL_MAX_WAIT_MS,
+    RRF_K,
+    TABLE_ROWS_PER_CHUNK,
+    VECTOR_DB_KEEP_VERSIONS,
+)
+from document_processor import DocumentProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """임베딩 모델 / 벡터스토어를 프로세스 단위로 공유하는 레지스트리
+
+    - 임베딩 모델과 벡터스토어는 처음 필요할 때 한 번만 로드
+    - 디스크의 인덱스 버전이 바뀌면 (업로드 등) 다음 조회 시 자동으로 다시 로드
+    - 교체된 이전 버전(읽기 전용 SQLite docstore, mmap 인덱스)은 lease()로 읽고 있는 요청이 모두 끝나면 닫음
+    """
+
+    def __init__(self, db_dir: str):
+        self.db_dir = db_dir
+        self._lock = threading.RLock()
+        self._processor: Optional[DocumentProcessor] = None
+        self._vectorstore: Optional[VectorStore] = None
+        self._version: Optional[str] = None
+        self._retriever: Optional[BatchingRetriever] = None
+        self._leases: Dict[int, int] = {}  # id(벡터스토어) → 진행 중인 읽기 수
+        self._retired: List[VectorStore] = []  # 교체됐지만 아직 읽는 요청이 있어 닫지 못한 벡터스토어
+
+    @property
+    def processor(self) -> DocumentProcessor:
+        if self._processor is None:
+            with self._lock:
+                if self._processor is None:
+                    self._processor = DocumentProcessor(
+                        db_dir=self.db_dir,
+                        embed_batch_size=EMBED_BATCH_SIZE,
+                        rows_per_chunk=TABLE_ROWS_PER_CHUNK,
+                        index_type=INDEX_TYPE,
+                        index_options=INDEX_OPTIONS,
+                        keep_versions=VECTOR_DB_KEEP_VERSIONS,
+                        parse_workers=PARSE_WORKERS,
+                    )
+        return self._processor
+
+    @property
+    def retriever(self) -> BatchingRetriever:
+        """동시 검색 요청을 묶어 처리하는 공유 검색기 (항상 최신 벡터스토어를 사용)"""
+        if self._retriever is None:
+            with self._lock:
+                if self._retriever is None:
+                    self._retriever = BatchingRetriever(
+                        self.processor.embeddings,
+                        self.get_vectorstore,
+                        max_batch_size=RETRIEVAL_MAX_BATCH_SIZE,
+                        max_wait_ms=RETRIEVAL_MAX_WAIT_MS,
+                        hybrid=HYBRID_SEARCH,
+                        hybrid_candidates=HYBRID_CANDIDATES,
+                        rrf_k=RRF_K,
+                        vectorstore_lease=self.lease,
+                    )
+        return self._retriever
+
+    @property
+    def index_version(self) -> Optional[str]:
+        return self.processor.get_index_version()
+
+    def get_vectorstore(self) -> Optional[VectorStore]:
+        """현재 디스크 버전에 맞는 벡터스토어를 반환 (버전이 바뀐 경우에만 재로드)"""
+        version = self.index_version
+        if version is None:
+            return None
+        if self._vectorstore is not None and version == self._version:
+            return self._vectorstore
+
+        with self._lock:
+            version = self.index_version
+            if self._vectorstore is None or version != self._version:
+                logger.info(f"벡터스토어 로드 (version={version})")
+                vectorstore = self.processor.load_vector_store()
+                self._swap(vectorstore, version if vectorstore is not None else None)
+            return self._vectorstore
+
+    @contextmanager
+    def lease(self) -> Iterator[Optional[VectorStore]]:
+        """현재 벡터스토어를 빌려 씀. 블록 안에서는 버전이 바뀌어도 닫히지 않음
+
+        인덱스 검색 / docstore 조회처럼 벡터스토어 내부를 읽는 코드는 get_vectorstore() 대신 이걸 사용
+        """
+        with self._lock:
+            vectorstore = self.get_vectorstore()
+            if vectorstore is not None:
+                self._leases[id(vectorstore)] = self._leases.get(id(vectorstore), 0) + 1
+        try:
+            yield vectorstore
+        finally:
+            if vectorstore is not None:
+                with self._lock:
+                    remaining = self._leases[id(vectorstore)] - 1
+                    if remaining:
+                        self._leases[id(vectorstore)] = remaining
+                    else:
+                        del self._leases[id(vectorstore)]
+                        self._close_retired()
+
+    def _swap(self, vectorstore: Optional[VectorStore], version: Optional[str]) -> None:
+        """캐시된 벡터스토어를 교체하고 이전 것은 읽는 요청이 끝나면 닫히도록 넘김 (락 안에서 호출)"""
+        if self._vectorstore is not None and self._vectorstore is not vectorstore:
+            self._retired.append(self._vectorstore)
+        self._vectorstore = vectorstore
+        self._version = version
+        self._close_retired()
+
+    def _close_retired(self) -> None:
+        """빌려 간 요청이 없는 이전 벡터스토어를 닫음 (락 안에서 호출)"""
+        still_leased = []
+        for vectorstore in self._retired:
+            if self._leases.get(id(vectorstore)):
+                still_leased.append(vectorstore)
+                continue
+            close = getattr(vectorstore.docstore, "close", None)
+            if close is not None:
+                close()
+            # mmap 인덱스는 마지막 참조가 사라질 때 해제되므로 참조를 끊음
+            vectorstore.index = None
+        self._retired = still_leased
+
+    def invalidate(self) -> None:
+        """캐시된 벡터스토어를 버려 다음 조회 시 다시 로드되게 함"""
+        with self._lock:
+            self._swap(None, None)
+
+    def warmup(self) -> None:
+        """서버 시작 시 임베딩 모델과 (있다면) 벡터스토어를 미리 로드"""
+        self.get_vectorstore()
+
+    def close(self) -> None:
+        if self._retriever is not None:
+            self._retriever.close()
+        self.invalidate()
+
+
+_registry: Optional[ResourceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def init_registry(db_dir: str) -> ResourceRegistry:
+    """앱 lifespan에서 호출. 전역 레지스트리를 생성/교체"""
+    global _registry
+    with _registry_lock:
+        _registry = ResourceRegistry(db_dir)
+    return _registry
+
+
+def get_registry() -> ResourceRegistry:
+    """도구 등에서 공유 레지스트리를 참조 (lifespan 밖에서 호출되면 기본 경로로 생성)"""
+    global _registry
+    if _registry is None:
+        from config import VECTOR_DB_DIR
+        with _registry_lock:
+            if _registry is None:
+                _registry = ResourceRegistry(VECTOR_DB_DIR)
+    return _registry
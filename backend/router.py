@@ -0,0 +1,158 @@
+# router.py
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 도구별 키워드 (위에 있는 도구가 우선)
+TOOL_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("summarize", ("요약", "정리", "요약해")),
+    ("visualization", ("시각화", "그래프", "차트")),
+    ("search_documents", ("검색", "찾아", "찾기")),
+)
+
+# 키워드가 없을 때 임베딩 최근접 중심 분류에 쓰는 도구별 예시 질문
+# (벤치마크 평가용 라벨 데이터와 겹치지 않게 유지)
+TOOL_EXAMPLES: Dict[str, List[str]] = {
+    "summarize": [
+        "업로드한 파일 내용을 간단히 알려줘",
+        "전체 문서의 핵심 내용이 뭐야",
+        "이 자료들을 한눈에 보이게 줄여줘",
+        "문서들의 주요 내용을 간추려줘",
+    ],
+    "visualization": [
+        "날짜별 입고량과 출고량 추이를 보여줘",
+        "일별 입출고 변화를 그림으로 보여줘",
+        "입고 출고 흐름을 표로 그려줘",
+        "기간별 물동량 변화를 보여줘",
+    ],
+    "search_documents": [
+        "특정 품목 코드가 들어 있는 행을 알려줘",
+        "A창고 관련 기록이 있는지 확인해줘",
+        "문서에서 반품이라는 단어가 나오는 부분 보여줘",
+        "특정 거래처 데이터가 어디 있는지 알려줘",
+    ],
+    "default": [
+        "입고 데이터에 어떤 항목들이 있나요",
+        "출고 파일의 컬럼 의미가 뭐야",
+        "팔레트 수량은 어떤 단위야",
+        "이 데이터는 언제부터 언제까지 기록됐어",
+    ],
+}
+
+
+class IntentRouter:
+    """LLM 호출 없이 질문에 맞는 도구를 고르는 라우터
+
+    - 1단계: 모든 키워드를 하나의 정규식(alternation)으로 컴파일해 한 번만 스캔 (수 µs)
+    - 2단계: 키워드가 없으면 질문 임베딩과 도구별 예시 임베딩 중심(centroid)의 코사인 유사도로 분류
+      (유사도가 min_similarity 미만이거나 임베딩 함수가 없으면 default)
+    """
+
+    def __init__(self, keywords: Sequence[Tuple[str, Sequence[str]]] = TOOL_KEYWORDS,
+                 examples: Optional[Dict[str, List[str]]] = None,
+                 embed_query: Optional[Callable[[str], List[float]]] = None,
+                 embed_documents: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 min_similarity: float = 0.0, default: str = "default", cache_size: int = 1024):
+        self.default = default
+        self.min_similarity = min_similarity
+        self.examples = examples if examples is not None else TOOL_EXAMPLES
+        self.embed_query = embed_query
+        self.embed_documents = embed_documents
+        self.cache_size = cache_size
+
+        # 키워드 → 도구 (긴 키워드가 먼저 일치하도록 정렬), 도구 우선순위
+        self._priority = {tool: rank for rank, (tool, _) in enumerate(keywords)}
+        self._keyword_tool = {kw.lower(): tool for tool, kws in keywords for kw in kws}
+        alternation = "|".join(re.escape(kw) for kw in sorted(self._keyword_tool, key=len, reverse=True))
+        self._pattern = re.compile(alternation) if alternation else None
+
+        self._lock = threading.Lock()
+        self._labels: Optional[List[str]] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def route_keyword(self, question: str) -> Optional[str]:
+        if self._pattern is None:
+            return None
+        matched = {self._keyword_tool[m.group()] for m in self._pattern.finditer(question.lower())}
+        if not matched:
+            return None
+        return min(matched, key=self._priority.__getitem__)
+
+    def _ensure_centroids(self) -> None:
+        if self._centroids is not None:
+            return
+        with self._lock:
+            if self._centroids is not None:
+                return
+            labels, rows = [], []
+            for tool, questions in self.examples.items():
+                if not questions:
+                    continue
+                if self.embed_documents is not None:
+                    vectors = np.asarray(self.embed_documents(questions), dtype=np.float32)
+                else:
+                    vectors = np.asarray([self.embed_query(q) for q in questions], dtype=np.float32)
+                centroid = vectors.mean(axis=0)
+                rows.append(centroid / (np.linalg.norm(centroid) or 1.0))
+                labels.append(tool)
+            self._labels = labels
+            self._centroids = np.vstack(rows) if rows else np.zeros((0, 1), dtype=np.float32)
+
+    def route_embedding(self, question: str) -> Tuple[str, float]:
+        """(도구, 유사도). 임베딩 함수가 없으면 (default, 0.0)"""
+        if self.embed_query is None or not self.examples:
+            return self.default, 0.0
+        self._ensure_centroids()
+        if len(self._labels) == 0:
+            return self.default, 0.0
+        vector = np.asarray(self.embed_query(question), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        scores = self._centroids @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.min_similarity:
+            return self.default, float(scores[best])
+        return self._labels[best], float(scores[best])
+
+    def route(self, question: str) -> str:
+        tool = self.route_keyword(question)
+        if tool is not None:
+            return tool
+
+        # 같은 질문은 임베딩을 다시 계산하지 않음
+        with self._lock:
+            cached = self._cache.get(question)
+            if cached is not None:
+                self._cache.move_to_end(question)
+                return cached
+        tool, _ = self.route_embedding(question)
+        with self._lock:
+            self._cache[question] = tool
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tool
+
+
+_router: Optional[IntentRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> IntentRouter:
+    """공유 라우터 (임베딩 보조 분류에는 레지스트리의 공유 임베딩 모델 사용)"""
+    global _router
+    if _router is None:
+        from config import ROUTER_EMBEDDING_FALLBACK, ROUTER_MIN_SIMILARITY
+        with _router_lock:
+            if _router is None:
+                embed_query = embed_documents = None
+                if ROUTER_EMBEDDING_FALLBACK:
+                    from registry import get_registry
+                    embeddings = get_registry().processor.embeddings
+                    embed_query, embed_documents = embeddings.embed_query, embeddings.embed_documents
+                _router = IntentRouter(embed_query=embed_query, embed_documents=embed_documents,
+                                       min_similarity=ROUTER_MIN_SIMILARITY)
+    return _router
@@ -0,0 +1,150 @@
+# sqlite_docstore.py
+
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import bm25
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    pos INTEGER PRIMARY KEY,
+    id TEXT NOT NULL
+);
+"""
+
+
+def connect(path: str, read_only: bool = False) -> sqlite3.Connection:
+    if read_only:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.executescript(SCHEMA + bm25.SCHEMA)
+    return conn
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """문서 본문/메타데이터를 SQLite에 보관하는 docstore
+
+    - 읽기 전용으로 열면 여러 워커가 같은 파일을 페이지 캐시로 공유 (전체를 메모리에 올리지 않음)
+    - 쓰기 모드는 새 버전 디렉토리의 복사본에서만 사용
+    - 같은 파일에 BM25 역색인을 함께 유지 (add/delete 시 같은 트랜잭션에서 갱신)
+    """
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self._conn = connect(path, read_only=read_only)
+        self._lock = threading.Lock()
+        self._bm25_stats: Optional[Tuple[int, float]] = None
+        if not read_only:
+            self._backfill_bm25()
+
+    def _backfill_bm25(self) -> None:
+        """역색인이 없던 이전 버전 docstore면 기존 문서로 역색인을 채움"""
+        with self._lock:
+            has_docs = self._conn.execute("SELECT 1 FROM docs LIMIT 1").fetchone()
+            has_terms = self._conn.execute("SELECT 1 FROM bm25_docs LIMIT 1").fetchone()
+            if not has_docs or has_terms:
+                return
+            print("[SQLiteDocstore] BM25 역색인 생성 (기존 문서)")
+            with self._conn:
+                rows = self._conn.execute("SELECT id, content FROM docs")
+                bm25.index_documents(self._conn, rows)
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute("SELECT content, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        rows = [
+            (doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False, default=str))
+            for doc_id, doc in texts.items()
+        ]
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.executemany("INSERT INTO docs (id, content, metadata) VALUES (?, ?, ?)", rows)
+                    bm25.index_documents(self._conn, ((doc_id, content) for doc_id, content, _ in rows))
+            except sqlite3.IntegrityError as e:
+                raise ValueError(f"이미 존재하는 문서 id가 있습니다: {e}")
+            self._bm25_stats = None
+
+    def delete(self, ids: List) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in ids])
+            bm25.delete_documents(self._conn, ids)
+            self._bm25_stats = None
+
+    def bm25_search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """BM25 키워드 검색 (doc_id, score). 역색인이 없는 예전 파일이면 빈 결과"""
+        with self._lock:
+            try:
+                if self._bm25_stats is None:
+                    self._bm25_stats = bm25.corpus_stats(self._conn)
+                return bm25.search(self._conn, query, k, self._bm25_stats)
+            except sqlite3.OperationalError:
+                return []
+
+    def ids_by_source(self, source: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM docs WHERE json_extract(metadata, '$.source') = ?", (source,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def write_positions(self, index_to_docstore_id: Dict[int, str]) -> None:
+        """FAISS 벡터 위치 → 문서 id 매핑 저장"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM positions")
+            self._conn.executemany("INSERT INTO positions (pos, id) VALUES (?, ?)", index_to_docstore_id.items())
+
+    def load_positions(self) -> Dict[int, str]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT pos, id FROM positions").fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SQLitePositionMap(Mapping):
+    """읽기 전용 벡터 위치 → 문서 id 매핑 (필요한 위치만 조회해 콜드 스타트를 빠르게)"""
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self._docstore = docstore
+        self._len: Optional[int] = None
+
+    def __getitem__(self, pos) -> str:
+        with self._docstore._lock:
+            row = self._docstore._conn.execute("SELECT id FROM positions WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __len__(self) -> int:
+        if self._len is None:
+            with self._docstore._lock:
+                self._len = self._docstore._conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        with self._docstore._lock:
+            rows = self._docstore._conn.execute("SELECT pos FROM positions ORDER BY pos").fetchall()
+        return iter(row[0] for row in rows)
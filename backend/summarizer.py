@@ -0,0 +1,272 @@
+# summarizer.py
+
+import asyncio
+import hashlib
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from token_utils import count_tokens, split_by_tokens, truncate_to_tokens
+
+# 프롬프트(게이트웨이 시스템 프롬프트 포함)를 바꾸면 올려서 이전 요약 캐시를 무효화
+PROMPT_VERSION = "2"
+
+MAP_PROMPT = """
+다음은 문서 "{source}"의 일부입니다. 핵심 수치와 사실 위주로 한국어로 간결하게 요약해주세요.
+
+{text}
+
+요약:
+"""
+
+REDUCE_PROMPT = """
+다음은 여러 문서(또는 문서 일부)의 요약입니다. 중복을 없애고 핵심만 남겨 하나의 한국어 요약으로 합쳐주세요.
+
+{text}
+
+통합 요약:
+"""
+
+
+class Summarizer:
+    """map-reduce 방식 문서 요약
+
+    - map: 소스(파일)별 문서를 chunk_tokens 이하 조각으로 나눠 조각마다 요약 (병렬, 동시 호출 수 제한)
+    - 소스별 요약은 매니페스트의 내용 해시를 키로 디스크에 캐시 (내용이 같으면 재요약하지 않음)
+    - reduce: 요약들의 합이 reduce_budget 토큰 이하가 될 때까지 묶어서 다시 요약 (계층적)
+    """
+
+    def __init__(self, llm, cache_dir: Optional[str] = None, max_concurrency: int = 4,
+                 chunk_tokens: int = 1500, reduce_budget: int = 3000):
+        self.llm = llm
+        self.cache_dir = cache_dir
+        self.chunk_tokens = chunk_tokens
+        self.reduce_budget = reduce_budget
+        self.max_concurrency = max_concurrency
+        # 이 풀의 워커 수가 곧 Ollama 동시 호출 상한 (여러 요청이 동시에 요약해도 공유)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="summary")
+        # 비동기 map의 동시 호출 상한 (요청마다 만들지 않고 같은 이벤트 루프의 요청끼리 공유)
+        self._alimiter: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+        self._alimiter_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # ---------- 캐시 ----------
+
+    def _cache_key(self, content_hash: str) -> str:
+        return hashlib.sha256(f"{PROMPT_VERSION}:{self.chunk_tokens}:{content_hash}".encode()).hexdigest()
+
+    def _cache_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{key}.txt") if self.cache_dir else None
+
+    def _load_cached(self, key: str) -> Optional[str]:
+        path = self._cache_path(key)
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        return None
+
+    def _store_cached(self, key: str, summary: str) -> None:
+        path = self._cache_path(key)
+        if not path:
+            return
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(summary)
+        os.replace(tmp_path, path)
+
+    # ---------- LLM 호출 ----------
+
+    def _invoke(self, prompt: str) -> str:
+        return self.llm.invoke(prompt).strip()
+
+    def _map_all(self, prompts: List[str]) -> List[str]:
+        return list(self._pool.map(self._invoke, prompts))
+
+    def _async_limiter(self) -> asyncio.Semaphore:
+        """실행 중인 이벤트 루프에 묶인 공유 세마포어 (루프가 바뀌면 새로 만듦)"""
+        loop = asyncio.get_running_loop()
+        with self._alimiter_lock:
+            if self._alimiter is None or self._alimiter[0] is not loop:
+                self._alimiter = (loop, asyncio.Semaphore(self.max_concurrency))
+            return self._alimiter[1]
+
+    async def _amap_all(self, prompts: List[str]) -> List[str]:
+        """비동기 map (스레드를 점유하지 않고 대기, 동시 호출 수는 요청 간에 공유하는 max_concurrency로 제한)"""
+        limiter = self._async_limiter()
+
+        async def one(prompt: str) -> str:
+            async with limiter:
+                return (await self.llm.ainvoke(prompt)).strip()
+
+        return list(await asyncio.gather(*(one(prompt) for prompt in prompts)))
+
+    def _reduce_step(self, texts: List[str], budget: int) -> Tuple[Optional[List[str]], List[str]]:
+        """(끝난 결과, None) 또는 (None, 이번 단계에 요약할 프롬프트 목록)"""
+        if len(texts) > 1 and sum(count_tokens(t) for t in texts) > budget:
+            groups = self._pack(texts, budget)
+            if len(groups) == len(texts):
+                # 하나씩도 예산을 넘어 더 묶을 수 없음 → 각 요약을 균등하게 잘라 맞춤
+                per_text = max(budget // len(texts), 1)
+                return [truncate_to_tokens(t, per_text) for t in texts], None
+            return None, [REDUCE_PROMPT.format(text="\n\n".join(group)) for group in groups]
+        if texts and count_tokens(texts[0]) > budget:
+            texts = [truncate_to_tokens(texts[0], budget)]
+        return texts, None
+
+    def _reduce(self, texts: List[str], budget: int) -> List[str]:
+        """texts의 토큰 합이 budget 이하가 될 때까지 묶어서 요약"""
+        while True:
+            done, prompts = self._reduce_step(texts, budget)
+            if done is not None:
+                return done
+            texts = self._map_all(prompts)
+
+    async def _areduce(self, texts: List[str], budget: int) -> List[str]:
+        while True:
+            done, prompts = self._reduce_step(texts, budget)
+            if done is not None:
+                return done
+            texts = await self._amap_all(prompts)
+
+    @staticmethod
+    def _pack(texts: List[str], budget: int) -> List[List[str]]:
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = count_tokens(text)
+            if current and current_tokens + tokens > budget:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    # ---------- 요약 ----------
+
+    def _split_cached(self, sources: Dict[str, dict]) -> Tuple[Dict[str, str], List[str], List[str]]:
+        """캐시된 요약과, 새로 요약할 조각의 (map 프롬프트 목록, 각 프롬프트의 source) 반환"""
+        summaries: Dict[str, str] = {}
+        pending: Dict[str, List[str]] = {}
+
+        for source, item in sources.items():
+            cached = self._load_cached(self._cache_key(item["hash"]))
+            if cached is not None:
+                summaries[source] = cached
+                continue
+            text = "\n\n".join(doc.page_content for doc in item["documents"])
+            pending[source] = split_by_tokens(text, self.chunk_tokens)
+
+        print(f"[Summarizer] 캐시 적중 {len(summaries)}개, 새로 요약 {len(pending)}개")
+
+        # 모든 소스의 조각을 한 번에 map
+        prompts = []
+        owners = []
+        for source, pieces in pending.items():
+            name = os.path.basename(source)
+            for piece in pieces:
+                prompts.append(MAP_PROMPT.format(source=name, text=piece))
+                owners.append(source)
+        return summaries, prompts, owners
+
+    @staticmethod
+    def _group_partials(owners: List[str], results: List[str]) -> Dict[str, List[str]]:
+        partials: Dict[str, List[str]] = {}
+        for source, result in zip(owners, results):
+            partials.setdefault(source, []).append(result)
+        return partials
+
+    def summarize_sources(self, sources: Dict[str, dict]) -> Dict[str, str]:
+        """{source: {"hash": 내용 해시, "documents": [Document, ...]}} → {source: 요약}"""
+        summaries, prompts, owners = self._split_cached(sources)
+        if not prompts:
+            return summaries
+
+        # 동시 호출 수는 풀 크기로 제한
+        partials = self._group_partials(owners, self._map_all(prompts))
+        for source, parts in partials.items():
+            summary = "\n".join(self._reduce(parts, self.chunk_tokens))
+            self._store_cached(self._cache_key(sources[source]["hash"]), summary)
+            summaries[source] = summary
+        return summaries
+
+    async def asummarize_sources(self, sources: Dict[str, dict]) -> Dict[str, str]:
+        """summarize_sources의 비동기 버전 (LLM 대기 동안 스레드를 점유하지 않음)"""
+        from executor import run_blocking
+        summaries, prompts, owners = await run_blocking(self._split_cached, sources)
+        if not prompts:
+            return summaries
+
+        partials = self._group_partials(owners, await self._amap_all(prompts))
+        for source, parts in partials.items():
+            summary = "\n".join(await self._areduce(parts, self.chunk_tokens))
+            await run_blocking(self._store_cached, self._cache_key(sources[source]["hash"]), summary)
+            summaries[source] = summary
+        return summaries
+
+    def summarize(self, sources: Dict[str, dict]) -> str:
+        """소스별 요약을 reduce_budget 토큰 이하의 하나의 컨텍스트로 합침"""
+        try:
+            summaries = self.summarize_sources(sources)
+        except Exception as e:
+            print(f"[Summarizer] 요약 실패: {e}")
+            print(traceback.format_exc())
+            raise
+
+        return self._join(self._reduce(self._labeled(summaries), self.reduce_budget))
+
+    async def asummarize(self, sources: Dict[str, dict]) -> str:
+        try:
+            summaries = await self.asummarize_sources(sources)
+        except Exception as e:
+            print(f"[Summarizer] 요약 실패: {e}")
+            print(traceback.format_exc())
+            raise
+
+        return self._join(await self._areduce(self._labeled(summaries), self.reduce_budget))
+
+    @staticmethod
+    def _labeled(summaries: Dict[str, str]) -> List[str]:
+        return [f"[{os.path.basename(source)}]\n{summary}" for source, summary in sorted(summaries.items())]
+
+    @staticmethod
+    def _join(reduced: List[str]) -> str:
+        print(f"[Summarizer] 최종 요약 토큰 수: {sum(count_tokens(t) for t in reduced)}")
+        return "\n\n".join(reduced)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def collect_sources(processor, vectorstore) -> Dict[str, dict]:
+    """매니페스트의 소스별 해시와 문서 id로 요약 대상 문서를 모음"""
+    sources = {}
+    for source, entry in processor.load_manifest().items():
+        documents = []
+        for doc_id in entry.get("ids", []):
+            doc = vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                documents.append(doc)
+        if documents:
+            sources[source] = {"hash": entry["hash"], "documents": documents}
+    return sources
+
+
+_summarizer: Optional[Summarizer] = None
+_summarizer_lock = threading.Lock()
+
+
+def get_summarizer(llm, **kwargs) -> Summarizer:
+    """프로세스 공유 요약기 (캐시와 동시 호출 제한을 요청 간에 공유)"""
+    global _summarizer
+    with _summarizer_lock:
+        if _summarizer is None:
+            _summarizer = Summarizer(llm, **kwargs)
+        return _summarizer
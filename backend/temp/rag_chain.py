@@ -3,9 +3,9 @@
 import logging
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_ollama import OllamaLLM
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from llm_gateway import get_langchain_llm
 
 logger = logging.getLogger(__name__)
 
@@ -35,11 +35,8 @@ class RAGChain:
                 search_kwargs={"k": 3}
             )
 
-            llm = OllamaLLM(
-                model="llama3",
-                temperature=0.1,
-                base_url="http://localhost:11434"
-            )
+            # 프로세스 전체가 공유하는 OllamaLLM (keep_alive / 타임아웃 설정 포함)
+            llm = get_langchain_llm()
 
             prompt_template = """
             당신은 문서 분석 전문가입니다. 주어진 문서 내용을 바탕으로 질문에 답변해주세요.
@@ -0,0 +1,9 @@
+# tests/conftest.py
+#
+# backend 모듈은 평평한 import(`from config import ...`)를 쓰므로 backend 디렉토리를 경로에 추가
+# 실행: backend 디렉토리에서 `python -m pytest -q tests`
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+# tests/test_analyzer_cache.py
+#
+# 분석기 Parquet 캐시: 바뀌거나 지워진 업로드 파일의 이전 롤업 캐시 정리
+
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from analyzer import InOutAnalyzer  # noqa: E402
+
+
+def _write(path, quantities):
+    pd.DataFrame({
+        "Date": [f"2024-01-{day:02d}" for day in range(1, len(quantities) + 1)],
+        "PalleteQty": quantities,
+    }).to_csv(path, index=False)
+
+
+def _cached(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(".parquet"))
+
+
+def test_stale_cache_files_are_pruned(tmp_path):
+    uploads, cache_dir = tmp_path / "uploads", tmp_path / "cache"
+    uploads.mkdir()
+    _write(uploads / "inbound_1.csv", [1, 2])
+    _write(uploads / "outbound_1.csv", [3])
+    analyzer = InOutAnalyzer(str(uploads), cache_dir=str(cache_dir), dimensions=())
+
+    analyzer.load_all_data()
+    assert len(_cached(cache_dir)) == 2
+
+    # 내용이 바뀐 파일 → 이전 캐시는 지우고 새 캐시만 남김
+    before = _cached(cache_dir)
+    _write(uploads / "inbound_1.csv", [1, 2, 3, 4])
+    analyzer.load_all_data()
+    after = _cached(cache_dir)
+    assert len(after) == 2 and after != before
+
+    # 지워진 파일의 캐시 삭제
+    os.remove(uploads / "outbound_1.csv")
+    analyzer.load_all_data()
+    assert len(_cached(cache_dir)) == 1
+
+    # 다음 프로세스의 분석기도 남은 캐시를 그대로 사용
+    fresh = InOutAnalyzer(str(uploads), cache_dir=str(cache_dir), dimensions=())
+    fresh.load_all_data()
+    assert fresh.inbound_daily["PalleteQty"].tolist() == [1, 2, 3, 4]
+    assert len(_cached(cache_dir)) == 1
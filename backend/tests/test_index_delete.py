@@ -0,0 +1,61 @@
+# tests/test_index_delete.py
+#
+# IVF 인덱스에서 삭제 후 추가해도 검색 결과가 올바른 청크를 가리키는지 확인
+
+import hashlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from document_processor import DocumentProcessor  # noqa: E402
+from index_factory import describe_index  # noqa: E402
+
+DIM = 16
+
+
+class FakeEmbeddings:
+    """텍스트마다 고정된 무작위 벡터 (같은 텍스트 → 같은 벡터)"""
+
+    def embed_query(self, text):
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def _docs(prefix, count):
+    return [Document(page_content=f"{prefix} {i}", metadata={"source": prefix}) for i in range(count)]
+
+
+def _assert_exact_hits(vectorstore, embeddings, texts):
+    for text in texts:
+        hits = vectorstore.similarity_search_by_vector(embeddings.embed_query(text), k=1)
+        assert hits and hits[0].page_content == text
+
+
+def test_ivf_delete_then_add_keeps_labels(tmp_path):
+    embeddings = FakeEmbeddings()
+    processor = DocumentProcessor(db_dir=str(tmp_path), embeddings=embeddings, index_type="ivf",
+                                  index_options={"nprobe": 1024})
+    first = _docs("a", 200)
+    vectorstore = processor._add_in_batches(None, first, [f"a-{i}" for i in range(200)])
+    assert describe_index(vectorstore.index) == "ivf"
+
+    removed = processor._delete_ids(vectorstore, [f"a-{i}" for i in range(0, 200, 3)])
+    assert removed == 67
+    assert vectorstore.index.ntotal == 133
+
+    added = _docs("b", 20)
+    vectorstore = processor._add_in_batches(vectorstore, added, [f"b-{i}" for i in range(20)])
+    assert vectorstore.index.ntotal == 153
+    assert len(set(vectorstore.index_to_docstore_id.values())) == 153
+
+    survivors = [doc.page_content for i, doc in enumerate(first) if i % 3]
+    _assert_exact_hits(vectorstore, embeddings, survivors + [doc.page_content for doc in added])
+    processor._cleanup_staging()
@@ -0,0 +1,31 @@
+# tests/test_parsing.py
+#
+# CSV 스트리밍 파싱: 인코딩 판별
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from parsing import detect_csv_encoding, iter_csv_frames  # noqa: E402
+
+
+def test_cp949_bytes_after_first_chunk(tmp_path):
+    # 앞부분은 모두 ASCII, 한글(cp949)은 첫 청크 / 첫 읽기 버퍼를 훨씬 지난 뒤에만 등장
+    path = tmp_path / "inbound_cp949.csv"
+    rows = ["Date,SKU,PalleteQty"] + [f"2024-01-01,A-{i:06d},{i % 7}" for i in range(30000)]
+    rows.append("2024-01-02,한글품목,5")
+    path.write_bytes("\n".join(rows).encode("cp949"))
+
+    assert detect_csv_encoding(str(path)) == "cp949"
+    frames = list(iter_csv_frames(str(path), rows_per_chunk=1000))
+    combined = pd.concat(frames, ignore_index=True)
+    assert len(combined) == 30001
+    assert combined["SKU"].iloc[-1] == "한글품목"
+
+
+def test_utf8_is_kept(tmp_path):
+    path = tmp_path / "inbound_utf8.csv"
+    path.write_text("Date,SKU,PalleteQty\n2024-01-01,한글품목,1\n", encoding="utf-8")
+
+    assert detect_csv_encoding(str(path)) == "utf-8"
+    assert next(iter_csv_frames(str(path), rows_per_chunk=10))["SKU"].tolist() == ["한글품목"]
@@ -0,0 +1,61 @@
+# tests/test_query_planner.py
+#
+# 집계 빠른 경로: 질문 → 계획 → 분석기 롤업 실행 결과 확인
+
+from datetime import date
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from analyzer import InOutAnalyzer  # noqa: E402
+from query_planner import execute_plan, parse_query, resolve_filters  # noqa: E402
+
+TODAY = date(2024, 3, 15)
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    pd.DataFrame({
+        "Date": ["2024-01-01", "2024-01-02", "2024-01-01", "2024-02-01"],
+        "SKU": ["A-100", "A-100", "B-200", "B-200"],
+        "PalleteQty": [10, 20, 4, 8],
+    }).to_csv(tmp_path / "inbound_1.csv", index=False)
+    analyzer = InOutAnalyzer(str(tmp_path), dimensions=("SKU",))
+    analyzer.load_all_data()
+    return analyzer
+
+
+def _run(analyzer, question):
+    plan = parse_query(question, today=TODAY, available_dimensions=list(analyzer.available_dimensions))
+    assert plan is not None
+    return plan, execute_plan(analyzer, plan)
+
+
+def test_mean_per_group(analyzer):
+    plan, result = _run(analyzer, "SKU별 평균 입고량")
+    assert plan["agg"] == "mean" and plan["group_by"] == ["SKU"]
+    means = dict(zip(result["table"]["SKU"], result["table"]["입고량"]))
+    assert means == {"A-100": 15, "B-200": 6}
+    assert "A-100: 입고량 15" in result["answer"]
+
+
+def test_mean_per_period(analyzer):
+    plan, result = _run(analyzer, "월별 입고량 평균")
+    assert plan["agg"] == "mean" and plan["freq"] == "month"
+    table = result["table"]
+    means = dict(zip(table["Date"].dt.strftime("%Y-%m"), table["입고량"]))
+    assert means == {"2024-01": 17, "2024-02": 8}
+
+
+def test_overall_mean(analyzer):
+    _, result = _run(analyzer, "입고량 평균")
+    assert "입고량 일평균: 14" in result["answer"]
+
+
+def test_quarter_token_is_not_a_sku_filter(analyzer):
+    plan = parse_query("2024년 Q3 입고량 합계", today=TODAY, available_dimensions=["SKU"])
+    assert resolve_filters(analyzer, plan["filters"]) is None
+
+    plan = parse_query("Q3 기준 a-100의 입고량 합계", today=TODAY, available_dimensions=["SKU"])
+    assert resolve_filters(analyzer, plan["filters"]) == {"SKU": ["A-100"]}
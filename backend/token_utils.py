@@ -0,0 +1,55 @@
+# token_utils.py
+
+import math
+from typing import List
+
+# llama3 토크나이저 기준 대략적인 비용: 한글 음절 ≈ 1토큰, 그 외 문자 ≈ 0.25토큰
+# (정확한 토크나이저 없이 프롬프트 길이를 예산 안에 맞추기 위한 보수적 추정치)
+HANGUL_TOKEN_COST = 1.0
+OTHER_TOKEN_COST = 0.25
+
+
+def _char_cost(ch: str) -> float:
+    return HANGUL_TOKEN_COST if "가" <= ch <= "힣" else OTHER_TOKEN_COST
+
+
+def count_tokens(text: str) -> int:
+    hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+    return math.ceil(hangul * HANGUL_TOKEN_COST + (len(text) - hangul) * OTHER_TOKEN_COST)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """앞에서부터 max_tokens 이내로 자름 (같은 입력이면 항상 같은 결과)"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    used = 0.0
+    for i, ch in enumerate(text):
+        used += _char_cost(ch)
+        if used > max_tokens:
+            return text[:i]
+    return text
+
+
+def split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    """줄 단위로 max_tokens 이하 조각으로 나눔 (한 줄이 더 길면 그 줄을 잘라서 나눔)"""
+    pieces = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in text.splitlines():
+        line_tokens = count_tokens(line) + 1
+        while line_tokens > max_tokens:
+            head = truncate_to_tokens(line, max_tokens - 1)
+            if current:
+                pieces.append("\n".join(current))
+                current, current_tokens = [], 0
+            pieces.append(head)
+            line = line[len(head):]
+            line_tokens = count_tokens(line) + 1
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("\n".join(current))
+    return [piece for piece in pieces if piece.strip()]
@@ -1,139 +1,251 @@
 # tools.py
 
 import traceback  # 추가
+from typing import List
 from langchain.tools import tool
 from langchain.agents import Tool
 from langchain_core.documents import Document
-from langchain_ollama import OllamaLLM
 
-from analyzer import InOutAnalyzer
-from document_processor import DocumentProcessor
-from config import UPLOAD_DIR, VECTOR_DB_DIR
+from analyzer import get_analyzer
+from artifacts import dataframe_artifact
+from context_builder import build_context
+from llm_gateway import get_llm
+from prompts import build_prompt
+from registry import get_registry
+from summarizer import collect_sources, get_summarizer
+from token_utils import count_tokens
+from config import (
+    ANALYZER_CACHE_DIR,
+    ANALYZER_DIMENSIONS,
+    CONTEXT_DEDUP_THRESHOLD,
+    CONTEXT_TOKEN_BUDGET,
+    PARSE_WORKERS,
+    SUMMARY_CACHE_DIR,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_MAP_CONCURRENCY,
+    SUMMARY_MAX_TOKENS,
+    SUMMARY_REDUCE_TOKEN_BUDGET,
+    UPLOAD_DIR,
+    VECTOR_DB_DIR,
+)
 
-llm = OllamaLLM(model="llama3", temperature=0.1, base_url="http://localhost:11434")
+llm = get_llm()
 
-def query_with_context(question: str, custom_prompt_template: str = None, k: int = 3) -> str:
-    """벡터스토어에서 문서 검색하고 LLM으로 답변 생성하는 공통 함수"""
+# 요약 map/reduce 단계용 (생성 길이를 제한해 호출당 시간을 일정하게)
+summary_llm = get_llm(num_predict=SUMMARY_MAX_TOKENS)
+
+def build_context_prompt(question: str, task: str = "default", k: int = 3) -> dict:
+    """벡터스토어에서 문서를 검색해 LLM 프롬프트를 만드는 공통 함수 (LLM 호출 없음)
+
+    반환값: {"prompt": 프롬프트 또는 None, "observation": 프롬프트가 없을 때의 안내/오류 메시지}
+    """
     try:
-        print(f"[query_with_context] 시작 - 질문: {question[:100]}...")
-        print(f"[query_with_context] VECTOR_DB_DIR: {VECTOR_DB_DIR}")
-        
-        processor = DocumentProcessor(db_dir=VECTOR_DB_DIR)
-        vectorstore = processor.load_vector_store()
-        
+        print(f"[build_context_prompt] 시작 - 질문: {question[:100]}...")
+        print(f"[build_context_prompt] VECTOR_DB_DIR: {VECTOR_DB_DIR}")
+
+        registry = get_registry()
+        vectorstore = registry.get_vectorstore()
+
         if vectorstore is None:
-            print("[query_with_context] 벡터스토어 로드 실패")
-            return "벡터스토어를 사용할 수 없습니다."
-        
-        print("[query_with_context] 벡터스토어 로드 성공")
-        
-        # 관련 문서 검색
-        relevant_docs = vectorstore.similarity_search(question, k=k)
-        print(f"[query_with_context] 검색된 문서 개수: {len(relevant_docs)}")
-        
-        if not relevant_docs:
-            print("[query_with_context] 관련 문서 없음")
-            return "관련 정보를 찾을 수 없습니다."
-        
-        context = "\n\n".join([doc.page_content for doc in relevant_docs])
-        print(f"[query_with_context] 컨텍스트 길이: {len(context)}")
-        
-        # 기본 프롬프트 또는 커스텀 프롬프트 사용
-        if custom_prompt_template:
-            prompt = custom_prompt_template.format(context=context, question=question)
-        else:
-            prompt = f"""
-            다음 문서를 참고하여 질문에 답해주세요:
-            
-            문서 내용:
-            {context}
-            
-            질문: {question}
-            
-            답변:
-            """
-        
-        print(f"[query_with_context] 프롬프트 길이: {len(prompt)}")
-        print("[query_with_context] LLM 호출 시작...")
-        
+            print("[build_context_prompt] 벡터스토어 로드 실패")
+            return {"prompt": None, "observation": "벡터스토어를 사용할 수 없습니다."}
+
+        print("[build_context_prompt] 벡터스토어 로드 성공")
+
+        # 관련 문서 검색 (동시 요청은 한 번의 배치 임베딩/검색으로 처리)
+        relevant_docs = registry.retriever.search(question, k=k)
+        return _context_prompt(question, task, relevant_docs)
+
+    except Exception as e:
+        print(f"[build_context_prompt] 에러 발생: {str(e)}")
+        print(f"[build_context_prompt] 에러 상세:")
+        print(traceback.format_exc())
+        return {"prompt": None, "observation": f"답변 생성 중 오류가 발생했습니다: {str(e)}"}
+
+
+def _context_prompt(question: str, task: str, relevant_docs: List[Document]) -> dict:
+    print(f"[build_context_prompt] 검색된 문서 개수: {len(relevant_docs)}")
+    if not relevant_docs:
+        print("[build_context_prompt] 관련 문서 없음")
+        return {"prompt": None, "observation": "관련 정보를 찾을 수 없습니다."}
+
+    # 토큰 예산 안에서 중복 청크를 빼고 관련도 순으로 컨텍스트 구성
+    context = build_context(relevant_docs, CONTEXT_TOKEN_BUDGET, dedup_threshold=CONTEXT_DEDUP_THRESHOLD)
+    print(f"[build_context_prompt] 컨텍스트 길이: {len(context)}")
+
+    # 도구별 고정 지시문을 앞에, 검색 문맥과 질문을 뒤에 (prompts.py)
+    prompt = build_prompt(task, question, ("문서 내용", context))
+    print(f"[build_context_prompt] 프롬프트 길이: {len(prompt)}")
+    return {"prompt": prompt, "observation": ""}
+
+
+async def abuild_context_prompt(question: str, task: str = "default", k: int = 3) -> dict:
+    """build_context_prompt의 비동기 버전
+
+    검색 대기를 이벤트 루프에서 하므로 CPU 스레드풀(CPU_WORKERS) 크기와 상관없이
+    동시 요청이 한 배치(RETRIEVAL_MAX_BATCH_SIZE)까지 모임
+    """
+    from executor import run_blocking
+    try:
+        registry = get_registry()
+        vectorstore = await run_blocking(registry.get_vectorstore)
+        if vectorstore is None:
+            print("[build_context_prompt] 벡터스토어 로드 실패")
+            return {"prompt": None, "observation": "벡터스토어를 사용할 수 없습니다."}
+
+        relevant_docs = await registry.retriever.asearch(question, k=k)
+        return await run_blocking(_context_prompt, question, task, relevant_docs)
+
+    except Exception as e:
+        print(f"[build_context_prompt] 에러 발생: {str(e)}")
+        print(traceback.format_exc())
+        return {"prompt": None, "observation": f"답변 생성 중 오류가 발생했습니다: {str(e)}"}
+
+
+def answer_prepared(prepared: dict) -> str:
+    """prepare_* 결과로 LLM 답변을 생성 (2-pass 모드의 도구 응답)"""
+    prompt = prepared.get("prompt")
+    observation = prepared.get("observation", "")
+    if not prompt:
+        return observation
+
+    try:
+        print("[answer_prepared] LLM 호출 시작...")
         response = llm.invoke(prompt)
-        print(f"[query_with_context] LLM 응답 길이: {len(response)}")
-        print(f"[query_with_context] LLM 응답 시작: {response[:100]}...")
-        
-        return response
-        
+        print(f"[answer_prepared] LLM 응답 길이: {len(response)}")
+        print(f"[answer_prepared] LLM 응답 시작: {response[:100]}...")
     except Exception as e:
-        print(f"[query_with_context] 에러 발생: {str(e)}")
-        print(f"[query_with_context] 에러 상세:")
+        print(f"[answer_prepared] 에러 발생: {str(e)}")
         print(traceback.format_exc())
         return f"답변 생성 중 오류가 발생했습니다: {str(e)}"
 
-@tool
-def summarize_tool(question: str) -> str:
-    """문서 요약 요청을 입력값으로 받아서 요약합니다."""
-    print(f"[summarize_tool] 호출됨 - 질문: {question}")
-    
-    if not question.strip():
-        question = "이 문서를 요약해줘"
-    
-    prompt_template = """
-    다음 문서들을 바탕으로 질문에 답해주세요:
-    
-    문서 내용:
-    {context}
-    
-    질문: {question}
-    
-    답변:
-    """
-    #processor = DocumentProcessor(db_dir=VECTOR_DB_DIR)
-    #vectorstore = processor.load_vector_store()
-    processor = DocumentProcessor()
-    return query_with_context(question, prompt_template, k=processor.get_total_docs_num(UPLOAD_DIR))
+    if observation:
+        return f"{response}\n\n{observation}"
+    return response
 
-@tool
-def search_documents_tool(query: str) -> str:
-    """문서에서 특정 정보를 검색합니다."""
-    print(f"[search_documents_tool] 호출됨 - 쿼리: {query}")
-    
-    prompt_template = """
-    다음 문서에서 '{question}'와 관련된 정보를 찾아 정리해주세요:
-    
-    {context}
-    
-    검색어: {question}
-    답변:
-    """
-    
-    return query_with_context(query, prompt_template, k=5)
 
-@tool
-def default_tool(question: str) -> str:
-    """기본 응답을 위한 도구입니다."""
-    print(f"[default_tool] 호출됨 - 질문: {question}")
-    return query_with_context(question)
+async def aanswer_prepared(prepared: dict) -> str:
+    """answer_prepared의 비동기 버전 (생성을 기다리는 동안 CPU 스레드풀을 점유하지 않음)"""
+    prompt = prepared.get("prompt")
+    observation = prepared.get("observation", "")
+    if not prompt:
+        return observation
 
-@tool
-def visualization(question: str) -> str:
-    """문서 정보들을 시각화합니다."""
-    print(f"[visualization] 호출됨 - 질문: {question}")
-    
+    try:
+        print("[aanswer_prepared] LLM 호출 시작...")
+        response = await llm.ainvoke(prompt)
+        print(f"[aanswer_prepared] LLM 응답 길이: {len(response)}")
+    except Exception as e:
+        print(f"[aanswer_prepared] 에러 발생: {str(e)}")
+        print(traceback.format_exc())
+        return f"답변 생성 중 오류가 발생했습니다: {str(e)}"
+
+    if observation:
+        return f"{response}\n\n{observation}"
+    return response
+
+
+def query_with_context(question: str, task: str = "default", k: int = 3) -> str:
+    """벡터스토어에서 문서 검색하고 LLM으로 답변 생성하는 공통 함수"""
+    return answer_prepared(build_context_prompt(question, task, k))
+
+
+def _summary_sources() -> dict:
+    """요약 대상 문서 수집. {"sources": ...} 또는 {"prompt": None, "observation": 안내 메시지}"""
+    registry = get_registry()
+    with registry.lease() as vectorstore:
+        if vectorstore is None:
+            return {"prompt": None, "observation": "벡터스토어를 사용할 수 없습니다."}
+        sources = collect_sources(registry.processor, vectorstore)
+    if not sources:
+        return {"prompt": None, "observation": "요약할 문서가 없습니다."}
+    return {"sources": sources}
+
+
+def _summarizer():
+    return get_summarizer(
+        summary_llm,
+        cache_dir=SUMMARY_CACHE_DIR,
+        max_concurrency=SUMMARY_MAP_CONCURRENCY,
+        chunk_tokens=SUMMARY_CHUNK_TOKENS,
+        reduce_budget=SUMMARY_REDUCE_TOKEN_BUDGET,
+    )
+
+
+def _summary_prompt(question: str, context: str) -> dict:
+    prompt = build_prompt("summarize", question or "이 문서를 요약해줘", ("문서 요약", context))
+    print(f"[prepare_summarize] 프롬프트 길이: {len(prompt)}")
+    return {"prompt": prompt, "observation": ""}
+
+
+def prepare_summarize(question: str) -> dict:
+    """문서별 요약(캐시) → 토큰 예산 안으로 합친 요약으로 최종 프롬프트 생성"""
+    try:
+        collected = _summary_sources()
+        if "sources" not in collected:
+            return collected
+        return _summary_prompt(question.strip(), _summarizer().summarize(collected["sources"]))
+
+    except Exception as e:
+        print(f"[prepare_summarize] 에러 발생: {str(e)}")
+        print(traceback.format_exc())
+        return {"prompt": None, "observation": f"요약 중 오류가 발생했습니다: {str(e)}"}
+
+
+async def aprepare_summarize(question: str) -> dict:
+    """prepare_summarize의 비동기 버전: 문서 수집만 CPU 스레드풀에서, map/reduce LLM 호출은 await로 대기"""
+    from executor import run_blocking
+    try:
+        collected = await run_blocking(_summary_sources)
+        if "sources" not in collected:
+            return collected
+        return _summary_prompt(question.strip(), await _summarizer().asummarize(collected["sources"]))
+
+    except Exception as e:
+        print(f"[prepare_summarize] 에러 발생: {str(e)}")
+        print(traceback.format_exc())
+        return {"prompt": None, "observation": f"요약 중 오류가 발생했습니다: {str(e)}"}
+
+
+def prepare_search_documents(query: str) -> dict:
+    return build_context_prompt(query, "search_documents", k=5)
+
+
+def prepare_default(question: str) -> dict:
+    return build_context_prompt(question)
+
+
+async def aprepare_search_documents(query: str) -> dict:
+    return await abuild_context_prompt(query, "search_documents", k=5)
+
+
+async def aprepare_default(question: str) -> dict:
+    return await abuild_context_prompt(question)
+
+
+def shared_analyzer():
+    """업로드 폴더의 공유 분석기 (시각화 도구와 집계 빠른 경로가 같은 롤업을 사용)"""
+    return get_analyzer(UPLOAD_DIR, cache_dir=ANALYZER_CACHE_DIR, dimensions=ANALYZER_DIMENSIONS,
+                        parse_workers=PARSE_WORKERS)
+
+
+def prepare_visualization(question: str) -> dict:
     try:
         print(f"[visualization] UPLOAD_DIR: {UPLOAD_DIR}")
-        analyzer = InOutAnalyzer(UPLOAD_DIR)
-        
+        analyzer = shared_analyzer()
+
         print("[visualization] 데이터 로드 시작...")
         analyzer.load_all_data()
-        
+
         print("[visualization] 일별 요약 생성 시작...")
         daily_summary_df = analyzer.get_daily_summary()
-        
+
         if daily_summary_df is None:
             print("[visualization] 일별 요약 데이터가 None")
-            return "시각화 할 데이터가 없습니다."
-        
+            return {"prompt": None, "observation": "시각화 할 데이터가 없습니다."}
+
         print(f"[visualization] 일별 요약 데이터 shape: {daily_summary_df.shape}")
-        
+
         daily_summary_df["Date"] = daily_summary_df["Date"].astype(str)
         daily_summary_df = daily_summary_df.set_index("Date")
         #daily_summary_df = daily_summary_df.T
@@ -142,72 +254,74 @@ def visualization(question: str) -> str:
         text = daily_summary_df.to_markdown(index=True)
         print(f"[visualization] 마크다운 텍스트 길이: {len(text)}")
 
-        processor = DocumentProcessor(db_dir=VECTOR_DB_DIR)
-        processor.add_to_vector_store([Document(page_content=text, metadata={"source": "visualization_tool"})])
-        print("[visualization] 벡터 DB에 데이터 추가 완료")
-
-        # (2) RAG 응답 생성
-        prompt_template = """
-        다음 문서와 시각화 데이터를 참고하여 질문에 답해주세요:
-        
-        기존 문서 및 시각화 데이터:
-        {context}
-        
-        새로운 시각화 데이터:
-        {get_daily_summary}
-        
-        질문: {question}
-        
-        답변: (시각화 데이터를 활용하여 구체적으로 답변해주세요)
-        """
-        
+        # 같은 요약이면 재임베딩/저장 없이 건너뛰고, 바뀌었으면 이전 요약을 교체
+        # 인덱싱 작업이 쓰기 락을 잡고 있으면 질문이 기다리지 않도록 이번에는 건너뜀 (다음 질문에서 갱신)
+        registry = get_registry()
+        changed = registry.processor.try_upsert_source(
+            "visualization_tool",
+            [Document(page_content=text, metadata={"source": "visualization_tool"})]
+        )
+        if changed is None:
+            print("[visualization] 인덱스 쓰기 중이라 시각화 요약 저장 건너뜀")
+        else:
+            print(f"[visualization] 벡터 DB 시각화 요약 {'갱신' if changed else '변경 없음'}")
+
+        # (2) RAG 프롬프트 생성
+        # 시각화 데이터는 업로드가 바뀌기 전까지 같으므로 검색 문맥보다 앞에 두어 prefix 캐시를 재사용
         # 기존 문서에서 관련 정보 검색
-        processor = DocumentProcessor(db_dir=VECTOR_DB_DIR)
-        vectorstore = processor.load_vector_store()
-        
+        vectorstore = registry.get_vectorstore()
+
         if vectorstore is not None:
             print("[visualization] 기존 문서에서 관련 정보 검색...")
-            relevant_docs = vectorstore.similarity_search(question, k=2)
-            context = "\n\n".join([doc.page_content for doc in relevant_docs])
-            
-            prompt = prompt_template.format(
-                context=context, 
-                get_daily_summary=text,
-                question=question
-            )
+            relevant_docs = registry.retriever.search(question, k=2)
+            # 방금 만든 시각화 요약과 같은 문서는 제외하고, 요약이 차지한 만큼 예산을 줄임
+            relevant_docs = [doc for doc in relevant_docs if doc.metadata.get("source") != "visualization_tool"]
+            budget = max(CONTEXT_TOKEN_BUDGET - count_tokens(text), 0)
+            context = build_context(relevant_docs, budget, dedup_threshold=CONTEXT_DEDUP_THRESHOLD)
+
+            prompt = build_prompt("visualization", question, ("시각화 데이터", text), ("문서 내용", context))
         else:
             print("[visualization] 벡터스토어 없음, 시각화 데이터만 사용")
-            prompt = f"""
-            다음 시각화 데이터를 참고하여 질문에 답해주세요:
-            
-            시각화 데이터:
-            {text}
-            
-            질문: {question}
-            
-            답변:
-            """
-        
+            prompt = build_prompt("visualization", question, ("시각화 데이터", text))
+
         print(f"[visualization] 프롬프트 길이: {len(prompt)}")
-        print("[visualization] LLM 호출 시작...")
-        
-        response = llm.invoke(prompt)
-        print(f"[visualization] LLM 응답 길이: {len(response)}")
-        
-        # (3) 프론트 전달용 JSON 추가
-        json_data = daily_summary_df.reset_index().to_json(orient="records", force_ascii=False)
-        print(f"[visualization] JSON 데이터 길이: {len(json_data)}")
-        
-        final_response = f"{response}\n\n[DATAFRAME_JSON_START]{json_data}[DATAFRAME_JSON_END]"
-        print(f"[visualization] 최종 응답 길이: {len(final_response)}")
-        
-        return final_response
+
+        # (3) 프론트 전달용 표는 프롬프트/관찰 결과와 별도로 artifacts로 전달
+        artifact = dataframe_artifact(daily_summary_df.reset_index())
+        print(f"[visualization] 표 데이터 행 수: {artifact['rows']}")
+
+        return {"prompt": prompt, "observation": "", "artifacts": {"daily_summary": artifact}}
 
     except Exception as e:
         print(f"[visualization] 에러 발생: {str(e)}")
         print(f"[visualization] 에러 상세:")
         print(traceback.format_exc())
-        return f"시각화 오류 발생: {e}"
+        return {"prompt": None, "observation": f"시각화 오류 발생: {e}"}
+
+
+@tool
+def summarize_tool(question: str) -> str:
+    """문서 요약 요청을 입력값으로 받아서 요약합니다."""
+    print(f"[summarize_tool] 호출됨 - 질문: {question}")
+    return answer_prepared(prepare_summarize(question))
+
+@tool
+def search_documents_tool(query: str) -> str:
+    """문서에서 특정 정보를 검색합니다."""
+    print(f"[search_documents_tool] 호출됨 - 쿼리: {query}")
+    return answer_prepared(prepare_search_documents(query))
+
+@tool
+def default_tool(question: str) -> str:
+    """기본 응답을 위한 도구입니다."""
+    print(f"[default_tool] 호출됨 - 질문: {question}")
+    return answer_prepared(prepare_default(question))
+
+@tool
+def visualization(question: str) -> str:
+    """문서 정보들을 시각화합니다."""
+    print(f"[visualization] 호출됨 - 질문: {question}")
+    return answer_prepared(prepare_visualization(question))
 
 visualization_tool = Tool(
     name="시각화 데이터 계산",
@@ -220,4 +334,20 @@ TOOLS = {
     "visualization": visualization_tool,
     "search_documents": search_documents_tool,
     "default": default_tool
-}
\ No newline at end of file
+}
+
+# single 모드에서 사용하는 검색 전용 단계 (LLM 호출 없이 프롬프트만 생성)
+PREPARERS = {
+    "summarize": prepare_summarize,
+    "visualization": prepare_visualization,
+    "search_documents": prepare_search_documents,
+    "default": prepare_default
+}
+
+# 검색 / LLM 대기가 있는 준비 단계의 비동기 버전 (그래프의 async 노드에서 사용)
+# 시각화는 pandas 작업이 대부분이라 동기 버전을 CPU 스레드풀에서 실행
+APREPARERS = {
+    "summarize": aprepare_summarize,
+    "search_documents": aprepare_search_documents,
+    "default": aprepare_default,
+}
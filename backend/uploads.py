@@ -0,0 +1,167 @@
+# uploads.py
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# 저장 파일명: {원래 이름}__{내용 해시 앞 12자리}{확장자}
+# (분석기가 파일명 접두어로 입고/출고를 구분하므로 원래 이름을 앞에 유지)
+HASH_SEPARATOR = "__"
+HASH_PREFIX_LENGTH = 12
+TEMP_PREFIX = ".upload-"
+# 원래 파일명 → 현재 저장 파일 / 내용 해시 (점으로 시작해 분석기 / 업로드 목록에서 제외됨)
+NAMES_FILE_NAME = ".names.json"
+# 교체된 이전 파일은 인덱싱 작업이 벡터를 지울 때까지 숨김 이름으로 보관 (분석기 집계에서 즉시 제외)
+RETIRED_PREFIX = ".retired-"
+
+
+class UploadTooLargeError(Exception):
+    def __init__(self, filename: str, max_bytes: int):
+        super().__init__(f"{filename}: 파일 크기 제한({max_bytes} bytes)을 초과했습니다.")
+        self.filename = filename
+        self.max_bytes = max_bytes
+
+
+class StoredUpload(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+    created: bool  # False면 같은 내용의 파일이 이미 있어 새로 저장하지 않음
+    retired: Tuple[str, ...] = ()  # 같은 이름의 이전 내용이라 숨겨진 저장 파일 (벡터 제거 후 discard로 삭제)
+
+
+def content_addressed_name(filename: str, content_hash: str) -> str:
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    return f"{stem}{HASH_SEPARATOR}{content_hash[:HASH_PREFIX_LENGTH]}{ext.lower()}"
+
+
+def _write_temp(source: BinaryIO, filename: str, temp_path: str, max_bytes: int,
+                chunk_size: int) -> Tuple[str, int]:
+    """스트림을 임시 파일에 쓰면서 SHA-256 계산. (해시, 크기) 반환"""
+    sha = hashlib.sha256()
+    size = 0
+    with open(temp_path, "wb") as out:
+        while True:
+            block = source.read(chunk_size)
+            if not block:
+                break
+            size += len(block)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLargeError(filename, max_bytes)
+            sha.update(block)
+            out.write(block)
+    return sha.hexdigest(), size
+
+
+class UploadStore:
+    """업로드 폴더를 내용 해시 기준으로 관리
+
+    - 같은 내용은 (원래 이름이 달라도) 한 벌만 저장
+    - 원래 이름 → 현재 저장 파일 매핑을 NAMES_FILE_NAME에 유지
+    - 같은 이름으로 다른 내용이 올라오면, 더 이상 어떤 이름도 가리키지 않는 이전 파일을 숨기고 retired로 알림
+      (파일은 인덱싱 작업이 벡터를 지운 뒤 discard로 삭제)
+    (매핑은 매번 디스크에서 읽으므로 폴더를 통째로 지워도 그대로 동작)
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _names_path(self) -> str:
+        return os.path.join(self.directory, NAMES_FILE_NAME)
+
+    def _load_names(self) -> Dict[str, dict]:
+        try:
+            with open(self._names_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_names(self, names: Dict[str, dict]) -> None:
+        temp_path = self._names_path() + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(names, f, ensure_ascii=False)
+        os.replace(temp_path, self._names_path())
+
+    def _stored_for_hash(self, names: Dict[str, dict], content_hash: str) -> Optional[str]:
+        for entry in names.values():
+            if entry["sha256"] == content_hash and os.path.exists(os.path.join(self.directory, entry["stored"])):
+                return entry["stored"]
+        return None
+
+    def save(self, source: BinaryIO, filename: str, max_bytes: int = 0,
+             chunk_size: int = 1024 * 1024) -> StoredUpload:
+        """업로드 스트림을 chunk_size씩 임시 파일에 쓰면서 SHA-256 계산 후 내용 기반 이름으로 이동
+
+        - 파일 전체를 메모리에 올리지 않음
+        - max_bytes(>0)를 넘으면 즉시 중단하고 UploadTooLargeError
+        - 같은 내용이 이미 저장되어 있으면 임시 파일을 지우고 기존 파일 사용 (created=False)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        name = os.path.basename(filename)
+        temp_path = os.path.join(self.directory, f"{TEMP_PREFIX}{uuid.uuid4().hex}.part")
+        try:
+            content_hash, size = _write_temp(source, filename, temp_path, max_bytes, chunk_size)
+            with self._lock:
+                names = self._load_names()
+                stored = self._stored_for_hash(names, content_hash)
+                if stored is None and os.path.exists(
+                        os.path.join(self.directory, content_addressed_name(name, content_hash))):
+                    stored = content_addressed_name(name, content_hash)  # 매핑 도입 이전에 저장된 파일
+                created = stored is None
+                if created:
+                    stored = content_addressed_name(name, content_hash)
+                    os.replace(temp_path, os.path.join(self.directory, stored))
+                else:
+                    os.remove(temp_path)
+
+                previous = names.get(name)
+                names[name] = {"stored": stored, "sha256": content_hash}
+                retired = ()
+                if previous and previous["stored"] != stored \
+                        and all(entry["stored"] != previous["stored"] for entry in names.values()):
+                    retired_path = os.path.join(self.directory, previous["stored"])
+                    if os.path.exists(retired_path):
+                        os.replace(retired_path, self._retired_path(retired_path))
+                    retired = (retired_path,)
+                self._save_names(names)
+            return StoredUpload(os.path.join(self.directory, stored), content_hash, size, created, retired)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def resolve(self, filename: str) -> str:
+        """저장 파일명 또는 원래 파일명을 업로드 폴더 안의 저장 경로로 바꿈"""
+        name = os.path.basename(filename)
+        if not os.path.exists(os.path.join(self.directory, name)):
+            entry = self._load_names().get(name)
+            if entry is not None:
+                name = entry["stored"]
+        return os.path.join(self.directory, name)
+
+    def _retired_path(self, path: str) -> str:
+        return os.path.join(self.directory, RETIRED_PREFIX + os.path.basename(path))
+
+    def discard(self, paths: Iterable[str]) -> List[str]:
+        """save가 retired로 알린 이전 파일을 삭제 (벡터 제거가 끝난 뒤 호출). 삭제한 경로 반환"""
+        deleted = []
+        with self._lock:
+            for path in paths:
+                retired_path = self._retired_path(path)
+                if os.path.exists(retired_path):
+                    os.remove(retired_path)
+                    deleted.append(path)
+        return deleted
+
+    def forget(self, path: str) -> None:
+        """저장 파일을 가리키는 이름 매핑을 모두 제거 (파일 삭제 시)"""
+        stored = os.path.basename(path)
+        with self._lock:
+            names = self._load_names()
+            remaining = {name: entry for name, entry in names.items() if entry["stored"] != stored}
+            if len(remaining) != len(names):
+                self._save_names(remaining)